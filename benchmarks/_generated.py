@@ -0,0 +1,45 @@
+"""Helpers shared by the benchmarks for loading generated workflow modules."""
+
+import contextlib
+import importlib.util
+import os
+import signal
+from pathlib import Path
+
+REPO_ROOT = Path(__file__).resolve().parent.parent
+FIXTURES_DIR = REPO_ROOT / "src/tests/code-generator"
+
+
+def fixture_module_path(case: str) -> Path:
+    """Path of a fixture's expected_output.py, e.g. ``core_nodes/agent/basic_agent``."""
+    return FIXTURES_DIR / case / "expected_output.py"
+
+
+def load_generated_module(path: Path, name: str = "generated_workflow"):
+    # Generated modules create an AsyncOpenAI client at import time
+    os.environ.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    spec = importlib.util.spec_from_file_location(name, path)
+    module = importlib.util.module_from_spec(spec)
+    spec.loader.exec_module(module)
+    return module
+
+
+def format_us(seconds: float) -> str:
+    return f"{seconds * 1e6:10.2f} us"
+
+
+def _watchdog_expired(signum, frame):
+    raise TimeoutError("workflow did not yield to the event loop")
+
+
+@contextlib.contextmanager
+def watchdog(seconds: float):
+    # asyncio.wait_for cannot interrupt a loop that never awaits (e.g. a While
+    # node whose condition never changes), so back it with an interval timer
+    previous = signal.signal(signal.SIGALRM, _watchdog_expired)
+    signal.setitimer(signal.ITIMER_REAL, seconds)
+    try:
+        yield
+    finally:
+        signal.setitimer(signal.ITIMER_REAL, 0)
+        signal.signal(signal.SIGALRM, previous)
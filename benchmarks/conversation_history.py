@@ -0,0 +1,115 @@
+"""Memory and latency of conversation_history: plain list vs. ConversationHistory.
+
+Without a budget, every Agent node sends ``[*conversation_history, ...]``, so
+both the copy and the request grow with every turn. With
+``conversation_history.max_tokens`` set on the Start node, generated code keeps
+the history in a ``ConversationHistory`` that drops items outside the token
+window, so the copy made for each agent input stays bounded. The copy is kept
+on purpose: agents may mutate their input list.
+
+For 1, 10 and 100 simulated agent turns this reports the time spent assembling
+agent inputs and extending the history, the peak memory of the history, and
+the estimated tokens sent on the last turn.
+
+Requires the runtime packages used by generated code (``openai-agents``,
+``pydantic``):
+
+    python benchmarks/conversation_history.py
+    python benchmarks/conversation_history.py --max-tokens 4000 --turns 1 10 100 1000
+"""
+
+import argparse
+import statistics
+import sys
+import time
+import tracemalloc
+
+from _generated import fixture_module_path, format_us, load_generated_module
+
+DEFAULT_MODULE = fixture_module_path("core_nodes/agent/conversation_history_budget")
+
+INSTRUCTION = {
+    "role": "user",
+    "content": [{"type": "input_text", "text": "Answer using the conversation so far."}],
+}
+
+
+def turn_items(turn: int, reply_chars: int) -> list[dict]:
+    # A tool round trip followed by the assistant reply, as to_input_item() returns them
+    call_id = f"call_{turn}"
+    return [
+        {"type": "function_call", "call_id": call_id, "name": "lookup", "arguments": '{"q": "order"}'},
+        {"type": "function_call_output", "call_id": call_id, "output": "x" * (reply_chars // 4)},
+        {
+            "role": "assistant",
+            "content": [{"type": "output_text", "text": "y" * reply_chars}],
+        },
+    ]
+
+
+def run_conversation(make_history, assemble, turns: int, reply_chars: int):
+    first_message = {"role": "user", "content": [{"type": "input_text", "text": "Hi"}]}
+    history = make_history([first_message])
+    elapsed = 0.0
+    agent_input = None
+    for turn in range(turns):
+        items = turn_items(turn, reply_chars)
+        start = time.perf_counter()
+        agent_input = assemble(history)
+        history.extend(items)
+        elapsed += time.perf_counter() - start
+    return elapsed, agent_input
+
+
+def peak_memory(make_history, assemble, turns: int, reply_chars: int) -> int:
+    # Traced separately: tracemalloc slows allocation enough to skew the timings
+    tracemalloc.start()
+    run_conversation(make_history, assemble, turns, reply_chars)
+    _, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return peak
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", default=DEFAULT_MODULE)
+    parser.add_argument("--max-tokens", type=int, default=8000)
+    parser.add_argument("--turns", type=int, nargs="+", default=[1, 10, 100])
+    parser.add_argument("--reply-chars", type=int, default=2000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    module = load_generated_module(args.module)
+    ConversationHistory = module.ConversationHistory
+    estimate_tokens = module.estimate_tokens
+
+    variants = {
+        "list": (list, lambda history: [*history, INSTRUCTION]),
+        "ConversationHistory": (
+            lambda items: ConversationHistory(items, max_tokens=args.max_tokens),
+            lambda history: history.as_input(INSTRUCTION),
+        ),
+    }
+
+    print(f"module:     {args.module}")
+    print(f"max_tokens: {args.max_tokens}, reply: {args.reply_chars} chars/turn")
+    print(f"{'turns':>6}  {'variant':<20} {'time / turn':>14} {'peak memory':>12} {'last input':>22}")
+    for turns in args.turns:
+        for name, (make_history, assemble) in variants.items():
+            samples = []
+            for _ in range(args.repeats):
+                elapsed, agent_input = run_conversation(
+                    make_history, assemble, turns, args.reply_chars
+                )
+                samples.append(elapsed / turns)
+            peak = peak_memory(make_history, assemble, turns, args.reply_chars)
+            tokens = sum(estimate_tokens(item) for item in agent_input)
+            print(
+                f"{turns:>6}  {name:<20} {format_us(statistics.median(samples)):>14} "
+                f"{peak / 1024:>9.1f} KiB {len(agent_input):>6} items {tokens:>7} tok"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
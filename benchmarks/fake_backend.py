@@ -0,0 +1,560 @@
+"""In-process fake of the OpenAI API and MCP servers used by generated workflows.
+
+``FakeBackend`` serves the HTTP endpoints the generated code reaches through
+``AsyncOpenAI`` (Responses, streamed Responses, chat completions, vector store
+search and moderation) from an ``httpx`` transport, so ``Runner.run``,
+``Runner.run_streamed``, ``client.vector_stores.search`` and ``run_guardrails``
+run unchanged without network access or API keys. MCP nodes get a fake
+``mcp.client`` whose ``call_tool`` echoes its arguments.
+
+Each endpoint has its own latency distribution and error injection:
+
+    backend = FakeBackend(
+        latency={"responses": "lognormal:0.8,0.4", "vector_stores.search": "uniform:0.05,0.2"},
+        errors={"responses": ErrorInjection(rate=0.05, status=429)},
+    )
+    with backend.fake_mcp():
+        module = load_generated_module(path)
+    backend.install(module)
+
+Responses that request a JSON schema (``text.format`` or ``response_format``)
+get an instance generated from that schema, so agents with structured outputs
+parse into the emitted Pydantic models.
+"""
+
+import asyncio
+import contextlib
+import itertools
+import json
+import math
+import random
+import re
+import sys
+import time
+import types
+from dataclasses import dataclass, field
+from typing import Optional, Union
+
+import httpx
+
+_MISSING = object()
+
+ENDPOINTS = (
+    "responses",
+    "chat.completions",
+    "vector_stores.search",
+    "moderations",
+    "mcp.call_tool",
+)
+
+MODERATION_CATEGORIES = (
+    "harassment",
+    "harassment/threatening",
+    "hate",
+    "hate/threatening",
+    "illicit",
+    "illicit/violent",
+    "self-harm",
+    "self-harm/instructions",
+    "self-harm/intent",
+    "sexual",
+    "sexual/minors",
+    "violence",
+    "violence/graphic",
+)
+
+
+@dataclass
+class Latency:
+    """A latency distribution in seconds.
+
+    Parsed from ``"0.2"``, ``"fixed:0.2"``, ``"uniform:LOW,HIGH"``,
+    ``"normal:MEAN,STDDEV"`` or ``"lognormal:MEDIAN,SIGMA"``. Samples are never
+    negative.
+    """
+
+    kind: str = "fixed"
+    params: tuple = (0.0,)
+
+    @classmethod
+    def parse(cls, spec: Union[str, float, "Latency", None]) -> "Latency":
+        if spec is None:
+            return cls()
+        if isinstance(spec, Latency):
+            return spec
+        if isinstance(spec, (int, float)):
+            return cls("fixed", (float(spec),))
+        kind, _, args = spec.partition(":")
+        if not args:
+            return cls("fixed", (float(kind),))
+        params = tuple(float(arg) for arg in args.split(","))
+        expected = {"fixed": 1, "uniform": 2, "normal": 2, "lognormal": 2}
+        if expected.get(kind) != len(params):
+            raise ValueError(f"invalid latency spec: {spec!r}")
+        return cls(kind, params)
+
+    def sample(self, rng: random.Random) -> float:
+        if self.kind == "uniform":
+            value = rng.uniform(*self.params)
+        elif self.kind == "normal":
+            value = rng.gauss(*self.params)
+        elif self.kind == "lognormal":
+            median, sigma = self.params
+            value = rng.lognormvariate(math.log(median), sigma) if median > 0 else 0.0
+        else:
+            value = self.params[0]
+        return max(0.0, value)
+
+
+@dataclass
+class ErrorInjection:
+    """Fail a fraction of calls to an endpoint.
+
+    ``status`` is the HTTP status returned (429 responses carry retry-after and
+    x-ratelimit-* headers); ``status=None`` raises ``httpx.ReadTimeout`` after
+    the sampled latency instead.
+    """
+
+    rate: float = 0.0
+    status: Optional[int] = 500
+    retry_after: float = 1.0
+
+
+@dataclass
+class EndpointStats:
+    calls: int = 0
+    errors: int = 0
+    latency: float = 0.0
+
+
+def schema_instance(schema: dict, defs: Optional[dict] = None, name: str = "value"):
+    """A value that validates against a (strict-mode) JSON schema."""
+    defs = defs if defs is not None else schema.get("$defs", schema.get("definitions", {}))
+    if "$ref" in schema:
+        return schema_instance(defs[schema["$ref"].rsplit("/", 1)[-1]], defs, name)
+    if "const" in schema:
+        return schema["const"]
+    if "enum" in schema:
+        return schema["enum"][0]
+    if "default" in schema:
+        return schema["default"]
+    for key in ("anyOf", "oneOf", "allOf"):
+        if key in schema:
+            options = [option for option in schema[key] if option.get("type") != "null"]
+            return schema_instance((options or schema[key])[0], defs, name)
+    schema_type = schema.get("type", "object")
+    if isinstance(schema_type, list):
+        schema_type = next((t for t in schema_type if t != "null"), "null")
+    if schema_type == "object":
+        return {
+            key: schema_instance(value, defs, key)
+            for key, value in schema.get("properties", {}).items()
+        }
+    if schema_type == "array":
+        items = [schema_instance(schema.get("items", {}), defs, name)]
+        return items * max(1, schema.get("minItems", 1))
+    if schema_type == "string":
+        return f"sample {name}"
+    if schema_type == "integer":
+        return int(schema.get("minimum", 0))
+    if schema_type == "number":
+        return float(schema.get("minimum", 0))
+    if schema_type == "boolean":
+        return False
+    return None
+
+
+def _estimate_tokens(value) -> int:
+    return len(json.dumps(value, default=str)) // 4 + 1
+
+
+class FakeBackend:
+    """Serves fake API responses with configurable latency and failures."""
+
+    def __init__(
+        self,
+        latency: Optional[dict] = None,
+        errors: Optional[dict] = None,
+        *,
+        seed: int = 0,
+        reply: str = "This is a fake response from the offline backend.",
+        stream_chunk_chars: int = 8,
+        stream_interval: Union[str, float, Latency] = 0.0,
+    ):
+        latency = latency or {}
+        unknown = set(latency) - set(ENDPOINTS) | set(errors or {}) - set(ENDPOINTS)
+        if unknown:
+            raise ValueError(f"unknown endpoints: {sorted(unknown)}")
+        self.latency = {name: Latency.parse(latency.get(name)) for name in ENDPOINTS}
+        self.errors = {name: (errors or {}).get(name, ErrorInjection()) for name in ENDPOINTS}
+        self.reply = reply
+        self.stream_chunk_chars = stream_chunk_chars
+        self.stream_interval = Latency.parse(stream_interval)
+        self.stats = {name: EndpointStats() for name in ENDPOINTS}
+        self._rng = random.Random(seed)
+        self._ids = itertools.count(1)
+
+    # -- wiring -------------------------------------------------------------
+
+    def client(self, event_hooks=None):
+        from openai import AsyncOpenAI
+
+        return AsyncOpenAI(
+            api_key="sk-offline",
+            base_url="http://fake-openai.local/v1",
+            http_client=httpx.AsyncClient(transport=_FakeTransport(self), event_hooks=event_hooks),
+            # Injected errors should reach the workflow, not be retried away
+            max_retries=0,
+        )
+
+    def install(self, module) -> None:
+        """Point the agents SDK and a loaded generated module at this backend."""
+        from agents import set_default_openai_client, set_tracing_disabled
+
+        if hasattr(module, "warmup"):
+            # Modules generated with lazy loading import mcp.client here, and
+            # may set their own default client
+            with self.fake_mcp():
+                module.warmup()
+        # Responses still reach the module's rate limits
+        hook = getattr(module, "observe_rate_limit_headers", None)
+        client = self.client({"response": [hook]} if hook else None)
+        set_default_openai_client(client, use_for_tracing=False)
+        set_tracing_disabled(True)
+        if hasattr(module, "client"):
+            module.client = client
+        if hasattr(module, "moderation_batcher"):
+            module.ctx.guardrail_llm = module.moderation_batcher.wrap(client)
+        elif hasattr(module, "ctx"):
+            module.ctx.guardrail_llm = client
+
+    @contextlib.contextmanager
+    def fake_mcp(self):
+        """Serve ``mcp.client`` from this backend while generated modules are imported."""
+        fakes = {
+            "Client": lambda transport: _FakeMCPClient(self, transport),
+            "SSEClientTransport": _FakeMCPTransport,
+            "StdioClientTransport": _FakeMCPTransport,
+        }
+        try:
+            import mcp.client as client_module
+        except ImportError:
+            client_module = None
+        if client_module is not None:
+            # The agents SDK imports the real package, so only the names are swapped
+            saved = {name: getattr(client_module, name, _MISSING) for name in fakes}
+            for name, value in fakes.items():
+                setattr(client_module, name, value)
+            try:
+                yield
+            finally:
+                for name, value in saved.items():
+                    if value is _MISSING:
+                        delattr(client_module, name)
+                    else:
+                        setattr(client_module, name, value)
+            return
+
+        package = types.ModuleType("mcp")
+        package.__path__ = []
+        client_module = types.ModuleType("mcp.client")
+        client_module.__dict__.update(fakes)
+        package.client = client_module
+        sys.modules.update({"mcp": package, "mcp.client": client_module})
+        try:
+            yield
+        finally:
+            sys.modules.pop("mcp", None)
+            sys.modules.pop("mcp.client", None)
+
+    # -- request handling ---------------------------------------------------
+
+    async def _delay(self, endpoint: str) -> float:
+        delay = self.latency[endpoint].sample(self._rng)
+        if delay:
+            await asyncio.sleep(delay)
+        return delay
+
+    def _rate_limit_headers(self) -> dict:
+        return {
+            "x-ratelimit-limit-requests": "10000",
+            "x-ratelimit-remaining-requests": "9999",
+            "x-ratelimit-limit-tokens": "10000000",
+            "x-ratelimit-remaining-tokens": "9999000",
+        }
+
+    async def _begin(self, endpoint: str) -> Optional[httpx.Response]:
+        """Count the call, wait the sampled latency and maybe inject an error."""
+        stats = self.stats[endpoint]
+        stats.calls += 1
+        stats.latency += await self._delay(endpoint)
+        fault = self.errors[endpoint]
+        if not fault.rate or self._rng.random() >= fault.rate:
+            return None
+        stats.errors += 1
+        if fault.status is None:
+            raise httpx.ReadTimeout(f"injected timeout on {endpoint}")
+        headers = self._rate_limit_headers()
+        if fault.status == 429:
+            headers.update(
+                {
+                    "x-ratelimit-remaining-requests": "0",
+                    "retry-after-ms": str(int(fault.retry_after * 1000)),
+                }
+            )
+        return httpx.Response(
+            fault.status,
+            headers=headers,
+            json={
+                "error": {
+                    "message": f"injected {fault.status} on {endpoint}",
+                    "type": "rate_limit_exceeded" if fault.status == 429 else "server_error",
+                    "param": None,
+                    "code": None,
+                }
+            },
+        )
+
+    def _id(self, prefix: str) -> str:
+        return f"{prefix}_fake{next(self._ids):06d}"
+
+    def _output_text(self, text_format: Optional[dict]) -> str:
+        if text_format and text_format.get("type") == "json_schema":
+            schema = text_format.get("schema") or text_format.get("json_schema", {}).get("schema", {})
+            return json.dumps(schema_instance(schema))
+        if text_format and text_format.get("type") == "json_object":
+            return "{}"
+        return self.reply
+
+    def _response(self, body: dict, text: str, status: str = "completed") -> dict:
+        input_tokens = _estimate_tokens(body.get("input"))
+        output_tokens = _estimate_tokens(text)
+        output = []
+        if status == "completed":
+            output.append(
+                {
+                    "type": "message",
+                    "id": self._id("msg"),
+                    "status": "completed",
+                    "role": "assistant",
+                    "content": [{"type": "output_text", "text": text, "annotations": []}],
+                }
+            )
+        return {
+            "id": self._id("resp"),
+            "object": "response",
+            "created_at": int(time.time()),
+            "status": status,
+            "model": body.get("model") or "gpt-4.1",
+            "output": output,
+            "error": None,
+            "incomplete_details": None,
+            "instructions": body.get("instructions"),
+            "metadata": {},
+            "parallel_tool_calls": True,
+            "temperature": 1.0,
+            "top_p": 1.0,
+            "tool_choice": "auto",
+            "tools": [],
+            "text": body.get("text") or {"format": {"type": "text"}},
+            "usage": {
+                "input_tokens": input_tokens,
+                "input_tokens_details": {"cached_tokens": 0},
+                "output_tokens": output_tokens,
+                "output_tokens_details": {"reasoning_tokens": 0},
+                "total_tokens": input_tokens + output_tokens,
+            },
+        }
+
+    async def _stream_response(self, body: dict, text: str):
+        sequence = itertools.count()
+
+        def event(event_type: str, **data) -> bytes:
+            payload = {"type": event_type, "sequence_number": next(sequence), **data}
+            return f"event: {event_type}\ndata: {json.dumps(payload)}\n\n".encode()
+
+        response = self._response(body, text)
+        message = response["output"][0]
+        yield event("response.created", response=self._response(body, text, status="in_progress"))
+        yield event(
+            "response.output_item.added",
+            output_index=0,
+            item={**message, "status": "in_progress", "content": []},
+        )
+        yield event(
+            "response.content_part.added",
+            item_id=message["id"],
+            output_index=0,
+            content_index=0,
+            part={"type": "output_text", "text": "", "annotations": []},
+        )
+        for start in range(0, len(text), self.stream_chunk_chars):
+            delay = self.stream_interval.sample(self._rng)
+            if delay:
+                await asyncio.sleep(delay)
+            yield event(
+                "response.output_text.delta",
+                item_id=message["id"],
+                output_index=0,
+                content_index=0,
+                delta=text[start : start + self.stream_chunk_chars],
+                logprobs=[],
+            )
+        yield event(
+            "response.output_text.done",
+            item_id=message["id"],
+            output_index=0,
+            content_index=0,
+            text=text,
+            logprobs=[],
+        )
+        yield event(
+            "response.content_part.done",
+            item_id=message["id"],
+            output_index=0,
+            content_index=0,
+            part=message["content"][0],
+        )
+        yield event("response.output_item.done", output_index=0, item=message)
+        yield event("response.completed", response=response)
+
+    async def handle(self, request: httpx.Request) -> httpx.Response:
+        path = request.url.path.removeprefix("/v1")
+        body = json.loads(request.content or b"{}")
+        if path == "/responses":
+            endpoint = "responses"
+        elif path == "/chat/completions":
+            endpoint = "chat.completions"
+        elif re.fullmatch(r"/vector_stores/[^/]*/search", path):
+            endpoint = "vector_stores.search"
+        elif path == "/moderations":
+            endpoint = "moderations"
+        else:
+            return httpx.Response(404, json={"error": {"message": f"not faked: {path}"}})
+
+        error = await self._begin(endpoint)
+        if error is not None:
+            return error
+        headers = self._rate_limit_headers()
+
+        if endpoint == "responses":
+            text = self._output_text((body.get("text") or {}).get("format"))
+            if body.get("stream"):
+                return httpx.Response(
+                    200,
+                    headers={**headers, "content-type": "text/event-stream"},
+                    content=self._stream_response(body, text),
+                )
+            return httpx.Response(200, headers=headers, json=self._response(body, text))
+
+        if endpoint == "chat.completions":
+            text = self._output_text(body.get("response_format"))
+            prompt_tokens = _estimate_tokens(body.get("messages"))
+            completion_tokens = _estimate_tokens(text)
+            return httpx.Response(
+                200,
+                headers=headers,
+                json={
+                    "id": self._id("chatcmpl"),
+                    "object": "chat.completion",
+                    "created": int(time.time()),
+                    "model": body.get("model") or "gpt-4.1-mini",
+                    "choices": [
+                        {
+                            "index": 0,
+                            "finish_reason": "stop",
+                            "logprobs": None,
+                            "message": {"role": "assistant", "content": text, "refusal": None},
+                        }
+                    ],
+                    "usage": {
+                        "prompt_tokens": prompt_tokens,
+                        "completion_tokens": completion_tokens,
+                        "total_tokens": prompt_tokens + completion_tokens,
+                    },
+                },
+            )
+
+        if endpoint == "vector_stores.search":
+            count = max(1, min(int(body.get("max_num_results") or 10), 3))
+            return httpx.Response(
+                200,
+                headers=headers,
+                json={
+                    "object": "vector_store.search_results.page",
+                    "search_query": [body.get("query")],
+                    "data": [
+                        {
+                            "file_id": self._id("file"),
+                            "filename": f"document_{index}.txt",
+                            "score": round(0.9 - index * 0.1, 2),
+                            "attributes": {},
+                            "content": [{"type": "text", "text": f"Passage {index} about {body.get('query')}."}],
+                        }
+                        for index in range(count)
+                    ],
+                    "has_more": False,
+                    "next_page": None,
+                },
+            )
+
+        inputs = body.get("input")
+        inputs = inputs if isinstance(inputs, list) else [inputs]
+        return httpx.Response(
+            200,
+            headers=headers,
+            json={
+                "id": self._id("modr"),
+                "model": body.get("model") or "omni-moderation-latest",
+                "results": [
+                    {
+                        "flagged": False,
+                        "categories": {category: False for category in MODERATION_CATEGORIES},
+                        "category_scores": {category: 0.0 for category in MODERATION_CATEGORIES},
+                        "category_applied_input_types": {category: ["text"] for category in MODERATION_CATEGORIES},
+                    }
+                    for _ in inputs
+                ],
+            },
+        )
+
+
+class _FakeTransport(httpx.AsyncBaseTransport):
+    def __init__(self, backend: FakeBackend):
+        self._backend = backend
+
+    async def handle_async_request(self, request: httpx.Request) -> httpx.Response:
+        await request.aread()
+        return await self._backend.handle(request)
+
+
+@dataclass
+class _FakeMCPTransport:
+    url: Optional[str] = None
+    headers: Optional[dict] = None
+    command: Optional[str] = None
+    args: list = field(default_factory=list)
+
+
+class _FakeMCPClient:
+    def __init__(self, backend: FakeBackend, transport: _FakeMCPTransport):
+        self._backend = backend
+        self.transport = transport
+
+    async def initialize(self):
+        await asyncio.sleep(0)
+
+    async def ping(self):
+        await asyncio.sleep(0)
+
+    async def close(self):
+        await asyncio.sleep(0)
+
+    async def call_tool(self, name, arguments):
+        error = await self._backend._begin("mcp.call_tool")
+        if error is not None:
+            raise RuntimeError(error.json()["error"]["message"])
+        return {
+            "content": [{"type": "text", "text": json.dumps({"tool": name, "arguments": arguments})}],
+            "isError": False,
+        }
@@ -0,0 +1,57 @@
+/**
+ * Write the Python generated for every template in src/templates to a
+ * directory, one `<template>.py` per template. Used by workflow_suite.py and
+ * import_time.py:
+ *
+ *   npx vite-node benchmarks/generate_templates.ts -- /tmp/templates
+ *
+ * With `--lazy-loading` the templates are generated with lazy loading
+ * enabled on their Start node.
+ *
+ * Templates the generator rejects are reported and skipped.
+ */
+import fs from 'fs'
+import path from 'path'
+import { fileURLToPath } from 'url'
+
+import { generatePythonSDK } from '../src/lib/code-generator'
+
+const templatesDir = path.resolve(
+  path.dirname(fileURLToPath(import.meta.url)),
+  '../src/templates'
+)
+
+const args = process.argv.slice(2).filter((arg) => arg !== '--')
+const lazyLoading = args.includes('--lazy-loading')
+const outputDir = args.find((arg) => !arg.startsWith('--'))
+if (!outputDir) {
+  console.error('usage: generate_templates.ts -- <output dir> [--lazy-loading]')
+  process.exit(2)
+}
+
+function withLazyLoading(workflowJson: string): string {
+  const workflow = JSON.parse(workflowJson)
+  for (const node of workflow.nodes ?? []) {
+    if (node.node_type === 'builtins.Start') {
+      node.config = { ...node.config, lazy_loading: { enabled: true } }
+    }
+  }
+  return JSON.stringify(workflow)
+}
+
+fs.mkdirSync(outputDir, { recursive: true })
+
+for (const file of fs.readdirSync(templatesDir).sort()) {
+  if (!file.endsWith('.json')) continue
+  const name = path.basename(file, '.json')
+  const workflowJson = fs.readFileSync(path.join(templatesDir, file), 'utf-8')
+  const result = generatePythonSDK(
+    lazyLoading ? withLazyLoading(workflowJson) : workflowJson
+  )
+  if (result.error) {
+    console.error(`${name}: ${result.error}`)
+    continue
+  }
+  fs.writeFileSync(path.join(outputDir, `${name}.py`), result.code)
+  console.log(`${name}.py`)
+}
@@ -0,0 +1,75 @@
+"""Per-call cost of building guardrail pipelines: inline vs. cached.
+
+Generated workflows used to call
+``instantiate_guardrails(load_config_bundle(config))`` on every Guardrails
+node execution. They now call ``get_guardrails_bundle(config)``, which builds
+each distinct config once per process. This benchmark loads a generated
+module and times both paths against the same config.
+
+Requires the runtime packages used by generated code (``openai``,
+``openai-agents``, ``openai-guardrails``):
+
+    python benchmarks/guardrails_bundle_cache.py
+    python benchmarks/guardrails_bundle_cache.py --module path/to/generated.py --config guardrails_config
+"""
+
+import argparse
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from _generated import fixture_module_path, format_us, load_generated_module
+
+DEFAULT_MODULE = fixture_module_path(
+    "tool_nodes/guardrails/guardrails_moderation_jailbreak_continue_on_error"
+)
+
+
+def time_calls(fn, iterations: int, repeats: int) -> list[float]:
+    samples = []
+    for _ in range(repeats):
+        start = time.perf_counter()
+        for _ in range(iterations):
+            fn()
+        samples.append((time.perf_counter() - start) / iterations)
+    return samples
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--module", type=Path, default=DEFAULT_MODULE)
+    parser.add_argument("--config", default="guardrails_config")
+    parser.add_argument("--iterations", type=int, default=2000)
+    parser.add_argument("--repeats", type=int, default=5)
+    args = parser.parse_args()
+
+    module = load_generated_module(args.module)
+    config = getattr(module, args.config)
+
+    def inline():
+        return module.instantiate_guardrails(module.load_config_bundle(config))
+
+    def cached():
+        return module.get_guardrails_bundle(config)
+
+    # Warm the cache so the cached path measures steady state
+    cached()
+
+    inline_samples = time_calls(inline, args.iterations, args.repeats)
+    cached_samples = time_calls(cached, args.iterations, args.repeats)
+
+    inline_median = statistics.median(inline_samples)
+    cached_median = statistics.median(cached_samples)
+
+    print(f"module:  {args.module}")
+    print(f"config:  {args.config}")
+    print(f"inline instantiate_guardrails(load_config_bundle(...)): {format_us(inline_median)} / call")
+    print(f"cached get_guardrails_bundle(...):                      {format_us(cached_median)} / call")
+    if cached_median > 0:
+        print(f"speedup: {inline_median / cached_median:,.0f}x")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
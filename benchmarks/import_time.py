@@ -0,0 +1,141 @@
+"""Cold import time of the template workflows with and without lazy loading.
+
+Every template in ``src/templates/*.json`` is generated twice with
+``generate_templates.ts``, as is and with ``lazy_loading`` enabled on its
+Start node, and each module is imported ``--repeats`` times in a fresh
+interpreter under ``python -X importtime``. Per template this reports the
+median of:
+
+* ``import_ms``: the module's cumulative time in the ``-X importtime`` output,
+  which includes every package it imports
+* ``warmup_ms``: the lazy module's ``warmup()``, called right after the import
+* the runtime packages (``openai``, ``agents``, ``guardrails``, ``mcp``) that
+  were loaded when the import returned
+
+    python benchmarks/import_time.py
+    python benchmarks/import_time.py --templates-dir eager/ --lazy-templates-dir lazy/
+
+Templates are generated with ``npx vite-node``; pass ``--templates-dir`` and
+``--lazy-templates-dir`` to use modules generated beforehand. Templates whose
+generated code does not compile are reported as ``skip``.
+"""
+
+import argparse
+import json
+import os
+import py_compile
+import re
+import shutil
+import statistics
+import subprocess
+import sys
+import tempfile
+from pathlib import Path
+
+from _generated import REPO_ROOT
+
+RUNTIME_PACKAGES = ("openai", "agents", "guardrails", "mcp")
+
+IMPORTTIME_LINE = re.compile(r"import time:\s+\d+ \|\s+(\d+) \| *(\S+)")
+
+# Runs in the child interpreter after the module named {name} is on sys.path
+IMPORT_SCRIPT = """
+import json, sys, time
+import {name} as module
+loaded = [package for package in {packages!r} if package in sys.modules]
+start = time.perf_counter()
+if hasattr(module, "warmup"):
+    module.warmup()
+print(json.dumps({{"loaded": loaded, "warmup_s": time.perf_counter() - start}}))
+"""
+
+
+def generate_templates(output_dir: str, lazy: bool) -> bool:
+    command = ["npx", "vite-node", "benchmarks/generate_templates.ts", "--", output_dir]
+    if lazy:
+        command.append("--lazy-loading")
+    try:
+        subprocess.run(command, cwd=REPO_ROOT, check=True, capture_output=True, text=True)
+    except (OSError, subprocess.CalledProcessError) as error:
+        detail = getattr(error, "stderr", None) or error
+        print(f"could not generate templates ({' '.join(command)}): {detail}", file=sys.stderr)
+        return False
+    return True
+
+
+def import_once(path: Path, work_dir: str) -> dict:
+    # Imported by name so -X importtime reports it; template names have dashes
+    name = "bench_" + re.sub(r"\W", "_", path.stem)
+    shutil.copy(path, Path(work_dir) / f"{name}.py")
+    env = {**os.environ, "PYTHONPATH": work_dir, "PYTHONDONTWRITEBYTECODE": "1"}
+    # Generated modules create an AsyncOpenAI client, eagerly or in warmup()
+    env.setdefault("OPENAI_API_KEY", "sk-benchmark")
+    script = IMPORT_SCRIPT.format(name=name, packages=RUNTIME_PACKAGES)
+    result = subprocess.run(
+        [sys.executable, "-X", "importtime", "-c", script],
+        capture_output=True,
+        text=True,
+        env=env,
+    )
+    if result.returncode != 0:
+        raise RuntimeError(result.stderr.strip().splitlines()[-1])
+    import_us = next(
+        int(match.group(1))
+        for match in map(IMPORTTIME_LINE.match, result.stderr.splitlines())
+        if match and match.group(2) == name
+    )
+    measured = json.loads(result.stdout.strip().splitlines()[-1])
+    return {"import_s": import_us / 1e6, **measured}
+
+
+def measure(path: Path, repeats: int) -> dict:
+    py_compile.compile(str(path), doraise=True)
+    runs = []
+    for _ in range(repeats):
+        with tempfile.TemporaryDirectory() as work_dir:
+            runs.append(import_once(path, work_dir))
+    return {
+        "import_s": statistics.median(run["import_s"] for run in runs),
+        "warmup_s": statistics.median(run["warmup_s"] for run in runs),
+        "loaded": runs[0]["loaded"],
+    }
+
+
+def format_ms(seconds: float) -> str:
+    return f"{seconds * 1e3:9.1f}"
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--templates-dir", help="modules from generate_templates.ts")
+    parser.add_argument("--lazy-templates-dir", help="modules from generate_templates.ts --lazy-loading")
+    args = parser.parse_args()
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        dirs = {"eager": args.templates_dir, "lazy": args.lazy_templates_dir}
+        for variant, directory in dirs.items():
+            if directory is None:
+                dirs[variant] = f"{work_dir}/{variant}"
+                if not generate_templates(dirs[variant], lazy=variant == "lazy"):
+                    return 1
+
+        print(f"{'template':32} {'eager ms':>9} {'lazy ms':>9} {'warmup ms':>9}  packages at import (eager / lazy)")
+        for path in sorted(Path(dirs["eager"]).glob("*.py")):
+            lazy_path = Path(dirs["lazy"]) / path.name
+            try:
+                eager = measure(path, args.repeats)
+                lazy = measure(lazy_path, args.repeats)
+            except (py_compile.PyCompileError, RuntimeError, StopIteration) as error:
+                detail = str(error).strip().splitlines()[-1] if str(error).strip() else type(error).__name__
+                print(f"{path.stem:32} skip: {detail}")
+                continue
+            print(
+                f"{path.stem:32} {format_ms(eager['import_s'])} {format_ms(lazy['import_s'])} "
+                f"{format_ms(lazy['warmup_s'])}  {','.join(eager['loaded']) or '-'} / {','.join(lazy['loaded']) or '-'}"
+            )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,84 @@
+"""Moderation requests, throughput and latency with and without micro-batching.
+
+Generated workflows whose Start node enables ``moderation_batching`` send the
+moderation checks of concurrent runs through ``moderation_batcher``, which
+combines them into one request per batch. This benchmark starts waves of
+concurrent ``run_workflow`` calls against ``FakeBackend`` for the same
+workflow generated with and without batching, and reports the moderation
+requests sent, runs per second and the p50/p99 run latency of each.
+
+Requires the runtime packages used by generated code (``openai``,
+``openai-agents``, ``openai-guardrails``):
+
+    python benchmarks/moderation_batching.py
+    python benchmarks/moderation_batching.py --concurrency 500 --latency 0.2 --max-wait 0.02
+"""
+
+import argparse
+import asyncio
+import statistics
+import sys
+import time
+from pathlib import Path
+
+from _generated import fixture_module_path, load_generated_module
+from fake_backend import FakeBackend
+
+BASELINE_MODULE = fixture_module_path("tool_nodes/guardrails/guardrails_moderation")
+BATCHED_MODULE = fixture_module_path("tool_nodes/guardrails/guardrails_moderation_batching")
+
+
+async def run_wave(module, concurrency: int) -> list[float]:
+    async def one(index: int) -> float:
+        start = time.perf_counter()
+        await module.run_workflow(module.WorkflowInput(input_as_text=f"message {index}"))
+        return time.perf_counter() - start
+
+    return await asyncio.gather(*(one(index) for index in range(concurrency)))
+
+
+async def measure(path: Path, name: str, args) -> dict:
+    backend = FakeBackend({"moderations": args.latency})
+    module = load_generated_module(path, name)
+    if hasattr(module, "moderation_batcher"):
+        module.moderation_batcher = module.ModerationBatcher(args.max_batch_size, args.max_wait)
+    backend.install(module)
+    latencies = []
+    start = time.perf_counter()
+    for _ in range(args.waves):
+        latencies += await run_wave(module, args.concurrency)
+    elapsed = time.perf_counter() - start
+    latencies.sort()
+    return {
+        "requests": backend.stats["moderations"].calls,
+        "runs_per_s": len(latencies) / elapsed,
+        "p50": statistics.median(latencies),
+        "p99": latencies[int(len(latencies) * 0.99) - 1],
+    }
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--baseline", type=Path, default=BASELINE_MODULE)
+    parser.add_argument("--batched", type=Path, default=BATCHED_MODULE)
+    parser.add_argument("--concurrency", type=int, default=200, help="Concurrent runs per wave")
+    parser.add_argument("--waves", type=int, default=5)
+    parser.add_argument("--latency", type=float, default=0.1, help="Moderation latency in seconds")
+    parser.add_argument("--max-batch-size", type=int, default=64)
+    parser.add_argument("--max-wait", type=float, default=0.005, help="Seconds a check waits for others")
+    args = parser.parse_args()
+
+    print(f"{args.waves} waves of {args.concurrency} concurrent runs, moderation latency {args.latency}s")
+    print(f"{'workflow':>9} {'requests':>9} {'runs/s':>9} {'p50 ms':>8} {'p99 ms':>8}")
+    for name, path in (("plain", args.baseline), ("batched", args.batched)):
+        # A fresh loop per module: the rate limiter's locks are bound to the loop
+        result = asyncio.run(measure(path, f"generated_{name}", args))
+        print(
+            f"{name:>9} {result['requests']:9d} {result['runs_per_s']:9.1f} "
+            f"{result['p50'] * 1000:8.1f} {result['p99'] * 1000:8.1f}"
+        )
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
@@ -0,0 +1,142 @@
+"""Run every generated fixture end to end against the offline fake backend.
+
+Each ``src/tests/code-generator/**/expected_output.py`` is imported with the
+fake MCP client, pointed at a ``FakeBackend`` and run once with a
+``WorkflowInput`` generated from its schema (and once more through
+``run_workflow_streamed`` with ``--streamed``). The output of run_workflow must
+round-trip through ``json.dumps``, as callers serializing it expect. No network
+access or API key is needed.
+
+    python benchmarks/run_offline.py
+    python benchmarks/run_offline.py --latency responses=lognormal:0.5,0.4 --error responses=0.1:429
+    python benchmarks/run_offline.py --only guardrails --streamed
+"""
+
+import argparse
+import asyncio
+import json
+import sys
+import tempfile
+import time
+import traceback
+from pathlib import Path
+
+from _generated import FIXTURES_DIR, load_generated_module, watchdog
+from fake_backend import ENDPOINTS, ErrorInjection, FakeBackend, schema_instance
+
+
+def parse_assignments(values: list[str], flag: str) -> dict:
+    parsed = {}
+    for value in values:
+        endpoint, sep, spec = value.partition("=")
+        if not sep or endpoint not in ENDPOINTS:
+            raise SystemExit(f"{flag} expects ENDPOINT=SPEC with ENDPOINT in {', '.join(ENDPOINTS)}")
+        parsed[endpoint] = spec
+    return parsed
+
+
+def parse_error(spec: str) -> ErrorInjection:
+    # RATE[:STATUS], where STATUS is an HTTP status or "timeout"
+    rate, _, status = spec.partition(":")
+    if status == "timeout":
+        return ErrorInjection(float(rate), status=None)
+    return ErrorInjection(float(rate), status=int(status or 500))
+
+
+def fixture_cases(only: str) -> list[Path]:
+    return sorted(
+        path.parent
+        for path in FIXTURES_DIR.glob("**/expected_output.py")
+        if only in str(path.parent.relative_to(FIXTURES_DIR))
+    )
+
+
+def load_fixture(case: Path, backend: FakeBackend, cache_dir: str):
+    name = "offline_" + "_".join(case.relative_to(FIXTURES_DIR).parts)
+    with backend.fake_mcp():
+        module = load_generated_module(case / "expected_output.py", name)
+    backend.install(module)
+    if hasattr(module, "NodeResultCache"):
+        # Keep SQLite-backed node caches out of the working directory
+        module.node_cache = module.NodeResultCache(path=f"{cache_dir}/{name}.sqlite3")
+    return module
+
+
+async def run_case(module, streamed: bool, timeout: float):
+    workflow_input = module.WorkflowInput(
+        **schema_instance(module.WorkflowInput.model_json_schema())
+    )
+    output = await asyncio.wait_for(module.run_workflow(workflow_input), timeout)
+    if json.loads(json.dumps(output)) != output:
+        raise AssertionError(f"output does not round-trip through json.dumps: {output!r}")
+    if streamed and hasattr(module, "run_workflow_streamed"):
+
+        async def drain():
+            async for _ in module.run_workflow_streamed(workflow_input):
+                pass
+
+        await asyncio.wait_for(drain(), timeout)
+    return output
+
+
+def run_with_watchdog(module, streamed: bool, timeout: float):
+    with watchdog(timeout * (2 if streamed else 1) + 1):
+        return asyncio.run(run_case(module, streamed, timeout))
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", default="", help="run cases whose path contains this")
+    parser.add_argument("--latency", action="append", default=[], metavar="ENDPOINT=SPEC")
+    parser.add_argument("--error", action="append", default=[], metavar="ENDPOINT=RATE[:STATUS]")
+    parser.add_argument("--streamed", action="store_true")
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--verbose", "-v", action="store_true")
+    args = parser.parse_args()
+
+    latency = parse_assignments(args.latency, "--latency")
+    errors = {
+        endpoint: parse_error(spec)
+        for endpoint, spec in parse_assignments(args.error, "--error").items()
+    }
+
+    failures = skipped = 0
+    cases = fixture_cases(args.only)
+    with tempfile.TemporaryDirectory() as cache_dir:
+        for case in cases:
+            label = str(case.relative_to(FIXTURES_DIR))
+            backend = FakeBackend(latency, errors, seed=args.seed)
+            start = time.perf_counter()
+            try:
+                module = load_fixture(case, backend, cache_dir)
+            except SyntaxError as error:
+                # A few fixtures pin generator output that is not valid Python yet
+                skipped += 1
+                print(f"skip {label}: {type(error).__name__}: {error.msg} (line {error.lineno})")
+                continue
+            except Exception as error:
+                failures += 1
+                print(f"FAIL {label}: {type(error).__name__}: {error}")
+                if args.verbose:
+                    traceback.print_exc()
+                continue
+            try:
+                run_with_watchdog(module, args.streamed, args.timeout)
+            except Exception as error:
+                failures += 1
+                print(f"FAIL {label}: {type(error).__name__}: {error}")
+                if args.verbose:
+                    traceback.print_exc()
+                continue
+            calls = ", ".join(
+                f"{endpoint} {stats.calls}" for endpoint, stats in backend.stats.items() if stats.calls
+            )
+            print(f"ok   {label} ({time.perf_counter() - start:.2f}s; {calls or 'no API calls'})")
+
+    print(f"{len(cases) - failures - skipped} passed, {failures} failed, {skipped} skipped")
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
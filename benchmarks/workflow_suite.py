@@ -0,0 +1,260 @@
+"""Import time, run time, event-loop blocking and peak memory of generated workflows.
+
+Every fixture under ``src/tests/code-generator/**/expected_output.py`` and
+every template in ``src/templates/*.json`` (generated with
+``generate_templates.ts``) is imported and run against the offline
+``FakeBackend``. Per case this reports:
+
+* ``import_s``: time to import the generated module, with the runtime
+  packages (``agents``, ``openai``, ``guardrails``) already imported
+* ``run_*_s``: wall time of ``run_workflow`` over ``--repeats`` runs
+* ``blocked_s`` / ``max_block_s``: time the event loop could not run other
+  tasks during a run, measured with a ticker task, summed and longest stall
+* ``peak_bytes``: peak memory of one run, traced separately with tracemalloc
+
+The backend answers instantly by default, so the numbers are the overhead of
+the generated code and the SDKs rather than model latency. Results are
+written as JSON; ``--compare`` prints the change against an earlier file, so
+two generator versions can be compared:
+
+    python benchmarks/workflow_suite.py --output before.json
+    python benchmarks/workflow_suite.py --output after.json --compare before.json
+    python benchmarks/workflow_suite.py --only templates/ --latency responses=0.2
+
+Templates are generated with ``npx vite-node``; pass ``--templates-dir`` to use
+modules generated beforehand, or ``--no-templates`` to skip them.
+"""
+
+import argparse
+import asyncio
+import importlib
+import json
+import platform
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+import tracemalloc
+from pathlib import Path
+
+from _generated import FIXTURES_DIR, REPO_ROOT, load_generated_module, watchdog
+from fake_backend import FakeBackend, schema_instance
+from run_offline import parse_assignments
+
+RUNTIME_PACKAGES = ("agents", "openai", "pydantic", "guardrails")
+
+
+class LoopMonitor:
+    """Ticker task that records how late the event loop wakes it up."""
+
+    def __init__(self, interval: float, threshold: float):
+        self.interval = interval
+        self.threshold = threshold
+        self.blocked = 0.0
+        self.max_block = 0.0
+        self._task = None
+
+    async def _tick(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            expected = loop.time() + self.interval
+            await asyncio.sleep(self.interval)
+            # Lateness below the threshold is timer jitter, not blocking code
+            lag = loop.time() - expected
+            if lag > self.threshold:
+                self.blocked += lag
+                self.max_block = max(self.max_block, lag)
+
+    def start(self):
+        self._task = asyncio.create_task(self._tick())
+
+    async def stop(self):
+        self._task.cancel()
+        try:
+            await self._task
+        except asyncio.CancelledError:
+            pass
+
+
+def collect_cases(args, templates_dir) -> list[tuple[str, Path]]:
+    cases = [
+        ("fixtures/" + str(path.parent.relative_to(FIXTURES_DIR)), path)
+        for path in sorted(FIXTURES_DIR.glob("**/expected_output.py"))
+    ]
+    if templates_dir is not None:
+        cases += [("templates/" + path.stem, path) for path in sorted(Path(templates_dir).glob("*.py"))]
+    return [(label, path) for label, path in cases if args.only in label]
+
+
+def generate_templates(output_dir: str) -> bool:
+    command = ["npx", "vite-node", "benchmarks/generate_templates.ts", "--", output_dir]
+    try:
+        subprocess.run(command, cwd=REPO_ROOT, check=True, capture_output=True, text=True)
+    except (OSError, subprocess.CalledProcessError) as error:
+        detail = getattr(error, "stderr", None) or error
+        print(f"could not generate templates ({' '.join(command)}): {detail}", file=sys.stderr)
+        return False
+    return True
+
+
+def fresh_node_cache(module, cache_dir: str, run: int) -> None:
+    # Every run starts cold, so cached nodes call the backend each time
+    if hasattr(module, "NodeResultCache"):
+        module.node_cache = module.NodeResultCache(path=f"{cache_dir}/{module.__name__}_{run}.sqlite3")
+
+
+async def run_once(module, workflow_input, monitor: LoopMonitor, timeout: float) -> float:
+    monitor.start()
+    start = time.perf_counter()
+    try:
+        await asyncio.wait_for(module.run_workflow(workflow_input), timeout)
+    finally:
+        elapsed = time.perf_counter() - start
+        await monitor.stop()
+    return elapsed
+
+
+def measure_case(label: str, path: Path, args, latency: dict, cache_dir: str) -> dict:
+    backend = FakeBackend(latency, seed=args.seed)
+    name = "bench_" + "".join(c if c.isalnum() else "_" for c in label)
+    start = time.perf_counter()
+    with backend.fake_mcp():
+        module = load_generated_module(path, name)
+    import_s = time.perf_counter() - start
+    backend.install(module)
+
+    workflow_input = module.WorkflowInput(**schema_instance(module.WorkflowInput.model_json_schema()))
+
+    def run(index: int, monitor: LoopMonitor) -> float:
+        fresh_node_cache(module, cache_dir, index)
+        with watchdog(args.timeout + 1):
+            return asyncio.run(run_once(module, workflow_input, monitor, args.timeout))
+
+    for index in range(args.warmup):
+        run(index, LoopMonitor(args.tick, args.block_threshold))
+
+    times, blocked, max_block = [], [], 0.0
+    for index in range(args.repeats):
+        monitor = LoopMonitor(args.tick, args.block_threshold)
+        times.append(run(args.warmup + index, monitor))
+        blocked.append(monitor.blocked)
+        max_block = max(max_block, monitor.max_block)
+
+    # Traced separately: tracemalloc slows allocation enough to skew the timings
+    tracemalloc.start()
+    try:
+        run(args.warmup + args.repeats, LoopMonitor(args.tick, args.block_threshold))
+        _, peak = tracemalloc.get_traced_memory()
+    finally:
+        tracemalloc.stop()
+
+    runs = args.warmup + args.repeats + 1
+    return {
+        "import_s": import_s,
+        "run_min_s": min(times),
+        "run_median_s": statistics.median(times),
+        "run_mean_s": statistics.fmean(times),
+        "blocked_s": statistics.median(blocked),
+        "max_block_s": max_block,
+        "peak_bytes": peak,
+        "api_calls": {
+            endpoint: stats.calls // runs for endpoint, stats in backend.stats.items() if stats.calls
+        },
+    }
+
+
+def git_revision() -> str | None:
+    try:
+        result = subprocess.run(
+            ["git", "rev-parse", "--short", "HEAD"], cwd=REPO_ROOT, capture_output=True, text=True, check=True
+        )
+    except (OSError, subprocess.CalledProcessError):
+        return None
+    return result.stdout.strip()
+
+
+def print_results(results: dict, baseline: dict | None) -> None:
+    header = f"{'case':<70} {'import':>9} {'run p50':>9} {'blocked':>9} {'peak KiB':>9}"
+    if baseline is not None:
+        header += f" {'run vs base':>12}"
+    print(header)
+    for label, case in results["cases"].items():
+        if "error" in case:
+            print(f"{label:<70} {case['error']}")
+            continue
+        line = (
+            f"{label:<70} {case['import_s'] * 1e3:7.2f}ms {case['run_median_s'] * 1e3:7.2f}ms"
+            f" {case['blocked_s'] * 1e3:7.2f}ms {case['peak_bytes'] / 1024:9.1f}"
+        )
+        before = (baseline or {}).get("cases", {}).get(label, {})
+        if "run_median_s" in before:
+            change = case["run_median_s"] / before["run_median_s"] - 1
+            line += f" {change:+11.1%}"
+        print(line)
+
+
+def main() -> int:
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    parser.add_argument("--only", default="", help="run cases whose label contains this")
+    parser.add_argument("--latency", action="append", default=[], metavar="ENDPOINT=SPEC")
+    parser.add_argument("--repeats", type=int, default=5)
+    parser.add_argument("--warmup", type=int, default=1)
+    parser.add_argument("--timeout", type=float, default=30.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--tick", type=float, default=0.001, help="event loop monitor interval (s)")
+    parser.add_argument("--block-threshold", type=float, default=0.002, help="lag counted as blocking (s)")
+    parser.add_argument("--templates-dir", help="directory of modules from generate_templates.ts")
+    parser.add_argument("--no-templates", action="store_true")
+    parser.add_argument("--output", default="workflow_suite.json")
+    parser.add_argument("--compare", metavar="RESULTS_JSON")
+    args = parser.parse_args()
+
+    latency = parse_assignments(args.latency, "--latency")
+    baseline = json.loads(Path(args.compare).read_text()) if args.compare else None
+
+    # Import time is the generated module's own; the SDKs are loaded once up front
+    for package in RUNTIME_PACKAGES:
+        try:
+            importlib.import_module(package)
+        except ImportError:
+            pass
+
+    results = {
+        "meta": {
+            "revision": git_revision(),
+            "created_at": time.time(),
+            "python": platform.python_version(),
+            "platform": platform.platform(),
+            "latency": latency,
+            "repeats": args.repeats,
+            "warmup": args.warmup,
+        },
+        "cases": {},
+    }
+
+    with tempfile.TemporaryDirectory() as work_dir:
+        templates_dir = args.templates_dir
+        if templates_dir is None and not args.no_templates:
+            templates_dir = f"{work_dir}/templates"
+            if not generate_templates(templates_dir):
+                templates_dir = None
+        if args.no_templates:
+            templates_dir = None
+
+        for label, path in collect_cases(args, templates_dir):
+            try:
+                results["cases"][label] = measure_case(label, path, args, latency, work_dir)
+            except Exception as error:
+                # Invalid or failing generated code is recorded, not measured
+                results["cases"][label] = {"error": f"{type(error).__name__}: {error}"}
+
+    Path(args.output).write_text(json.dumps(results, indent=2) + "\n")
+    print_results(results, baseline)
+    measured = sum("error" not in case for case in results["cases"].values())
+    print(f"{measured} of {len(results['cases'])} cases measured; results written to {args.output}")
+    return 0
+
+
+if __name__ == "__main__":
+    sys.exit(main())
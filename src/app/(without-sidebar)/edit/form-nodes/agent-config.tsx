@@ -25,6 +25,8 @@ import { useEffect, useMemo, useState } from 'react'
 import { DialogSchemaJSON } from './components/dialog-schema-json'
 import { DialogToolsJSON } from './components/dialog-tools-json'
 import { FormInput } from './components/form-input'
+import { NodeCacheConfig } from './components/node-cache-config'
+import { RetryPolicyConfig } from './components/retry-policy-config'
 import {
   FormSelect,
   FormSelectContent,
@@ -349,6 +351,18 @@ export function AgentConfig({
         )}
       </div>
 
+      {/* Result cache */}
+      <NodeCacheConfig
+        value={config.cache}
+        onChange={(cache) => updateField('cache', cache)}
+      />
+
+      {/* Retries and hedging */}
+      <RetryPolicyConfig
+        value={config.retry}
+        onChange={(retry) => updateField('retry', retry)}
+      />
+
       <DialogToolsJSON
         open={isDialogToolsFunc}
         onOpenChange={setIsDialogToolsFunc}
@@ -0,0 +1,75 @@
+'use client'
+
+import { Label } from '@/components/ui/label'
+import { Switch } from '@/components/ui/switch'
+import { NodeCacheConfig as NodeCacheSettings } from '@/lib/nodes/types'
+import { FormInput } from './form-input'
+import {
+  FormSelect,
+  FormSelectContent,
+  FormSelectItem,
+  FormSelectTrigger,
+  FormSelectValue,
+} from './form-select'
+import { IconTooltip } from './icon-tooltip'
+
+interface NodeCacheConfigProps {
+  value?: NodeCacheSettings
+  onChange: (value: NodeCacheSettings) => void
+}
+
+/**
+ * Result cache settings shared by the Agent, File Search and MCP panels.
+ * Stored as `config.cache`.
+ */
+export function NodeCacheConfig({ value, onChange }: NodeCacheConfigProps) {
+  const cache = value || {}
+
+  return (
+    <div className="flex flex-col gap-2">
+      <div className="flex items-center justify-between gap-2">
+        <Label className="leading-8">
+          Cache results
+          <IconTooltip content="Reuse the result of a previous run with the same configuration and inputs instead of calling the service again." />
+        </Label>
+        <Switch
+          id="node-cache-switch"
+          checked={cache.enabled || false}
+          onCheckedChange={(checked) => onChange({ ...cache, enabled: checked })}
+        />
+      </div>
+
+      {cache.enabled && (
+        <>
+          <FormSelect
+            label="Storage"
+            value={cache.backend || 'memory'}
+            onValueChange={(backend) =>
+              onChange({ ...cache, backend: backend as 'memory' | 'sqlite' })
+            }
+          >
+            <FormSelectTrigger>
+              <FormSelectValue />
+            </FormSelectTrigger>
+            <FormSelectContent>
+              <FormSelectItem value="memory">In memory</FormSelectItem>
+              <FormSelectItem value="sqlite">SQLite file</FormSelectItem>
+            </FormSelectContent>
+          </FormSelect>
+
+          <div className="flex flex-col gap-1">
+            <Label className="leading-8">TTL (seconds)</Label>
+            <FormInput
+              type="number"
+              value={cache.ttl_seconds ?? ''}
+              onValueChange={(ttl: string) =>
+                onChange({ ...cache, ttl_seconds: ttl })
+              }
+              placeholder="Keep until evicted"
+            />
+          </div>
+        </>
+      )}
+    </div>
+  )
+}
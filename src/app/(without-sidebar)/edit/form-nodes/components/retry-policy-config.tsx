@@ -0,0 +1,69 @@
+'use client'
+
+import { Label } from '@/components/ui/label'
+import { Switch } from '@/components/ui/switch'
+import { RetryPolicyConfig as RetryPolicySettings } from '@/lib/nodes/types'
+import { FormInput } from './form-input'
+import { IconTooltip } from './icon-tooltip'
+
+interface RetryPolicyConfigProps {
+  value?: RetryPolicySettings
+  onChange: (value: RetryPolicySettings | undefined) => void
+}
+
+const FIELDS: {
+  key: keyof RetryPolicySettings
+  label: string
+  placeholder: string
+}[] = [
+  { key: 'max_attempts', label: 'Max attempts', placeholder: '1' },
+  {
+    key: 'attempt_timeout_seconds',
+    label: 'Attempt timeout (seconds)',
+    placeholder: 'No timeout',
+  },
+  { key: 'backoff_seconds', label: 'Backoff (seconds)', placeholder: '0.5' },
+  {
+    key: 'hedge_percentile',
+    label: 'Hedge after latency percentile',
+    placeholder: 'No hedging',
+  },
+]
+
+/**
+ * Retry and hedging policy of the Agent panel, stored as `config.retry`.
+ */
+export function RetryPolicyConfig({ value, onChange }: RetryPolicyConfigProps) {
+  return (
+    <div className="flex flex-col gap-2">
+      <div className="flex items-center justify-between gap-2">
+        <Label className="leading-8">
+          Retry slow or failed calls
+          <IconTooltip content="Retry timed out and transient failures with exponential backoff, and optionally send a duplicate request when a call is slower than usual. Streamed runs are never duplicated, and stop timing out and retrying once they produce text." />
+        </Label>
+        <Switch
+          id="retry-policy-switch"
+          checked={value !== undefined}
+          onCheckedChange={(checked) =>
+            onChange(checked ? { max_attempts: 3 } : undefined)
+          }
+        />
+      </div>
+
+      {value &&
+        FIELDS.map(({ key, label, placeholder }) => (
+          <div key={key} className="flex flex-col gap-1">
+            <Label className="leading-8">{label}</Label>
+            <FormInput
+              type="number"
+              value={value[key] ?? ''}
+              onValueChange={(input: string) =>
+                onChange({ ...value, [key]: input })
+              }
+              placeholder={placeholder}
+            />
+          </div>
+        ))}
+    </div>
+  )
+}
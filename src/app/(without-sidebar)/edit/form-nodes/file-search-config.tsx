@@ -3,6 +3,7 @@ import { Label } from '@/components/ui/label'
 import { ConfigComponentProps } from '@/lib/nodes/types'
 import { setNestedValue } from '@/lib/utils/path-utils'
 import { FormInput } from './components/form-input'
+import { NodeCacheConfig } from './components/node-cache-config'
 import { FormTextarea } from './components/form-textarea'
 
 export const FileSearchConfig: React.FC<ConfigComponentProps> = ({
@@ -54,6 +55,12 @@ export const FileSearchConfig: React.FC<ConfigComponentProps> = ({
           rows={4}
         />
       </div>
+
+      {/* Result cache */}
+      <NodeCacheConfig
+        value={config.cache}
+        onChange={(cache) => onChange({ ...config, cache })}
+      />
     </div>
   )
 }
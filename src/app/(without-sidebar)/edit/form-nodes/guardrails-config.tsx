@@ -24,6 +24,7 @@ import {
   FormSelectValue,
 } from './components/form-select'
 import { IconTooltip } from './components/icon-tooltip'
+import { NodeCacheConfig } from './components/node-cache-config'
 import { VariableItem } from './components/variable-item'
 
 interface GuardrailItem {
@@ -641,6 +642,20 @@ export const GuardrailsConfig: React.FC<ConfigComponentProps> = ({
     updateField('guardrails', newGuardrails)
   }
 
+  const piiGuardrail = (config.guardrails as GuardrailItem[]).find(
+    (item) => item.type === 'pii'
+  )
+
+  // Local engine: in-process matching instead of Presidio
+  const changePiiEngine = (local: boolean) => {
+    const guardrails = (config.guardrails as GuardrailItem[]).map((g) => {
+      if (g.type !== 'pii') return g
+      const { engine: _engine, ...rest } = g.config
+      return { ...g, config: local ? { ...rest, engine: 'local' } : rest }
+    })
+    updateField('guardrails', guardrails)
+  }
+
   useEffect(() => {
     const guardrails = config.guardrails as GuardrailItem[]
     setPiiEnabled(!!guardrails.find((item) => item.type === 'pii'))
@@ -757,6 +772,20 @@ export const GuardrailsConfig: React.FC<ConfigComponentProps> = ({
           />
         </div>
 
+        {piiEnabled && (
+          <div className="flex items-center justify-between gap-2">
+            <Label className="leading-8">
+              Detect PII locally
+              <IconTooltip content="Detects emails, phone numbers, card numbers and IBANs with local pattern matching instead of Presidio." />
+            </Label>
+            <Switch
+              id="pii-local-switch"
+              checked={piiGuardrail?.config.engine === 'local'}
+              onCheckedChange={changePiiEngine}
+            />
+          </div>
+        )}
+
         <div className="flex items-center justify-between gap-2">
           <Label className="leading-8">
             Moderation
@@ -794,6 +823,25 @@ export const GuardrailsConfig: React.FC<ConfigComponentProps> = ({
             }
           />
         </div>
+
+        <div className="flex items-center justify-between gap-2">
+          <Label className="leading-8">
+            Start next agent early
+            <IconTooltip content="When enabled, the agent on the pass branch starts while the checks run and is cancelled if they fail." />
+          </Label>
+          <Switch
+            id="speculative-agent-switch"
+            checked={config.speculative_agent || false}
+            onCheckedChange={(checked) =>
+              updateField('speculative_agent', checked)
+            }
+          />
+        </div>
+
+        <NodeCacheConfig
+          value={config.cache}
+          onChange={(cache) => updateField('cache', cache)}
+        />
       </div>
     </TooltipProvider>
   )
@@ -15,6 +15,8 @@ export { WhileConfigForm } from './while-config'
 export { EndConfigForm } from './end-config'
 export { StartConfigForm } from './start-config'
 
+export { NodeCacheConfig } from './components/node-cache-config'
+
 // Export a common config props type
 export interface BaseConfigProps {
   nodeId: string
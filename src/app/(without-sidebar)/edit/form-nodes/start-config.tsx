@@ -1,10 +1,18 @@
 'use client'
 
+import { Label } from '@/components/ui/label'
 import { Separator } from '@/components/ui/separator'
-import { StartConfig, StateVariable } from '@/lib/nodes/definitions/start-node'
+import { Switch } from '@/components/ui/switch'
+import {
+  ConversationHistorySettings,
+  StartConfig,
+  StateVariable,
+} from '@/lib/nodes/definitions/start-node'
 import { Plus } from 'lucide-react'
 import { FormButton } from './components/form-button'
+import { FormInput } from './components/form-input'
 import { FormLabel } from './components/form-label'
+import { IconTooltip } from './components/icon-tooltip'
 import { VariableConfig } from './components/variable-config'
 import { VariableItem } from './components/variable-item'
 
@@ -45,6 +53,20 @@ export function StartConfigForm({ config, onChange }: StartConfigProps) {
     })
   }
 
+  // Update a conversation history setting; empty values remove the budget
+  const handleHistoryChange = (
+    key: keyof ConversationHistorySettings,
+    value: string
+  ) => {
+    onChange({
+      ...config,
+      conversation_history: {
+        ...config.conversation_history,
+        [key]: value,
+      },
+    })
+  }
+
   const validateAddVariableName = (name: string) => {
     if (!name) {
       return 'Name is required'
@@ -123,6 +145,125 @@ export function StartConfigForm({ config, onChange }: StartConfigProps) {
           </div>
         </div>
       </div>
+
+      <Separator className="mt-3 mb-1" />
+
+      <div className="flex flex-col gap-1">
+        <Label className="leading-8">Conversation history budget</Label>
+        <FormInput
+          type="number"
+          value={config.conversation_history?.max_tokens ?? ''}
+          onValueChange={(value: string) =>
+            handleHistoryChange('max_tokens', value)
+          }
+          placeholder="Max tokens (unlimited)"
+        />
+        <FormInput
+          type="number"
+          value={config.conversation_history?.keep_prefix ?? ''}
+          onValueChange={(value: string) =>
+            handleHistoryChange('keep_prefix', value)
+          }
+          placeholder="Always keep first N items (1)"
+        />
+      </div>
+
+      <Separator className="mt-3 mb-1" />
+
+      <div className="flex items-center justify-between gap-2">
+        <Label className="leading-8">
+          Checkpoints
+          <IconTooltip content="Record each Agent, Guardrails, File Search and MCP result so a failed run can be resumed without repeating them." />
+        </Label>
+        <Switch
+          id="start-checkpoints-switch"
+          checked={config.checkpoints?.enabled || false}
+          onCheckedChange={(checked) =>
+            onChange({ ...config, checkpoints: { enabled: checked } })
+          }
+        />
+      </div>
+
+      <div className="flex items-center justify-between gap-2">
+        <Label className="leading-8">
+          Lazy loading
+          <IconTooltip content="Import the SDKs and build the agents on the first run instead of at import time, for faster cold starts. Call warmup() to do it up front." />
+        </Label>
+        <Switch
+          id="start-lazy-loading-switch"
+          checked={config.lazy_loading?.enabled || false}
+          onCheckedChange={(checked) =>
+            onChange({ ...config, lazy_loading: { enabled: checked } })
+          }
+        />
+      </div>
+
+      <div className="flex items-center justify-between gap-2">
+        <Label className="leading-8">
+          Batch entrypoints
+          <IconTooltip content="Add run_workflow_batch and iter_workflow_batch, which run the workflow over many inputs with bounded concurrency." />
+        </Label>
+        <Switch
+          id="start-batch-entrypoints-switch"
+          checked={config.batch_entrypoints?.enabled || false}
+          onCheckedChange={(checked) =>
+            onChange({ ...config, batch_entrypoints: { enabled: checked } })
+          }
+        />
+      </div>
+
+      <div className="flex items-center justify-between gap-2">
+        <Label className="leading-8">
+          Batch moderation requests
+          <IconTooltip content="Send the moderation checks of concurrent runs as one request, waiting at most a few milliseconds for them to arrive." />
+        </Label>
+        <Switch
+          id="start-moderation-batching-switch"
+          checked={config.moderation_batching?.enabled || false}
+          onCheckedChange={(checked) =>
+            onChange({
+              ...config,
+              moderation_batching: {
+                ...config.moderation_batching,
+                enabled: checked,
+              },
+            })
+          }
+        />
+      </div>
+
+      {config.moderation_batching?.enabled && (
+        <div className="flex flex-col gap-2">
+          <FormInput
+            type="number"
+            value={config.moderation_batching.max_batch_size ?? ''}
+            onValueChange={(value: string) =>
+              onChange({
+                ...config,
+                moderation_batching: {
+                  ...config.moderation_batching,
+                  max_batch_size: value,
+                },
+              })
+            }
+            placeholder="Max checks per request (32)"
+          />
+          <FormInput
+            type="number"
+            value={config.moderation_batching.max_wait_ms ?? ''}
+            onValueChange={(value: string) =>
+              onChange({
+                ...config,
+                moderation_batching: {
+                  ...config.moderation_batching,
+                  max_wait_ms: value,
+                },
+              })
+            }
+            placeholder="Max wait in milliseconds (5)"
+          />
+        </div>
+      )}
     </div>
   )
 }
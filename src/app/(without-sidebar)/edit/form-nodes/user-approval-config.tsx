@@ -4,6 +4,13 @@ import { UserApprovalConfig } from '@/lib/nodes/definitions/user-approval-node'
 import { useMemo } from 'react'
 import { useCanvas } from '../canvas/canvas-provider'
 import { FormInput } from './components/form-input'
+import {
+  FormSelect,
+  FormSelectContent,
+  FormSelectItem,
+  FormSelectTrigger,
+  FormSelectValue,
+} from './components/form-select'
 import { FormTextarea } from './components/form-textarea'
 
 interface UserApprovalConfigProps {
@@ -55,6 +62,36 @@ export function UserApprovalConfigForm({
         placeholder="Describe the message to show the user. E.g. ok to process?"
         rows={3}
       />
+
+      {/* Timeout for runs suspended at this approval */}
+      <FormInput
+        label="Timeout (seconds)"
+        type="number"
+        value={config.timeout_seconds ?? ''}
+        onValueChange={(value: string) =>
+          onChange({ ...config, timeout_seconds: value })
+        }
+        placeholder="Wait indefinitely"
+      />
+
+      {config.timeout_seconds !== undefined &&
+        config.timeout_seconds !== '' && (
+          <FormSelect
+            label="On timeout"
+            value={config.on_timeout || 'reject'}
+            onValueChange={(value) =>
+              onChange({ ...config, on_timeout: value as 'approve' | 'reject' })
+            }
+          >
+            <FormSelectTrigger>
+              <FormSelectValue />
+            </FormSelectTrigger>
+            <FormSelectContent>
+              <FormSelectItem value="reject">Reject</FormSelectItem>
+              <FormSelectItem value="approve">Approve</FormSelectItem>
+            </FormSelectContent>
+          </FormSelect>
+        )}
     </div>
   )
 }
@@ -4,14 +4,102 @@ import {
   generatePydanticModel,
   generateStateDict,
 } from './generators/helpers'
+import {
+  generateAgentRuntimeCode,
+  RUN_AGENT_NODE,
+  WORKFLOW_STREAMED_ENTRYPOINT,
+} from './generators/agent-runtime'
+import {
+  usesBatchEntrypoints,
+  WORKFLOW_BATCH_ENTRYPOINTS,
+} from './generators/batch-runtime'
+import {
+  applyCheckpointVariables,
+  CHECKPOINT_ENTRYPOINTS,
+  CHECKPOINT_UTILS,
+  hasCheckpoints,
+} from './generators/checkpoints'
+import {
+  applyConversationHistoryBudget,
+  CONVERSATION_HISTORY_UTILS,
+  getConversationHistoryConfig,
+} from './generators/conversation-history'
+import {
+  CONVERSATION_HISTORY,
+  generateNodeStepsCode,
+  NodeStep,
+} from './generators/dataflow'
+import {
+  dropUnreadReasoningSummaries,
+  eliminateDeadOutputs,
+} from './generators/dead-outputs'
+import { internDefinitions } from './generators/definition-interning'
+import {
+  applyDurableApprovals,
+  DURABLE_APPROVAL_ENTRYPOINTS,
+  DURABLE_APPROVAL_UTILS,
+  generateApprovalCall,
+  generateApprovalRequestFunction,
+} from './generators/durable-approvals'
 import { generateBinaryApprovalNodeCode } from './generators/nodes/binary-approval-node'
-import { generateFileSearchNodeCode } from './generators/nodes/file-search-node'
+import {
+  generateFileSearchNodeStep,
+  getFileSearchResultVar,
+} from './generators/nodes/file-search-node'
 import { generateGuardrailsNodeCode } from './generators/nodes/guardrails-node'
 import { generateIfElseNodeCode } from './generators/nodes/if-else-node'
-import { generateMcpNodeCode } from './generators/nodes/mcp-node'
+import {
+  CACHED_COST_ORDER_GUARDRAILS,
+  GUARDRAIL_CACHE_UTILS,
+} from './generators/guardrail-cache'
+import {
+  applyLazyLoading,
+  usesLazyLoading,
+} from './generators/lazy-loading'
+import {
+  isLocalPIIGuardrail,
+  LOCAL_PII_IMPORTS,
+  LOCAL_PII_UTILS,
+  usesLocalPII,
+} from './generators/local-pii'
+import {
+  generateModerationBatchingCode,
+  getModerationBatching,
+} from './generators/moderation-batching'
+import { generateMcpNodeStep } from './generators/nodes/mcp-node'
+import { generateNodeHooksCode, RUN_NODE } from './generators/node-hooks'
+import {
+  addRateLimitedClientImports,
+  generateRateLimitedClientCode,
+  MODERATION_RATE_LIMIT_KEY,
+  RATE_LIMIT_UTILS,
+  RATE_LIMITED_GUARDRAILS,
+  RATE_LIMITED_SEARCH,
+} from './generators/rate-limiter'
+import {
+  applyAgentNodeCache,
+  getNodeCacheConfig,
+  NODE_CACHE_UTILS,
+  RECORDED_RESULTS,
+} from './generators/node-cache'
 import { generateSetStateNodeCode } from './generators/nodes/set-state-node'
+import {
+  returnStructuredOutputsAsDicts,
+  STRUCTURED_OUTPUT,
+  STRUCTURED_OUTPUT_UTILS,
+} from './generators/structured-output'
+import {
+  generateRetryPolicyCode,
+  RETRY_POLICY_UTILS,
+} from './generators/retry-policy'
+import {
+  generateSpeculativeGuardrailsCode,
+  getSpeculativeAgent,
+  SPECULATIVE_AGENT_UTILS,
+} from './generators/speculative-agents'
 import { generateTransformNodeCode } from './generators/nodes/transform-node'
 import { generateWhileLoopNodeCode } from './generators/nodes/while-node'
+import { WORKFLOW_JOURNAL_UTILS } from './generators/workflow-journal'
 import { Edge, Workflow, WorkflowNode } from './types/workflow'
 
 // --- Helper Functions ---
@@ -272,7 +360,7 @@ const generateAgentCode = (
     )
   )
 )
-`
+${generateRetryPolicyCode(agentNode)}`
 
   return { agentCode, schemaModels, agentVarName }
 }
@@ -409,7 +497,8 @@ ${nestedIndent}    *conversation_history`
       }
 
       code += `
-${nestedIndent}${tempVar} = await Runner.run(
+${nestedIndent}${tempVar} = await run_agent_node(
+${nestedIndent}  "${caseNode.id}",
 ${nestedIndent}  ${agentVar},
 ${nestedIndent}  input=[${inputContent}
 ${nestedIndent}  ]
@@ -651,7 +740,8 @@ const generateWhileBodyCode = (
         agentResultTempCount > 0 ? String(agentResultTempCount) : ''
 
       bodyCode += `
-${indent}agent_result_temp${agentResultTempSuffix} = await Runner.run(
+${indent}agent_result_temp${agentResultTempSuffix} = await run_agent_node(
+${indent}  "${currentNode.id}",
 ${indent}  ${agentVarName},
 ${indent}  input=[
 ${indent}    *conversation_history
@@ -725,7 +815,8 @@ ${indent}${caseIdx === 0 ? 'if' : 'elif'} ${pythonPredicate}:`
               agentResultTempCount > 0 ? String(agentResultTempCount) : ''
 
             bodyCode += `
-${indent}  agent_result_temp${agentResultTempSuffix} = await Runner.run(
+${indent}  agent_result_temp${agentResultTempSuffix} = await run_agent_node(
+${indent}    "${caseNode.id}",
 ${indent}    ${agentVarName},
 ${indent}    input=[
 ${indent}      *conversation_history
@@ -924,6 +1015,12 @@ export const generatePythonSDK = (
     // Check if there's an MCP node
     const hasMcp = nodes.some((n) => n.node_type === 'builtins.MCP')
 
+    // Token budget for conversation_history, if configured on the Start node
+    const conversationHistoryConfig = getConversationHistoryConfig(nodes)
+
+    // Nodes that opted into the result cache
+    const hasNodeCache = nodes.some((n) => getNodeCacheConfig(n) !== null)
+
     // Check for web_search tools in Agent nodes
     nodes.forEach((node) => {
       if (node.node_type === 'builtins.Agent' && node.config?.tools) {
@@ -975,13 +1072,11 @@ export const generatePythonSDK = (
           (n) => n.node_type === 'builtins.BinaryApproval'
         )
 
-        userApprovalNodes.forEach((_, index) => {
+        userApprovalNodes.forEach((approvalNode, index) => {
           const approvalVarName =
             index === 0 ? 'approval_request' : `approval_request${index}`
           topLevelCode += `
-def ${approvalVarName}(message: str):
-  # TODO: Implement
-  return True
+${generateApprovalRequestFunction(approvalVarName, approvalNode)}
 `
         })
       }
@@ -1202,7 +1297,8 @@ def ${approvalVarName}(message: str):
           const agentTempVar = `agent_result_temp${resultVarSuffix}`
           const agentResultVar = `agent_result${resultVarSuffix}`
 
-          const agentExecutionCode = `${indent}${agentTempVar} = await Runner.run(
+          const agentExecutionCode = `${indent}${agentTempVar} = await run_agent_node(
+${indent}  "${node.id}",
 ${indent}  ${agentVarName},
 ${indent}  input=[
 ${indent}    *conversation_history
@@ -1311,32 +1407,49 @@ ${indent}}`
             break
           }
         } else if (node.node_type === 'builtins.tool.FileSearch') {
-          const fileSearchCode = generateFileSearchNodeCode(node)
-          // generateFileSearchNodeCode returns code with leading newline and 2-space indent
-          const fileSearchLines = fileSearchCode.split('\n')
-          const adjustedFileSearchCode = fileSearchLines
-            .map((line) => {
-              if (!line) return ''
-              return line.replace(/^  /, indent)
-            })
-            .join('\n')
-          code += adjustedFileSearchCode
-          const nextFileSearchEdge = edges.find(
-            (e) => e.source_node_id === nodeId && e.source_port_id === 'out'
+          // Consecutive searches in a branch don't depend on each other,
+          // so collect the whole run and let the dataflow pass issue them together
+          const searchSteps: NodeStep[] = []
+          let searchNode: WorkflowNode | undefined = node
+          let nextFileSearchEdge: Edge | undefined
+          while (searchNode) {
+            visitedNodeIds.add(searchNode.id)
+            searchSteps.push(
+              generateFileSearchNodeStep(searchNode, searchSteps.length, indent)
+            )
+            const searchNodeId: string = searchNode.id
+            nextFileSearchEdge = edges.find(
+              (e) =>
+                e.source_node_id === searchNodeId &&
+                (e.source_port_id === 'out' || e.source_port_id === 'on_result')
+            )
+            const followingNode = nextFileSearchEdge
+              ? nodes.find((n) => n.id === nextFileSearchEdge!.target_node_id)
+              : undefined
+            searchNode =
+              followingNode?.node_type === 'builtins.tool.FileSearch' &&
+              !visitedNodeIds.has(followingNode.id)
+                ? followingNode
+                : undefined
+          }
+          code += generateNodeStepsCode(searchSteps, indent)
+
+          const lastFileSearchVar = getFileSearchResultVar(
+            searchSteps.length - 1
           )
           if (nextFileSearchEdge) {
             const nextNode = nodes.find(
-              (n) => n.id === nextFileSearchEdge.target_node_id
+              (n) => n.id === nextFileSearchEdge!.target_node_id
             )
             if (nextNode?.node_type === 'builtins.End') {
-              code += `\n${indent}return filesearch_result`
+              code += `\n${indent}return ${lastFileSearchVar}`
               break
             }
             nodeId = nextFileSearchEdge.target_node_id
             nextPort = 'on_result'
             continue
           } else {
-            code += `\n${indent}return filesearch_result`
+            code += `\n${indent}return ${lastFileSearchVar}`
             break
           }
         } else if (node.node_type === 'builtins.Guardrails') {
@@ -1380,7 +1493,7 @@ ${indent}}`
 
           code += `\n${indent}approval_message = ${pythonMessage || '""'}`
           code += `\n${indent}`
-          code += `\n${indent}if approval_request(approval_message):`
+          code += `\n${indent}if ${generateApprovalCall('approval_request', 'approval_message')}:`
 
           // Find the approval branch (on_approve port)
           const approveEdge = edges.find(
@@ -1544,6 +1657,21 @@ ${indent}}`
     const agentsPreGenerated =
       hasAgent && edges.length > 0 && whileBodyNodes.length > 0
 
+    // Agent, FileSearch and MCP calls are buffered as steps so the dataflow
+    // pass can issue independent ones concurrently
+    const stepNodeTypes = [
+      'builtins.Agent',
+      'builtins.tool.FileSearch',
+      'builtins.MCP',
+    ]
+    let pendingSteps: NodeStep[] = []
+    // Guardrails node waiting for the Agent it starts speculatively
+    let speculativeGuardrails: { agentId: string; code: string } | undefined
+    const flushPendingSteps = () => {
+      mainFunctionBody += generateNodeStepsCode(pendingSteps)
+      pendingSteps = []
+    }
+
     // Traverse nodes
     while (currentNode) {
       const edge = edges.find((e) => e.source_node_id === currentNode!.id)
@@ -1552,6 +1680,11 @@ ${indent}}`
       const nextNode = nodes.find((n) => n.id === edge.target_node_id)
       if (!nextNode) break
 
+      // Every other node kind may observe buffered results, so emit them first
+      if (!stepNodeTypes.includes(nextNode.node_type)) {
+        flushPendingSteps()
+      }
+
       if (nextNode.node_type === 'builtins.Agent') {
         hasAgent = true
         // Count total Agent nodes in the workflow
@@ -1672,60 +1805,67 @@ ${indent}}`
           return false
         })
 
-        mainFunctionBody += `
-  ${resultVarPrefix}_temp${resultVarSuffix} = await Runner.run(
-    ${agentVarName},
-    input=[
-      *conversation_history${agentMessagesFormatted}
-    ]
-  )`
+        const agentTempVar = `${resultVarPrefix}_temp${resultVarSuffix}`
+        const agentResultVar = `${resultVarPrefix}${resultVarSuffix}`
 
         // Extend conversation history if:
         // 1. There are more Agent nodes after this one, OR
         // 2. This is a single Agent workflow, OR
         // 3. This workflow has an End node (to keep history for final result)
-        if (hasNextAgentNode || totalAgentNodes === 1 || hasEndNode) {
-          mainFunctionBody += `
+        const extendsHistory =
+          hasNextAgentNode || totalAgentNodes === 1 || hasEndNode
 
-  conversation_history.extend([item.to_input_item() for item in ${resultVarPrefix}_temp${resultVarSuffix}.new_items])`
+        let agentPostCode = ''
+        if (extendsHistory) {
+          agentPostCode += `
+
+  conversation_history.extend([item.to_input_item() for item in ${agentTempVar}.new_items])`
         }
 
         // Add newline before result assignment if conversation_history was extended
-        const needsNewline =
-          hasNextAgentNode || totalAgentNodes === 1 || hasEndNode
+        agentPostCode += extendsHistory ? '\n\n' : '\n'
 
         // Check if this agent has JSON schema output
         if (hasJsonSchema) {
-          mainFunctionBody += needsNewline
-            ? `
-
-  ${resultVarPrefix}${resultVarSuffix} = {
-    "output_text": ${resultVarPrefix}_temp${resultVarSuffix}.final_output.json(),
-    "output_parsed": ${resultVarPrefix}_temp${resultVarSuffix}.final_output.model_dump()
-  }`
-            : `
-  ${resultVarPrefix}${resultVarSuffix} = {
-    "output_text": ${resultVarPrefix}_temp${resultVarSuffix}.final_output.json(),
-    "output_parsed": ${resultVarPrefix}_temp${resultVarSuffix}.final_output.model_dump()
-  }`
+          // Serialized when "output_text" or "output_parsed" is first read
+          agentPostCode += `  ${agentResultVar} = ${STRUCTURED_OUTPUT}(${agentTempVar}.final_output)`
         } else {
-          mainFunctionBody += needsNewline
-            ? `
-
-  ${resultVarPrefix}${resultVarSuffix} = {
-    "output_text": ${resultVarPrefix}_temp${resultVarSuffix}.final_output_as(str)
-  }`
-            : `
-  ${resultVarPrefix}${resultVarSuffix} = {
-    "output_text": ${resultVarPrefix}_temp${resultVarSuffix}.final_output_as(str)
+          agentPostCode += `  ${agentResultVar} = {
+    "output_text": ${agentTempVar}.final_output_as(str)
   }`
         }
+
+        const agentStep: NodeStep = {
+          nodeId: nextNode.id,
+          call: {
+            target: agentTempVar,
+            expression: `run_agent_node(
+    "${nextNode.id}",
+    ${agentVarName},
+    input=[
+      *conversation_history${agentMessagesFormatted}
+    ]
+  )`,
+          },
+          post: agentPostCode,
+          reads: [CONVERSATION_HISTORY],
+          writes: extendsHistory
+            ? [agentTempVar, agentResultVar, CONVERSATION_HISTORY]
+            : [agentTempVar, agentResultVar],
+        }
+        if (speculativeGuardrails?.agentId === nextNode.id) {
+          // Started while the preceding guardrail check runs
+          mainFunctionBody += generateSpeculativeGuardrailsCode(
+            speculativeGuardrails.code,
+            agentStep
+          )
+          speculativeGuardrails = undefined
+        } else {
+          pendingSteps.push(agentStep)
+        }
       } else if (nextNode.node_type === 'builtins.tool.FileSearch') {
         // Handle FileSearch node
-        mainFunctionBody += generateFileSearchNodeCode(
-          nextNode,
-          fileSearchIndex
-        )
+        pendingSteps.push(generateFileSearchNodeStep(nextNode, fileSearchIndex))
         fileSearchIndex++
       } else if (nextNode.node_type === 'builtins.Guardrails') {
         // Handle Guardrails node
@@ -1806,9 +1946,22 @@ ${indent}}`
           )
         }
 
+        const speculativeAgent = getSpeculativeAgent(
+          nextNode,
+          nodes,
+          edges,
+          guardrailsIndex
+        )
+
         // For the first guardrails node, add its code directly
         // For subsequent nodes, they should be in the else block
-        if (guardrailsIndex === 0) {
+        if (speculativeAgent) {
+          // Emitted together with the agent on its pass branch
+          speculativeGuardrails = {
+            agentId: speculativeAgent.id,
+            code: guardrailsCode,
+          }
+        } else if (guardrailsIndex === 0) {
           mainFunctionBody += guardrailsCode
         } else {
           // Replace the last "else:\n    return" with "else:" followed by the new code
@@ -1870,7 +2023,7 @@ ${indent}}`
         mainFunctionBody += generateWhileLoopNodeCode(nextNode, 0, bodyCode)
       } else if (nextNode.node_type === 'builtins.MCP') {
         // Handle MCP node
-        mainFunctionBody += generateMcpNodeCode(nextNode, mcpIndex)
+        pendingSteps.push(generateMcpNodeStep(nextNode, mcpIndex))
         mcpIndex++
       } else if (nextNode.node_type === 'builtins.BinaryApproval') {
         // Handle BinaryApproval node
@@ -1957,7 +2110,7 @@ ${indent}}`
               const approvalVarName =
                 i === 0 ? 'approval_request' : `approval_request${i}`
               if (!topLevelCode.includes(`def ${approvalVarName}(`)) {
-                topLevelCode += `\n\ndef ${approvalVarName}(message: str):\n  # TODO: Implement\n  return True`
+                topLevelCode += `\n\n${generateApprovalRequestFunction(approvalVarName, approvalsWithAgents[i])}`
                 // Add blank line only after the last approval function
                 if (i === approvalsWithAgents.length - 1 && hasIfElseInChain) {
                   topLevelCode += '\n'
@@ -1988,7 +2141,7 @@ ${indent}}`
               code += `
 ${indent}${messageVar} = "${message}"
 
-${indent}if ${approvalVarName}(${messageVar}):`
+${indent}if ${generateApprovalCall(approvalVarName, messageVar)}:`
 
               // Check if there's an agent after this approval
               const approveEdge = edges.find(
@@ -2036,7 +2189,8 @@ ${nestedIndent}    *conversation_history`
                   }
 
                   code += `
-${nestedIndent}${tempVar} = await Runner.run(
+${nestedIndent}${tempVar} = await run_agent_node(
+${nestedIndent}  "${approveNode.id}",
 ${nestedIndent}  ${agentVar},
 ${nestedIndent}  input=[${inputContent}
 ${nestedIndent}  ]
@@ -2159,7 +2313,7 @@ ${nestedIndent}pass`
             const approvalVarName =
               i === 0 ? 'approval_request' : `approval_request${i}`
             if (!topLevelCode.includes(`def ${approvalVarName}(`)) {
-              topLevelCode += `\n\ndef ${approvalVarName}(message: str):\n  # TODO: Implement\n  return True`
+              topLevelCode += `\n\n${generateApprovalRequestFunction(approvalVarName, approvalChain[i])}`
             }
           }
 
@@ -2175,7 +2329,8 @@ ${nestedIndent}pass`
               if (agentCode) {
                 const indent = '  '.repeat(indentLevel)
                 code += `
-${indent}agent_result_temp = await Runner.run(
+${indent}agent_result_temp = await run_agent_node(
+${indent}  "${finalNode!.id}",
 ${indent}  agent,
 ${indent}  input=[
 ${indent}    *conversation_history
@@ -2206,7 +2361,7 @@ ${indent}return agent_result`
             code += `
 ${currentIndent}${approvalMessageVar} = "${message}"
 
-${currentIndent}if ${approvalVarName}(${approvalMessageVar}):`
+${currentIndent}if ${generateApprovalCall(approvalVarName, approvalMessageVar)}:`
 
             // Recursively add next approval or final content
             code += traverseUserApprovalBranch(startIndex + 1, indentLevel + 2)
@@ -2227,6 +2382,7 @@ ${elseReturnIndent}return workflow`
 
       currentNode = nextNode
     }
+    flushPendingSteps()
 
     // Add return statement if there's an End node
     // But skip if we already handled complex branching (User approval with multiple paths)
@@ -2352,13 +2508,23 @@ from pydantic import BaseModel`
       const hasMcp = nodes.some((node) => node.node_type === 'builtins.MCP')
 
       if (hasJsonSchema) {
+        // Agents with function tools need function_tool here too
+        const functionTool = nodes.some(
+          (node) =>
+            node.node_type === 'builtins.Agent' &&
+            (node.config?.tools || []).some(
+              (tool: any) => tool.type === 'function'
+            )
+        )
+          ? 'function_tool, '
+          : ''
         if (hasWebSearch) {
-          importCode = `from agents import WebSearchTool, Agent, ModelSettings, TResponseInputItem, Runner, RunConfig
+          importCode = `from agents import WebSearchTool, ${functionTool}Agent, ModelSettings, TResponseInputItem, Runner, RunConfig
 from pydantic import BaseModel
 from openai.types.shared.reasoning import Reasoning`
         } else {
           importCode = `from pydantic import BaseModel
-from agents import Agent, ModelSettings, TResponseInputItem, Runner, RunConfig
+from agents import ${functionTool}Agent, ModelSettings, TResponseInputItem, Runner, RunConfig
 from openai.types.shared.reasoning import Reasoning`
         }
       } else if (hasTools) {
@@ -2419,7 +2585,228 @@ from agents import TResponseInputItem`
 ` + importCode
     }
 
-    const mainFunction = `
+    // Skip the outputs no later node reads, before deciding which helpers
+    // the remaining calls need
+    mainFunctionBody = eliminateDeadOutputs(mainFunctionBody, nodes, edges)
+    mainFunctionBody = returnStructuredOutputsAsDicts(mainFunctionBody)
+
+    // Agent nodes run through run_agent_node so they can be streamed
+    const usesAgentRuntime = mainFunctionBody.includes(`${RUN_AGENT_NODE}(`)
+    const usesSpeculativeAgents = mainFunctionBody.includes('run_speculatively(')
+    const usesStructuredOutput = mainFunctionBody.includes(
+      `${STRUCTURED_OUTPUT}(`
+    )
+    // PII guardrails with the local engine register "Local PII" themselves
+    const hasLocalPII = hasGuardrails && usesLocalPII(nodes)
+    // Agent nodes with a retry policy register it next to their definition
+    const usesRetryPolicies =
+      usesAgentRuntime && topLevelCode.includes('retry_policies[')
+
+    // Batched moderation requests take a rate limit slot per request, in the
+    // batcher, instead of one per check
+    const moderationBatching = hasGuardrails
+      ? getModerationBatching(nodes)
+      : null
+    if (moderationBatching) {
+      mainFunctionBody = mainFunctionBody
+        .split(`rate_limited_guardrails("${MODERATION_RATE_LIMIT_KEY}", `)
+        .join('run_guardrails_in_cost_order(')
+    }
+
+    // Every model, search and guardrails call waits on the shared rate limiter
+    const workflowCode = `${topLevelCode}${mainFunctionBody}`
+    const usesRateLimitedSearch =
+      workflowCode.includes('rate_limited_search(') ||
+      (hasNodeCache && workflowCode.includes('node_cache.search_vector_store('))
+    // Guardrails nodes with their cache enabled pass a cache backend
+    const usesGuardrailCache = workflowCode.includes('cache_backend=')
+    const usesRateLimitedGuardrails = workflowCode.includes(
+      'rate_limited_guardrails('
+    )
+    const usesRateLimits =
+      usesAgentRuntime ||
+      usesRateLimitedSearch ||
+      usesRateLimitedGuardrails ||
+      moderationBatching !== null
+
+    // Agent, Guardrails, FileSearch and MCP nodes report to the node hooks
+    const usesNodeHooks =
+      usesAgentRuntime || workflowCode.includes(`${RUN_NODE}(`)
+
+    // User Approval nodes can suspend runs started with start_workflow
+    const usesDurableApprovals = /\bapproval_request\d*\(/.test(workflowCode)
+
+    // Per-node checkpoints, enabled on the Start node
+    const usesCheckpoints = hasCheckpoints(nodes)
+
+    // Both replay node results from the journal of a previous run
+    const usesJournal = usesDurableApprovals || usesCheckpoints
+    const declaresState = mainFunctionBody.includes('\n  state = ')
+
+    // Batch entrypoints, enabled on the Start node
+    const usesBatch = usesBatchEntrypoints(nodes)
+
+    // Standard library imports needed by the emitted helpers
+    const stdlibImports = new Set<string>()
+    // Independent node calls are awaited together
+    if (mainFunctionBody.includes('asyncio.gather(')) {
+      stdlibImports.add('import asyncio')
+    }
+    // Batches run under a semaphore, are timed and return BatchResults
+    if (usesBatch) {
+      stdlibImports.add('import asyncio')
+      stdlibImports.add('import time')
+      stdlibImports.add('from dataclasses import dataclass')
+      stdlibImports.add('from typing import Any, Optional')
+    }
+    // The model/API checks of a tier run as tasks
+    if (hasGuardrails) {
+      stdlibImports.add('import asyncio')
+    }
+    // Guardrails bundles are cached by their canonical JSON form
+    if (hasGuardrails) {
+      stdlibImports.add('import json')
+    }
+    // The MCP session pool keys sessions by JSON headers and tracks idle time
+    if (hasMcp) {
+      stdlibImports.add('import asyncio')
+      stdlibImports.add('import json')
+      stdlibImports.add('import time')
+    }
+    // Token counts are estimated from the JSON form of each item
+    if (conversationHistoryConfig) {
+      stdlibImports.add('import json')
+    }
+    // The streaming event queue is looked up through a ContextVar; streamed
+    // events are dataclasses
+    if (usesAgentRuntime) {
+      stdlibImports.add('import asyncio')
+      stdlibImports.add('from contextvars import ContextVar')
+      stdlibImports.add('from dataclasses import dataclass')
+      stdlibImports.add('from typing import Any, Optional')
+    }
+    // So is the deadline of the current run; node events are timed
+    if (usesNodeHooks) {
+      stdlibImports.add('import asyncio')
+      stdlibImports.add('import time')
+      stdlibImports.add('from contextvars import ContextVar')
+      stdlibImports.add('from dataclasses import dataclass')
+      stdlibImports.add('from typing import Optional')
+    }
+    // Suspended and checkpointed runs are pickled into SQLite under random ids
+    // and timestamps
+    if (usesJournal) {
+      stdlibImports.add('import pickle')
+      stdlibImports.add('import sqlite3')
+      stdlibImports.add('import time')
+      stdlibImports.add('import uuid')
+      stdlibImports.add('from contextvars import ContextVar')
+      stdlibImports.add('from dataclasses import dataclass')
+      stdlibImports.add('from typing import Optional')
+    }
+    // Checkpoint records hold any node result; a single thread writes them
+    if (usesCheckpoints) {
+      stdlibImports.add('import logging')
+      stdlibImports.add('from concurrent.futures import ThreadPoolExecutor')
+      stdlibImports.add('from typing import Any')
+    }
+    // Cache keys hash the JSON form of the inputs; sqlite entries are pickled
+    if (hasNodeCache) {
+      stdlibImports.add('import hashlib')
+      stdlibImports.add('import json')
+      stdlibImports.add('import pickle')
+      stdlibImports.add('import sqlite3')
+      stdlibImports.add('import time')
+      stdlibImports.add('from collections import Counter, OrderedDict')
+    }
+    // Backoffs are jittered; recent latencies go in a deque
+    if (usesRetryPolicies) {
+      stdlibImports.add('import asyncio')
+      stdlibImports.add('import random')
+      stdlibImports.add('from collections import deque')
+      stdlibImports.add('from dataclasses import dataclass')
+      stdlibImports.add('from typing import Optional')
+    }
+    // Reset headers are parsed with a regex; queue delays go in a deque. The
+    // lease of the current call is looked up through a ContextVar
+    if (usesRateLimits) {
+      stdlibImports.add('import asyncio')
+      stdlibImports.add('import json')
+      stdlibImports.add('import re')
+      stdlibImports.add('import time')
+      stdlibImports.add('from contextvars import ContextVar')
+      stdlibImports.add('from collections import deque')
+      stdlibImports.add('from contextlib import asynccontextmanager')
+    }
+    // Structured outputs cache their serializers and serialized forms
+    if (usesStructuredOutput) {
+      stdlibImports.add('import functools')
+      stdlibImports.add('from collections.abc import Mapping')
+    }
+    // Local PII patterns are compiled regexes; the term matcher is built breadth-first
+    if (hasLocalPII) {
+      stdlibImports.add('import re')
+      stdlibImports.add('from collections import deque')
+      stdlibImports.add('from typing import Any')
+    }
+    // Guardrail cache keys are hashes; sqlite entries are pickled
+    if (usesGuardrailCache) {
+      stdlibImports.add('import hashlib')
+      stdlibImports.add('import json')
+      stdlibImports.add('import pickle')
+      stdlibImports.add('import sqlite3')
+      stdlibImports.add('import time')
+      stdlibImports.add('from collections import Counter, OrderedDict')
+    }
+    // Merge from-imports of the same module
+    const fromImports = new Map<string, string[]>()
+    stdlibImports.forEach((line) => {
+      const match = line.match(/^from (\S+) import (.+)$/)
+      if (match) {
+        fromImports.set(match[1], [
+          ...(fromImports.get(match[1]) || []),
+          ...match[2].split(', '),
+        ])
+      }
+    })
+    const mergedImports = [
+      ...Array.from(stdlibImports).filter((line) => !line.startsWith('from ')),
+      ...Array.from(fromImports).map(
+        ([module, names]) =>
+          `from ${module} import ${Array.from(new Set(names)).sort().join(', ')}`
+      ),
+    ]
+    // Plain imports first, then from-imports, each sorted
+    const sortedImports = mergedImports.sort(
+      (a, b) =>
+        Number(a.startsWith('from ')) - Number(b.startsWith('from ')) ||
+        a.localeCompare(b)
+    )
+    if (usesRateLimits) {
+      importCode = addRateLimitedClientImports(importCode, usesAgentRuntime)
+    }
+    importCode = sortedImports.map((line) => `${line}\n`).join('') + importCode
+    if (hasLocalPII) {
+      importCode = importCode.replace(
+        /^from guardrails\.runtime import .+\n/m,
+        (line) => line + LOCAL_PII_IMPORTS
+      )
+    }
+    if (usesStructuredOutput) {
+      importCode = importCode.replace(
+        /^from pydantic import BaseModel$/m,
+        'from pydantic import BaseModel, TypeAdapter'
+      )
+    }
+
+    // Node calls share the time budget given to run_workflow
+    const mainFunction = usesNodeHooks
+      ? `
+# Main code entrypoint
+async def run_workflow(workflow_input: WorkflowInput, deadline: Optional[float] = None):
+  # Past deadline (a time.time() timestamp) node calls raise WorkflowTimeout
+  _workflow_deadline.set(deadline)${mainFunctionBody}`
+      : `
 # Main code entrypoint
 async def run_workflow(workflow_input: WorkflowInput):${mainFunctionBody}`
 
@@ -2444,8 +2831,14 @@ async def run_workflow(workflow_input: WorkflowInput):${mainFunctionBody}`
       })
     }
 
-    // Add client initialization for file search and guardrails
-    if (hasFileSearch || hasGuardrails) {
+    // Add client initialization for file search and guardrails. Under rate
+    // limits the agents share it, so their responses update the limits too
+    if (usesRateLimits) {
+      finalCode += `\n\n${generateRateLimitedClientCode(usesAgentRuntime, hasFileSearch || hasGuardrails)}`
+      if (hasFileSearch || hasGuardrails) {
+        finalCode += `\nctx = SimpleNamespace(guardrail_llm=client)`
+      }
+    } else if (hasFileSearch || hasGuardrails) {
       finalCode += `\n\n# Shared client for guardrails and file search
 client = AsyncOpenAI()
 ctx = SimpleNamespace(guardrail_llm=client)`
@@ -2526,13 +2919,19 @@ ${categoriesStr}
               const entitiesStr = entities
                 .map((entity: string) => `          "${entity}"`)
                 .join(',\n')
+              const local = isLocalPIIGuardrail(guardrail)
+              const customEntities = guardrail.config?.custom_entities
+              const customEntitiesStr =
+                local && customEntities && Object.keys(customEntities).length
+                  ? `,\n        "custom_entities": ${JSON.stringify(customEntities)}`
+                  : ''
               return `    {
-      "name": "Contains PII",
+      "name": "${local ? 'Local PII' : 'Contains PII'}",
       "config": {
         "block": ${guardrail.config?.block === true ? 'True' : 'False'},
         "entities": [
 ${entitiesStr}
-        ]
+        ]${customEntitiesStr}
       }
     }`
             } else if (guardrail.type === 'jailbreak') {
@@ -2562,9 +2961,72 @@ ${guardrailsConfigStr}
       finalCode += `
 # Guardrails utils
 
+_guardrails_bundles = {}
+_guardrails_bundles_by_id = {}
+
+def get_guardrails_bundle(config):
+    # Config dicts are module-level constants, so the id() lookup is the hot path.
+    # The entry keeps the config alive so its id can never be reused.
+    entry = _guardrails_bundles_by_id.get(id(config))
+    if entry is not None:
+        return entry[1]
+    key = json.dumps(config, sort_keys=True)
+    bundle = _guardrails_bundles.get(key)
+    if bundle is None:
+        bundle = instantiate_guardrails(load_config_bundle(config))
+        _guardrails_bundles[key] = bundle
+    _guardrails_bundles_by_id[id(config)] = (config, bundle)
+    return bundle
+
 def guardrails_has_tripwire(results):
     return any(getattr(r, "tripwire_triggered", False) is True for r in (results or []))
 
+# Engines of the checks that run in-process; the others call a model or an API
+_LOCAL_GUARDRAIL_ENGINES = ("regex", "presidio")
+
+def _is_local_guardrail(guardrail):
+    engine = getattr(guardrail.definition.metadata, "engine", None) or ""
+    return engine.lower() in _LOCAL_GUARDRAIL_ENGINES
+
+async def _run_guardrails_tier(ctx, text, media_type, bundle, tier, results, **kwargs):
+    # Returns True as soon as a check trips, cancelling the ones still running
+    tasks = {
+        asyncio.create_task(${
+          usesRateLimitedGuardrails
+            ? '_run_guardrail_check(ctx, text, media_type, bundle[index], **kwargs)'
+            : 'run_guardrails(ctx, text, media_type, [bundle[index]], **kwargs)'
+        }): index
+        for index in tier
+    }
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                results[tasks[task]] = task.result()
+            if any(guardrails_has_tripwire(results[tasks[task]]) for task in done):
+                return True
+        return False
+    finally:
+        for task in pending:
+            task.cancel()
+
+${
+  usesGuardrailCache
+    ? CACHED_COST_ORDER_GUARDRAILS
+    : `async def run_guardrails_in_cost_order(ctx, text, media_type, bundle, **kwargs):
+    # Local checks run first and the model/API checks, together, only once they
+    # pass. Checks skipped after a tripwire have no result. Results come back
+    # in bundle order, like run_guardrails.
+    results = {}
+    local = [index for index, guardrail in enumerate(bundle) if _is_local_guardrail(guardrail)]
+    remote = [index for index in range(len(bundle)) if index not in local]
+    for tier in (local, remote):
+        if await _run_guardrails_tier(ctx, text, media_type, bundle, tier, results, **kwargs):
+            break
+    return [result for _, group in sorted(results.items()) for result in group]`
+}
+
 def get_guardrail_checked_text(results, fallback_text):
     for r in (results or []):
         info = getattr(r, "info", None) or {}
@@ -2585,6 +3047,235 @@ def build_guardrail_fail_output(results):
                     failure[key] = info.get(key)
             failures.append(failure)
     return {"failed": len(failures) > 0, "failures": failures}`
+      if (hasLocalPII) {
+        finalCode += `\n\n${LOCAL_PII_UTILS}`
+      }
+      if (usesGuardrailCache) {
+        finalCode += `\n\n${GUARDRAIL_CACHE_UTILS}`
+      }
+      if (moderationBatching) {
+        finalCode += `\n\n${generateModerationBatchingCode(moderationBatching)}`
+      }
+    }
+
+    // Add the node lifecycle hooks
+    if (usesNodeHooks) {
+      finalCode += `\n\n${generateNodeHooksCode(nodes, usesJournal)}\n`
+    }
+
+    // Add the per-model rate limiter
+    if (usesRateLimits) {
+      finalCode += `\n\n${RATE_LIMIT_UTILS}\n`
+      if (usesRateLimitedSearch) {
+        finalCode += `\n\n${RATE_LIMITED_SEARCH}\n`
+      }
+      if (usesRateLimitedGuardrails) {
+        finalCode += `\n\n${RATE_LIMITED_GUARDRAILS}\n`
+      }
+    }
+
+    // Add the MCP session pool shared by every MCP node
+    if (hasMcp) {
+      finalCode += `
+
+# MCP utils
+
+class _MCPSession:
+    def __init__(self, key, connecting):
+        self.key = key
+        self.connecting = connecting
+        self.client = None
+        self.users = 0
+        self.last_used = time.monotonic()
+        self.broken = False
+
+
+class MCPSessionPool:
+    """Shares initialized MCP clients across nodes and workflow runs.
+
+    Sessions are keyed by transport, target and headers, so nodes that talk to
+    the same server reuse one connection (and one stdio process). Idle sessions
+    are closed after idle_timeout seconds, the least recently used idle session
+    makes room once max_size is reached, and sessions idle for longer than
+    health_check_interval are pinged before they are handed out again.
+    """
+
+    def __init__(self, max_size=8, idle_timeout=300.0, health_check_interval=30.0):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self._sessions = {}
+        self._changed = asyncio.Condition()
+
+    async def call_tool(self, transport, target, headers=None, *, name, arguments, timeout=None):
+        session = await self._acquire(transport, target, headers or {})
+        try:
+            return await asyncio.wait_for(
+                session.client.call_tool(name=name, arguments=arguments), timeout
+            )
+        except (OSError, EOFError, asyncio.TimeoutError, asyncio.CancelledError):
+            # The connection state is unknown after a lost connection, a timeout
+            # or a cancelled call; a tool that raised leaves it usable
+            session.broken = True
+            raise
+        finally:
+            await self._release(session)
+
+    async def aclose(self):
+        async with self._changed:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        # Sessions still in use are closed by their last _release
+        await self._close_all([s for s in sessions if s.users == 0])
+
+    async def _acquire(self, transport, target, headers):
+        key = (transport, target, json.dumps(headers, sort_keys=True))
+        while True:
+            stale = []
+            async with self._changed:
+                stale += self._take_expired()
+                session = self._sessions.get(key)
+                if session is not None:
+                    ping = self._needs_ping(session)
+                    session.users += 1
+                elif len(self._sessions) < self.max_size or self._evict_lru(stale):
+                    ping = False
+                    connecting = asyncio.ensure_future(self._connect(transport, target, headers))
+                    session = self._sessions[key] = _MCPSession(key, connecting)
+                    session.users += 1
+                else:
+                    await self._changed.wait()
+            # Closing and pinging talk to the server, so they run unlocked
+            await self._close_all(stale)
+            if session is None:
+                continue
+            if ping and not await self._ping(session):
+                session.broken = True
+                await self._release(session)
+                continue
+            break
+        try:
+            # Shielded so one cancelled caller doesn't abort a shared connect
+            session.client = await asyncio.shield(session.connecting)
+        except BaseException:
+            session.broken = True
+            await self._release(session)
+            raise
+        return session
+
+    async def _release(self, session):
+        async with self._changed:
+            session.users -= 1
+            session.last_used = time.monotonic()
+            if session.broken and self._sessions.get(session.key) is session:
+                del self._sessions[session.key]
+            orphaned = session.users == 0 and self._sessions.get(session.key) is not session
+            self._changed.notify_all()
+        if orphaned:
+            await self._close(session)
+
+    async def _connect(self, transport, target, headers):
+        if transport == "stdio":
+            mcp_transport = StdioClientTransport(command="python", args=[target])
+        else:
+            mcp_transport = SSEClientTransport(url=target, headers=headers)
+        client = Client(transport=mcp_transport)
+        await client.initialize()
+        return client
+
+    def _needs_ping(self, session):
+        # Only sessions nobody is using and that sat idle for a while are pinged
+        if session.users > 0 or session.client is None:
+            return False
+        return time.monotonic() - session.last_used >= self.health_check_interval
+
+    async def _ping(self, session):
+        try:
+            await asyncio.wait_for(session.client.ping(), 5)
+            return True
+        except Exception:
+            return False
+
+    def _take_expired(self):
+        now = time.monotonic()
+        expired = [
+            s for s in self._sessions.values()
+            if s.users == 0 and now - s.last_used > self.idle_timeout
+        ]
+        for session in expired:
+            del self._sessions[session.key]
+        return expired
+
+    def _evict_lru(self, evicted):
+        idle = [s for s in self._sessions.values() if s.users == 0]
+        if not idle:
+            return False
+        session = min(idle, key=lambda s: s.last_used)
+        del self._sessions[session.key]
+        evicted.append(session)
+        return True
+
+    async def _close_all(self, sessions):
+        await asyncio.gather(*(self._close(session) for session in sessions))
+
+    async def _close(self, session):
+        try:
+            client = await session.connecting
+            await client.close()
+        except Exception:
+            pass
+
+mcp_sessions = MCPSessionPool()`
+    }
+
+    // Add run_agent_node and the streaming event types
+    if (usesAgentRuntime) {
+      finalCode += `\n\n${generateAgentRuntimeCode(usesRetryPolicies)}\n`
+    }
+
+    // Add the retry and hedging policies of Agent nodes
+    if (usesRetryPolicies) {
+      finalCode += `\n\n${RETRY_POLICY_UTILS}\n`
+    }
+
+    // Add the lazily serialized results of agents with an output type
+    if (usesStructuredOutput) {
+      finalCode += `\n\n${STRUCTURED_OUTPUT_UTILS}\n`
+    }
+
+    // Add run_speculatively for agents started alongside a guardrail check
+    if (usesSpeculativeAgents) {
+      finalCode += `\n\n${SPECULATIVE_AGENT_UTILS}\n`
+    }
+
+    // Add the token-budgeted conversation history
+    if (conversationHistoryConfig) {
+      finalCode += `\n\n${CONVERSATION_HISTORY_UTILS}\n`
+    }
+
+    // Add the stand-ins for cached and replayed node results
+    if (hasNodeCache || usesJournal) {
+      finalCode += `\n\n${RECORDED_RESULTS}\n`
+    }
+
+    // Add the node result cache
+    if (hasNodeCache) {
+      finalCode += `\n\n${NODE_CACHE_UTILS}\n`
+    }
+
+    // Add the journal replayed by resumed runs
+    if (usesJournal) {
+      finalCode += `\n\n${WORKFLOW_JOURNAL_UTILS}\n`
+    }
+
+    // Add the approval store
+    if (usesDurableApprovals) {
+      finalCode += `\n\n${DURABLE_APPROVAL_UTILS}\n`
+    }
+
+    // Add the checkpoint store
+    if (usesCheckpoints) {
+      finalCode += `\n\n${CHECKPOINT_UTILS}\n`
     }
 
     // Add schema models if any
@@ -2618,6 +3309,22 @@ def build_guardrail_fail_output(results):
     }
     finalCode += `\n\n${mainFunction}`
 
+    if (usesAgentRuntime) {
+      finalCode += `\n\n\n${WORKFLOW_STREAMED_ENTRYPOINT}`
+    }
+
+    if (usesBatch) {
+      finalCode += `\n\n\n${WORKFLOW_BATCH_ENTRYPOINTS}`
+    }
+
+    if (usesDurableApprovals) {
+      finalCode += `\n\n\n${DURABLE_APPROVAL_ENTRYPOINTS}`
+    }
+
+    if (usesCheckpoints) {
+      finalCode += `\n\n\n${CHECKPOINT_ENTRYPOINTS}`
+    }
+
     // Ensure approval_request function is defined if used in code
     if (
       finalCode.includes('approval_request(') &&
@@ -2630,11 +3337,43 @@ def build_guardrail_fail_output(results):
         if (insertPoint > 0) {
           const beforeInsert = finalCode.substring(0, insertPoint)
           const afterInsert = finalCode.substring(insertPoint)
-          finalCode = `${beforeInsert}\n\ndef approval_request(message: str):\n  # TODO: Implement\n  return True${afterInsert}`
+          const approvalNode = nodes.find(
+            (n) => n.node_type === 'builtins.BinaryApproval'
+          )
+          finalCode = `${beforeInsert}\n\n${generateApprovalRequestFunction('approval_request', approvalNode)}${afterInsert}`
         }
       }
     }
 
+    // Before the budget rewrites the conversation_history declaration
+    if (usesCheckpoints) {
+      finalCode = applyCheckpointVariables(finalCode, declaresState)
+    }
+
+    if (conversationHistoryConfig) {
+      finalCode = applyConversationHistoryBudget(
+        finalCode,
+        conversationHistoryConfig
+      )
+    }
+
+    if (hasNodeCache) {
+      finalCode = applyAgentNodeCache(finalCode, nodes)
+    }
+
+    if (usesDurableApprovals) {
+      finalCode = applyDurableApprovals(finalCode, declaresState)
+    }
+
+    // Before interning, so agents differing only in their summary merge
+    finalCode = dropUnreadReasoningSummaries(finalCode)
+    finalCode = internDefinitions(finalCode)
+
+    // Last, so it sees every top-level statement
+    if (usesLazyLoading(nodes)) {
+      finalCode = applyLazyLoading(finalCode)
+    }
+
     return { code: finalCode, error: '' }
   } catch (error) {
     return {
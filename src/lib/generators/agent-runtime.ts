@@ -0,0 +1,109 @@
+/**
+ * Runtime emitted for workflows that run Agent nodes.
+ *
+ * Every Agent node calls `run_agent_node(node_id, agent, input=...)` instead of
+ * `Runner.run(...)`. Outside of `run_workflow_streamed` it is a plain
+ * `Runner.run`; inside it, the agent runs with `Runner.run_streamed` and its
+ * progress is published as WorkflowEvents tagged with the node id from the
+ * workflow JSON. Either way each request waits for a slot on the agent's
+ * model in `rate_limits` and the node is reported to the node hooks through
+ * `run_node`.
+ */
+
+export const RUN_AGENT_NODE = 'run_agent_node'
+
+/**
+ * With \`retries\` set (some Agent node has a retry policy), requests go
+ * through \`run_with_retry_policy\`; see retry-policy.ts. Every attempt and
+ * hedged duplicate is a request of its own, with its own rate limit lease, so
+ * the limiter counts it and sees its 429s. Streamed runs are not hedged and
+ * are only retried, and only time out, until they publish their first text
+ * delta.
+ */
+export function generateAgentRuntimeCode(retries: boolean = false): string {
+  return `# Agent runtime
+
+@dataclass
+class WorkflowEvent:
+    # "node_started", "text_delta", "node_finished" or "final_output"
+    type: str
+    node_id: Optional[str] = None
+    delta: Optional[str] = None
+    output: Any = None
+
+
+# Event queue of the run_workflow_streamed call this task belongs to, if any
+_workflow_events = ContextVar("workflow_events", default=None)
+
+
+def run_agent_node(node_id, agent, input):
+    return run_node(node_id, _run_agent_node(node_id, agent, input))
+
+
+def _settle_usage(lease, result):
+    usage = getattr(getattr(result, "context_wrapper", None), "usage", None)
+    lease.settle(getattr(usage, "total_tokens", None))
+
+
+async def _run_agent_request(agent, input):
+    async with rate_limits.acquire(_model_key(agent), tokens=estimate_request_tokens(input)) as lease:
+        result = await Runner.run(agent, input=input, run_config=agent_run_config())
+        _settle_usage(lease, result)
+    return result
+
+
+async def _run_agent_node(node_id, agent, input):
+    events = _workflow_events.get()
+    if events is None:${
+      retries
+        ? `
+        return await run_with_retry_policy(node_id, lambda: _run_agent_request(agent, input))`
+        : `
+        return await _run_agent_request(agent, input)`
+    }
+    events.put_nowait(WorkflowEvent("node_started", node_id=node_id))
+    published = False
+
+    async def stream_request():
+        nonlocal published
+        async with rate_limits.acquire(_model_key(agent), tokens=estimate_request_tokens(input)) as lease:
+            result = Runner.run_streamed(agent, input=input, run_config=agent_run_config())
+            async for event in result.stream_events():
+                if event.type == "raw_response_event" and event.data.type == "response.output_text.delta":
+                    published = True
+                    events.put_nowait(WorkflowEvent("text_delta", node_id=node_id, delta=event.data.delta))
+            _settle_usage(lease, result)
+        return result
+${
+  retries
+    ? `
+    # Published deltas can't be taken back: no hedged duplicates, and no retry once one is out
+    result = await run_with_retry_policy(node_id, stream_request, hedge=False, retryable=lambda: not published)`
+    : `
+    result = await stream_request()`
+}
+    events.put_nowait(WorkflowEvent("node_finished", node_id=node_id, output=result.final_output))
+    return result`
+}
+
+export const WORKFLOW_STREAMED_ENTRYPOINT = `# Streaming entrypoint
+async def run_workflow_streamed(workflow_input: WorkflowInput, deadline: Optional[float] = None):
+  """Run the workflow, yielding WorkflowEvents as soon as agents produce them."""
+  events = asyncio.Queue()
+
+  async def run():
+    _workflow_events.set(events)
+    try:
+      output = await run_workflow(workflow_input, deadline=deadline)
+      events.put_nowait(WorkflowEvent("final_output", output=output))
+    finally:
+      events.put_nowait(None)
+
+  task = asyncio.create_task(run())
+  try:
+    while (event := await events.get()) is not None:
+      yield event
+    # Surface errors raised by the workflow itself
+    await task
+  finally:
+    task.cancel()`
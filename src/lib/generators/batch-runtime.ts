@@ -0,0 +1,72 @@
+import { WorkflowNode } from '../types/workflow'
+
+/**
+ * Batch entrypoints, enabled on the Start node:
+ *
+ *   "config": { "batch_entrypoints": { "enabled": true } }
+ *
+ * `run_workflow_batch` returns one BatchResult per input, in input order;
+ * `iter_workflow_batch` yields them as they complete. Both run at most
+ * `max_concurrency` workflows at once and share the module-level client and
+ * agents with `run_workflow`.
+ */
+
+export function usesBatchEntrypoints(nodes: WorkflowNode[]): boolean {
+  const startNode = nodes.find((n) => n.node_type === 'builtins.Start')
+  return startNode?.config?.batch_entrypoints?.enabled === true
+}
+
+export const WORKFLOW_BATCH_ENTRYPOINTS = `# Batch entrypoints
+@dataclass
+class BatchResult:
+  index: int
+  output: Any = None
+  error: Optional[Exception] = None
+  # Seconds spent in run_workflow, excluding time waiting for a free slot
+  latency: float = 0.0
+
+
+def _start_workflow_batch(inputs, max_concurrency):
+  semaphore = asyncio.Semaphore(max_concurrency)
+
+  async def run_item(index, workflow_input):
+    async with semaphore:
+      start = time.perf_counter()
+      try:
+        output = await run_workflow(workflow_input)
+      except Exception as error:
+        return BatchResult(index, error=error, latency=time.perf_counter() - start)
+      return BatchResult(index, output=output, latency=time.perf_counter() - start)
+
+  return [asyncio.create_task(run_item(index, workflow_input)) for index, workflow_input in enumerate(inputs)]
+
+
+async def run_workflow_batch(inputs, max_concurrency=8, return_exceptions=False):
+  """Run the workflow over inputs and return BatchResults in input order.
+
+  Unless return_exceptions is set, the first failing input (in input order)
+  raises its error and the remaining runs are cancelled.
+  """
+  tasks = _start_workflow_batch(inputs, max_concurrency)
+  try:
+    results = []
+    for task in tasks:
+      result = await task
+      if result.error is not None and not return_exceptions:
+        raise result.error
+      results.append(result)
+    return results
+  finally:
+    for task in tasks:
+      task.cancel()
+
+
+async def iter_workflow_batch(inputs, max_concurrency=8):
+  """Yield a BatchResult per input as soon as it finishes."""
+  tasks = _start_workflow_batch(inputs, max_concurrency)
+  try:
+    for next_result in asyncio.as_completed(tasks):
+      yield await next_result
+  finally:
+    for task in tasks:
+      task.cancel()`
@@ -0,0 +1,295 @@
+import { WorkflowNode } from '../types/workflow'
+import { findClosingBracket } from './helpers'
+
+/**
+ * Per-node checkpoints, enabled on the Start node:
+ *
+ *   "config": { "checkpoints": { "enabled": true } }
+ *
+ * `run_workflow_checkpointed(workflow_input, run_id)` runs the workflow as a
+ * journaled run (see workflow-journal.ts) and writes a row to
+ * `checkpoint_store` each time an Agent, Guardrails, FileSearch or MCP node
+ * completes. `resume_run(run_id)` re-runs an interrupted run, replaying the
+ * completed nodes from their checkpoints instead of calling them again.
+ */
+
+export function hasCheckpoints(nodes: WorkflowNode[]): boolean {
+  const startNode = nodes.find((n) => n.node_type === 'builtins.Start')
+  return startNode?.config?.checkpoints?.enabled === true
+}
+
+/**
+ * Register `state`, `workflow` and `conversation_history` with the active run
+ * right after run_workflow declares them, for the checkpoint snapshots.
+ */
+export function applyCheckpointVariables(
+  code: string,
+  hasState: boolean
+): string {
+  const functionIndex = code.indexOf('async def run_workflow(')
+  const declaration = 'conversation_history: list[TResponseInputItem] = ['
+  const declarationIndex = code.indexOf(declaration, functionIndex)
+  if (functionIndex === -1 || declarationIndex === -1) {
+    return code
+  }
+  const close = findClosingBracket(
+    code,
+    declarationIndex + declaration.length - 1
+  )
+  const variables = [
+    ...(hasState ? ['state=state'] : []),
+    'workflow=workflow',
+    'conversation_history=conversation_history',
+  ].join(', ')
+  return (
+    code.slice(0, close) +
+    `\n  track_run_variables(${variables})` +
+    code.slice(close)
+  )
+}
+
+export const CHECKPOINT_UTILS = `# Checkpoints
+
+_checkpoint_log = logging.getLogger(__name__)
+_PICKLE_ERRORS = (pickle.PicklingError, TypeError, AttributeError)
+
+
+def track_run_variables(**variables):
+    run = _journaled_run.get()
+    if run is not None:
+        run.variables = variables
+
+
+@dataclass
+class Checkpoint:
+    run_id: str
+    # "running", "failed" or "completed"
+    status: str
+    # Ids of the nodes completed so far, in completion order
+    nodes: list
+    state: Optional[dict] = None
+    conversation_history: Optional[list] = None
+    output: Any = None
+    error: Optional[str] = None
+
+
+class _CheckpointRecorder:
+    """Writes a row per completed node with what changed since the previous row.
+
+    State values are compared by their pickled form and only changed keys are
+    stored; values that don't pickle are left out. Conversation items are compared by identity, so only the items
+    appended (or replaced) since the previous row are stored along with the
+    length of the prefix they share with it.
+    """
+
+    def __init__(self, store, run_id):
+        self.store = store
+        self.run_id = run_id
+        self._state = {}
+        self._history = []
+        self._unpicklable = set()
+
+    def __call__(self, run, index, entry):
+        state = run.variables.get("state") or {}
+        blobs, changed = {}, {}
+        for key, value in state.items():
+            try:
+                blob = pickle.dumps(value)
+            except _PICKLE_ERRORS as error:
+                if key not in self._unpicklable:
+                    self._unpicklable.add(key)
+                    _checkpoint_log.warning(
+                        "Leaving state[%r] out of the checkpoints of run %s: %r", key, self.run_id, error
+                    )
+                continue
+            if self._state.get(key) != blob:
+                blobs[key] = blob
+                changed[key] = value
+        history = list(run.variables.get("conversation_history") or ())
+        shared = 0
+        for previous, item in zip(self._history, history):
+            if previous is not item:
+                break
+            shared += 1
+        # The next row's deltas are against this one, so only a written row counts
+        if self.store.record(self.run_id, index, entry, changed, shared, history[shared:]):
+            self._state.update(blobs)
+            self._history = history
+
+
+class CheckpointStore:
+    """Checkpoints of runs started with run_workflow_checkpointed, in SQLite.
+
+    A run has one row per completed node holding the node's recorded result
+    and the state and conversation deltas since the previous row; load()
+    rebuilds the latest snapshot from them. Node rows are written by a
+    background thread, so recording them doesn't block the event loop.
+    """
+
+    def __init__(self, path="workflow_checkpoints.sqlite3"):
+        self.path = path
+        self._db = None
+        # One writer thread keeps the node rows in completion order
+        self._writer = ThreadPoolExecutor(max_workers=1, thread_name_prefix="checkpoint-writer")
+        self._pending = None
+
+    def _connect(self):
+        if self._db is None:
+            self._db = sqlite3.connect(self.path, check_same_thread=False)
+            with self._db:
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS runs (run_id TEXT PRIMARY KEY, input BLOB, status TEXT, "
+                    "output BLOB, error TEXT, updated_at REAL)"
+                )
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS checkpoints (run_id TEXT, position INTEGER, node_id TEXT, "
+                    "entry BLOB, state BLOB, history_shared INTEGER, history BLOB)"
+                )
+                self._db.execute("CREATE INDEX IF NOT EXISTS checkpoints_run_id ON checkpoints (run_id)")
+        return self._db
+
+    def _ready(self):
+        # Wait for the node rows still being written before using the connection
+        if self._pending is not None:
+            self._pending.result()
+        return self._connect()
+
+    def create(self, run_id, input):
+        with self._ready() as db:
+            db.execute(
+                "INSERT INTO runs VALUES (?, ?, 'running', NULL, NULL, ?)",
+                (run_id, pickle.dumps(input), time.time()),
+            )
+
+    def record(self, run_id, position, entry, state, history_shared, history):
+        """Queue a node row; False if it doesn't pickle and was skipped."""
+        try:
+            row = (run_id, position, entry[0], pickle.dumps(entry), pickle.dumps(state), history_shared, pickle.dumps(history))
+        except _PICKLE_ERRORS as error:
+            # Without the row, a resumed run calls the node again
+            _checkpoint_log.warning("Skipping the checkpoint of node %s in run %s: %r", entry[0], run_id, error)
+            return False
+        # Rows are read back in insertion order, which is completion order
+        self._pending = self._writer.submit(self._insert, row)
+        return True
+
+    def _insert(self, row):
+        try:
+            with self._connect() as db:
+                db.execute("INSERT INTO checkpoints VALUES (?, ?, ?, ?, ?, ?, ?)", row)
+        except sqlite3.Error:
+            _checkpoint_log.exception("Failed to write the checkpoint of node %s in run %s", row[2], row[0])
+
+    def update(self, run_id, status, output=None, error=None):
+        try:
+            output = pickle.dumps(output)
+        except _PICKLE_ERRORS:
+            output = None
+        with self._ready() as db:
+            db.execute(
+                "UPDATE runs SET status = ?, output = ?, error = ?, updated_at = ? WHERE run_id = ?",
+                (status, output, error, time.time(), run_id),
+            )
+
+    def _rows(self, run_id):
+        return self._ready().execute(
+            "SELECT position, node_id, entry, state, history_shared, history FROM checkpoints "
+            "WHERE run_id = ? ORDER BY rowid",
+            (run_id,),
+        ).fetchall()
+
+    def _run(self, run_id):
+        return self._ready().execute(
+            "SELECT input, status, output, error FROM runs WHERE run_id = ?", (run_id,)
+        ).fetchone()
+
+    def journal(self, run_id):
+        """The workflow input and node journal of a run, or None if it is unknown."""
+        run = self._run(run_id)
+        if run is None:
+            return None
+        entries = {position: pickle.loads(entry) for position, _, entry, _, _, _ in self._rows(run_id)}
+        # Nodes awaited together may have completed out of order; replay stops at the first gap
+        journal = []
+        while len(journal) in entries:
+            journal.append(entries[len(journal)])
+        return pickle.loads(run[0]), run[1], journal
+
+    def load(self, run_id):
+        """The latest Checkpoint of a run, or None if it is unknown."""
+        run = self._run(run_id)
+        if run is None:
+            return None
+        state, history, nodes = {}, [], []
+        for _, node_id, _, state_delta, shared, items in self._rows(run_id):
+            # The row written when a run completes has no node
+            if node_id is not None:
+                nodes.append(node_id)
+            state.update(pickle.loads(state_delta))
+            history = history[:shared] + pickle.loads(items)
+        output = pickle.loads(run[2]) if run[2] is not None else None
+        return Checkpoint(run_id, run[1], nodes, state, history, output, run[3])
+
+    def runs(self, status=None):
+        """(run_id, status, updated_at) of the stored runs, most recent first."""
+        query = "SELECT run_id, status, updated_at FROM runs"
+        params = ()
+        if status is not None:
+            query += " WHERE status = ?"
+            params = (status,)
+        return self._ready().execute(query + " ORDER BY updated_at DESC", params).fetchall()
+
+    def delete(self, run_id):
+        with self._ready() as db:
+            db.execute("DELETE FROM checkpoints WHERE run_id = ?", (run_id,))
+            db.execute("DELETE FROM runs WHERE run_id = ?", (run_id,))
+
+
+checkpoint_store = CheckpointStore()`
+
+export const CHECKPOINT_ENTRYPOINTS = `# Checkpointed entrypoints
+async def _run_checkpointed(run_id, input, journal):
+  recorder = _CheckpointRecorder(checkpoint_store, run_id)
+  run = _JournaledRun(journal, on_record=recorder)
+  token = _journaled_run.set(run)
+  try:
+    output = await run_workflow(WorkflowInput(**input))
+  except BaseException as error:
+    # Also covers cancellation, e.g. a worker shutting down mid-run
+    checkpoint_store.update(run_id, "failed", error=repr(error))
+    raise
+  finally:
+    _journaled_run.reset(token)
+  # Final snapshot, after the post-processing of the last node
+  recorder(run, len(run.journal), (None, "end", None))
+  checkpoint_store.update(run_id, "completed", output=output)
+  return output
+
+
+async def run_workflow_checkpointed(workflow_input: WorkflowInput, run_id=None):
+  """Run the workflow, checkpointing each Agent, Guardrails, FileSearch and MCP node.
+
+  The run is stored in checkpoint_store under run_id (a new id when None).
+  If it fails, resume_run(run_id) continues it without repeating the nodes
+  that already completed.
+  """
+  run_id = run_id or uuid.uuid4().hex
+  input = workflow_input.model_dump()
+  checkpoint_store.create(run_id, input)
+  return await _run_checkpointed(run_id, input, [])
+
+
+async def resume_run(run_id):
+  """Continue a checkpointed run from its last completed node.
+
+  Completed nodes are replayed from their checkpoints; the rest run again.
+  A run that already completed returns its stored output.
+  """
+  stored = checkpoint_store.journal(run_id)
+  if stored is None:
+    raise KeyError(f"No checkpointed run {run_id!r}")
+  input, status, journal = stored
+  if status == "completed":
+    return checkpoint_store.load(run_id).output
+  checkpoint_store.update(run_id, "running")
+  return await _run_checkpointed(run_id, input, journal)`
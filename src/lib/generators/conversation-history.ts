@@ -0,0 +1,149 @@
+import { WorkflowNode } from '../types/workflow'
+import { findClosingBracket } from './helpers'
+
+/**
+ * Token budget for `conversation_history`, configured on the Start node:
+ *
+ *   "config": { "conversation_history": { "max_tokens": 8000, "keep_prefix": 1 } }
+ *
+ * Without a positive `max_tokens` the history stays a plain list.
+ */
+export interface ConversationHistoryConfig {
+  max_tokens: number
+  keep_prefix: number
+}
+
+export function getConversationHistoryConfig(
+  nodes: WorkflowNode[]
+): ConversationHistoryConfig | null {
+  const startNode = nodes.find((n) => n.node_type === 'builtins.Start')
+  const config = startNode?.config?.conversation_history
+  const maxTokens = Number(config?.max_tokens)
+  if (!config || !Number.isFinite(maxTokens) || maxTokens <= 0) {
+    return null
+  }
+  const keepPrefix = Number(config.keep_prefix)
+  return {
+    max_tokens: Math.floor(maxTokens),
+    keep_prefix:
+      Number.isFinite(keepPrefix) && keepPrefix >= 0 ? Math.floor(keepPrefix) : 1,
+  }
+}
+
+export const CONVERSATION_HISTORY_UTILS = `# Conversation history
+
+def estimate_tokens(item):
+    # About four characters per token; keeps the runtime tokenizer-free
+    return len(json.dumps(item, default=str)) // 4 + 1
+
+
+class ConversationHistory:
+    """Conversation items kept within a token budget.
+
+    The first keep_prefix items (the workflow input and any system-style
+    prefix) are always kept; after them only the most recent turns that fit in
+    max_tokens are. A turn is never split: a reasoning item stays with the
+    items produced after it, and function calls with their outputs. Older
+    turns are dropped as soon as they fall out of the window, and token counts
+    are computed once per item.
+    """
+
+    def __init__(self, items=(), max_tokens=None, keep_prefix=1, count_tokens=estimate_tokens):
+        self.max_tokens = max_tokens
+        self.keep_prefix = keep_prefix
+        self._count_tokens = count_tokens
+        self._items = []
+        self._tokens = []
+        self._total = 0
+        self.extend(items)
+
+    def __len__(self):
+        return len(self._items)
+
+    def __iter__(self):
+        return iter(self._items)
+
+    @property
+    def total_tokens(self):
+        return self._total
+
+    def extend(self, items):
+        for item in items:
+            tokens = self._count_tokens(item)
+            self._items.append(item)
+            self._tokens.append(tokens)
+            self._total += tokens
+        self._trim()
+
+    def as_input(self, *extra):
+        """A new list of the items in the window followed by extra.
+
+        Each call builds its own list, so an agent run that modifies its input
+        doesn't change the history or another agent's input.
+        """
+        return [*self._items, *extra]
+
+    def _starts_turn(self, index):
+        # Tool output belongs with its call, and reasoning and function calls
+        # with the items that follow them
+        if self._items[index].get("type") == "function_call_output":
+            return False
+        return index == 0 or self._items[index - 1].get("type") not in ("reasoning", "function_call")
+
+    def _trim(self):
+        if self.max_tokens is None:
+            return
+        start = min(self.keep_prefix, len(self._items))
+        # Always keep the newest turn, even if it alone exceeds the budget
+        newest = len(self._items) - 1
+        while newest > start and not self._starts_turn(newest):
+            newest -= 1
+        end = start
+        while self._total > self.max_tokens and end < newest:
+            # Drop the oldest turn whole
+            self._total -= self._tokens[end]
+            end += 1
+            while end < newest and not self._starts_turn(end):
+                self._total -= self._tokens[end]
+                end += 1
+        del self._items[start:end]
+        del self._tokens[start:end]`
+
+/**
+ * Rewrite generated code to keep `conversation_history` in a ConversationHistory:
+ * the initial list becomes the constructor argument and every
+ * `[*conversation_history, ...]` agent input becomes
+ * `conversation_history.as_input(...)`. `extend(...)` calls are unchanged.
+ */
+export function applyConversationHistoryBudget(
+  code: string,
+  config: ConversationHistoryConfig
+): string {
+  const declaration = 'conversation_history: list[TResponseInputItem] = ['
+  let declarationIndex = code.indexOf(declaration)
+  while (declarationIndex !== -1) {
+    const open = declarationIndex + declaration.length - 1
+    const close = findClosingBracket(code, open)
+    code =
+      code.slice(0, declarationIndex) +
+      `conversation_history = ConversationHistory(${code.slice(open, close)}, max_tokens=${config.max_tokens}, keep_prefix=${config.keep_prefix})` +
+      code.slice(close)
+    declarationIndex = code.indexOf(declaration, declarationIndex)
+  }
+
+  const inputPattern = /\[\s*\*conversation_history/g
+  let match: RegExpExecArray | null
+  while ((match = inputPattern.exec(code)) !== null) {
+    const open = match.index
+    const close = findClosingBracket(code, open)
+    const body = code.slice(open + match[0].length, close - 1)
+    const extra = body.replace(/^,/, '')
+    const call = extra.trim()
+      ? `conversation_history.as_input(${extra})`
+      : 'conversation_history.as_input()'
+    code = code.slice(0, open) + call + code.slice(close)
+    inputPattern.lastIndex = open + call.length
+  }
+
+  return code
+}
@@ -0,0 +1,102 @@
+/**
+ * Dataflow analysis for awaited node calls.
+ *
+ * Each node that performs a single awaited call (Agent, FileSearch, ...) is
+ * described as a NodeStep: the call itself, the statements that shape its
+ * result afterwards, and the Python names it reads and writes. Consecutive
+ * steps with no read/write conflicts between them are issued together with
+ * `asyncio.gather`, while conflicting steps (for example two Agents that both
+ * touch `conversation_history`) keep their original order.
+ */
+
+export interface NodeStep {
+  nodeId: string
+  // Awaited call whose result is bound to `target`. Continuation lines of
+  // `expression` already carry the indentation of the surrounding statement.
+  call: { target: string; expression: string }
+  // Statements run after the call resolves (result shaping, history updates)
+  post: string
+  // Python names the call or its post statements read
+  reads: string[]
+  // Python names the call or its post statements assign or mutate
+  writes: string[]
+}
+
+// Name used by every node that reads or appends to the shared history
+export const CONVERSATION_HISTORY = 'conversation_history'
+
+const intersects = (a: Set<string>, b: string[]): boolean =>
+  b.some((name) => a.has(name))
+
+/**
+ * Split steps into ordered groups whose members are independent of each other.
+ * A step joins the current group only if it does not read anything the group
+ * writes and does not write anything the group reads or writes.
+ */
+export function groupIndependentSteps(steps: NodeStep[]): NodeStep[][] {
+  const groups: NodeStep[][] = []
+  let group: NodeStep[] = []
+  let groupReads = new Set<string>()
+  let groupWrites = new Set<string>()
+
+  for (const step of steps) {
+    const conflicts =
+      intersects(groupWrites, step.reads) ||
+      intersects(groupWrites, step.writes) ||
+      intersects(groupReads, step.writes)
+
+    if (group.length > 0 && conflicts) {
+      groups.push(group)
+      group = []
+      groupReads = new Set<string>()
+      groupWrites = new Set<string>()
+    }
+
+    group.push(step)
+    step.reads.forEach((name) => groupReads.add(name))
+    step.writes.forEach((name) => groupWrites.add(name))
+  }
+
+  if (group.length > 0) {
+    groups.push(group)
+  }
+
+  return groups
+}
+
+/**
+ * Generate code for a sequence of steps. Single-step groups are emitted as a
+ * plain `await`; larger groups are awaited together with `asyncio.gather`,
+ * followed by each step's post statements in their original order.
+ */
+export function generateNodeStepsCode(
+  steps: NodeStep[],
+  indent: string = '  '
+): string {
+  let code = ''
+
+  for (const group of groupIndependentSteps(steps)) {
+    if (group.length === 1) {
+      const [step] = group
+      code += `
+${indent}${step.call.target} = await ${step.call.expression}${step.post}`
+      continue
+    }
+
+    const targets = group.map((step) => step.call.target).join(', ')
+    const calls = group
+      .map(
+        (step) =>
+          `${indent}  ${step.call.expression.replace(/\n/g, '\n  ')}`
+      )
+      .join(',\n')
+
+    code += `
+${indent}${targets} = await asyncio.gather(
+${calls}
+${indent})`
+    code += group.map((step) => step.post).join('')
+  }
+
+  return code
+}
@@ -0,0 +1,274 @@
+import { Edge, WorkflowNode } from '../types/workflow'
+import { findClosingBracket } from './helpers'
+
+/**
+ * Use-def analysis of the run_workflow body.
+ *
+ * Every node binds its output to a Python name (`agent_result`,
+ * `filesearch_result1`, ...), and later nodes, conditions and the return
+ * statement read it through that name. An output whose name is read nowhere
+ * else in the body is dead. Nodes with no outgoing edge are the workflow's
+ * outputs, whether or not run_workflow returns them, so their results stay.
+ * The other dead outputs are handled by kind:
+ *
+ * - result records (`X_result = {...}` or `StructuredOutput(...)`) are removed
+ * - File Search calls whose response is then unread are removed, from an
+ *   `asyncio.gather` too: a search has no effect besides its result. A comment
+ *   is left where the call was
+ * - other node calls whose result is unread (agents, which may call tools, and
+ *   MCP tools) still run, and are flagged with a comment instead
+ *
+ * The analysis repeats until nothing changes. It is flow-insensitive: a name
+ * read in any branch keeps all of its definitions.
+ *
+ * Separately, reasoning summaries are only requested when the module reads
+ * them, which the generated runtime doesn't: run_agent_node forwards output
+ * text deltas only.
+ */
+
+// Node calls with no effect besides their result
+const PURE_CALLS =
+  /^run_node\("[^"]*", (rate_limited_search|node_cache\.search_vector_store)\(/
+
+const NODE_ID = /^(?:run_agent_node|run_node)\(\s*"([^"]+)"/
+
+// Whether nothing reads name: it isn't a workflow output, and every
+// occurrence of it is an assignment to it
+function isUnread(body: string, name: string, live: Set<string>): boolean {
+  if (live.has(name)) {
+    return false
+  }
+  const uses = body.match(new RegExp(`(?<![\\w.])${name}\\b`, 'g'))?.length
+  const definitions = body.match(
+    new RegExp(`^ *(?:\\w+, )*${name}(?:, \\w+)* = `, 'gm')
+  )?.length
+  return uses === definitions
+}
+
+// Index just past the statement starting at `start`: its first bracket's match
+function statementEnd(body: string, start: number): number {
+  const lineEnd = body.indexOf('\n', start)
+  const firstLine = body.slice(start, lineEnd === -1 ? undefined : lineEnd)
+  const open = firstLine.search(/[([{]/)
+  const close = open === -1 ? -1 : findClosingBracket(body, start + open)
+  const end = body.indexOf('\n', close === -1 ? start : close)
+  return end === -1 ? body.length : end
+}
+
+// Remove body[start, end) and its line break, keeping the block non-empty
+function removeStatement(body: string, start: number, end: number): string {
+  const indent = body.slice(start).match(/^ */)![0]
+  const before = body.slice(0, start).replace(/\n+$/, '')
+  const after = body.slice(end)
+  // The line that may open the block, past the comments above the statement
+  const opener =
+    before
+      .split('\n')
+      .reverse()
+      .find((line) => !/^ *#/.test(line)) ?? ''
+  const next = after.match(/^\n*( *)\S/)
+  const emptiesBlock =
+    opener.endsWith(':') &&
+    (!next || next[1].length <= opener.search(/\S/))
+  const blankLines = body.slice(before.length, start)
+  return emptiesBlock
+    ? `${before}\n${indent}pass${after}`
+    : `${before}${blankLines.slice(0, -1)}${after}`
+}
+
+interface Call {
+  target: string
+  expression: string
+}
+
+// The calls awaited together by an asyncio.gather statement, if they parse
+function gatherCalls(
+  body: string,
+  start: number,
+  end: number
+): Call[] | null {
+  const statement = body.slice(start, end)
+  const header = statement.match(
+    /^ *((?:\w+, )+\w+) = await asyncio\.gather\(\n/
+  )
+  if (!header) return null
+  const targets = header[1].split(', ')
+  const calls: Call[] = []
+  let i = header[0].length
+  for (const target of targets) {
+    while (/[\s,]/.test(statement[i])) i++
+    const open = statement.indexOf('(', i)
+    const close = open === -1 ? -1 : findClosingBracket(statement, open)
+    if (close === -1) return null
+    calls.push({ target, expression: statement.slice(i, close) })
+    i = close
+  }
+  return calls
+}
+
+function renderCalls(indent: string, calls: Call[]): string {
+  if (calls.length === 1) {
+    // Continuation lines of gathered calls are indented one more level
+    const [call] = calls
+    const expression = call.expression.replace(/\n  /g, '\n')
+    return `${indent}${call.target} = await ${expression}`
+  }
+  const targets = calls.map((call) => call.target).join(', ')
+  const expressions = calls.map((call) => `${indent}  ${call.expression}`)
+  return `${indent}${targets} = await asyncio.gather(
+${expressions.join(',\n')}
+${indent})`
+}
+
+// The awaited node calls of the body, with the statement each belongs to
+function nodeCalls(body: string) {
+  return Array.from(body.matchAll(/^( *)(\w+(?:, \w+)*) = await (.)/gm)).map(
+    (match) => {
+      const start = match.index!
+      const end = statementEnd(body, start)
+      const calls = gatherCalls(body, start, end) || [
+        {
+          target: match[2],
+          expression: body.slice(start + match[0].length - 1, end),
+        },
+      ]
+      return { indent: match[1], start, end, calls }
+    }
+  )
+}
+
+function unusedComment(
+  indent: string,
+  labels: Map<string, string>,
+  nodeId: string,
+  consequence: string
+): string {
+  return `${indent}# Unused: nothing reads the result of "${labels.get(nodeId) ?? nodeId}" (${nodeId}); ${consequence}\n`
+}
+
+// Remove one dead output, returning the new body, or null if there is none
+function removeDeadOutput(
+  body: string,
+  liveNames: Set<string>,
+  labels: Map<string, string>
+): string | null {
+  for (const match of Array.from(
+    body.matchAll(/^ *(\w+_result\d*) = (?:\{|StructuredOutput\()/gm)
+  )) {
+    const end = statementEnd(body, match.index!)
+    const record = body.slice(match.index!, end)
+    const shapesLive = Array.from(liveNames).some((name) =>
+      new RegExp(`\\b${name}\\b`).test(record.slice(match[1].length))
+    )
+    if (!shapesLive && isUnread(body, match[1], liveNames)) {
+      return removeStatement(body, match.index!, end)
+    }
+  }
+  for (const { indent, start, end, calls } of nodeCalls(body)) {
+    const live = calls.filter(
+      (call) =>
+        !PURE_CALLS.test(call.expression) ||
+        !isUnread(body, call.target, liveNames)
+    )
+    if (live.length === calls.length) {
+      continue
+    }
+    const comments = calls
+      .filter((call) => !live.includes(call))
+      .map((call) => call.expression.match(NODE_ID)?.[1])
+      .map((nodeId) =>
+        nodeId
+          ? unusedComment(indent, labels, nodeId, 'the search is skipped')
+          : ''
+      )
+      .join('')
+    const flagged = body.slice(0, start) + comments + body.slice(start)
+    const offset = comments.length
+    return live.length === 0
+      ? removeStatement(flagged, start + offset, end + offset)
+      : flagged.slice(0, start + offset) +
+          renderCalls(indent, live) +
+          flagged.slice(end + offset)
+  }
+  return null
+}
+
+// Ids of the nodes with no outgoing edge, in the workflow and in loop bodies
+function sinkNodeIds(nodes: WorkflowNode[], edges: Edge[]): Set<string> {
+  const sinks = new Set<string>()
+  for (const node of nodes) {
+    if (!edges.some((e) => e.source_node_id === node.id)) {
+      sinks.add(node.id)
+    }
+    const body = node.config?.body
+    sinkNodeIds(body?.nodes || [], body?.edges || []).forEach((id) =>
+      sinks.add(id)
+    )
+  }
+  return sinks
+}
+
+function nodeLabels(nodes: WorkflowNode[]): Map<string, string> {
+  const labels = new Map<string, string>()
+  for (const node of nodes) {
+    labels.set(node.id, node.label)
+    nodeLabels(node.config?.body?.nodes || []).forEach((label, id) =>
+      labels.set(id, label)
+    )
+  }
+  return labels
+}
+
+/**
+ * Remove the result records and File Search calls of run_workflow whose
+ * outputs nothing reads, and flag the other node calls whose results are
+ * unread.
+ */
+export function eliminateDeadOutputs(
+  body: string,
+  nodes: WorkflowNode[],
+  edges: Edge[]
+): string {
+  const sinks = sinkNodeIds(nodes, edges)
+  const live = new Set(
+    nodeCalls(body).flatMap(({ calls }) =>
+      calls
+        .filter((call) => sinks.has(call.expression.match(NODE_ID)?.[1] ?? ''))
+        .map((call) => call.target)
+    )
+  )
+  const labels = nodeLabels(nodes)
+  let next: string | null = body
+  while (next !== null) {
+    body = next
+    next = removeDeadOutput(body, live, labels)
+  }
+
+  for (const { indent, start, calls } of nodeCalls(body).reverse()) {
+    const comments = calls
+      .map((call) => ({ call, nodeId: call.expression.match(NODE_ID)?.[1] }))
+      .filter(
+        ({ call, nodeId }) => nodeId && isUnread(body, call.target, live)
+      )
+      .map(({ nodeId }) =>
+        unusedComment(
+          indent,
+          labels,
+          nodeId!,
+          'it still runs since it may have side effects'
+        )
+      )
+    body = body.slice(0, start) + comments.join('') + body.slice(start)
+  }
+  return body
+}
+
+/**
+ * Stop requesting reasoning summaries when nothing in the module reads them.
+ */
+export function dropUnreadReasoningSummaries(code: string): string {
+  if (code.includes('reasoning_summary')) {
+    return code
+  }
+  return code.replace(/,\n\s*summary="[^"]*"(?=\n\s*\))/g, '')
+}
@@ -0,0 +1,84 @@
+import { splitStatements, Statement, trailingBlankLines } from './helpers'
+
+/**
+ * Interning of identical top-level definitions.
+ *
+ * Agent nodes with the same config emit the same `Agent(...)`, agents sharing
+ * a function tool each emit its definition, and JSON schemas with the same
+ * nested object emit the same model under different names. Each agent, web
+ * search tool and schema model is keyed by its content without the name it
+ * defines, after renaming the models already interned. The first definition of
+ * each content is kept, and later ones become aliases of it
+ * (`agent1 = agent`). Definitions of the same name with the same content,
+ * such as function tools, are dropped. Fewer agents and models mean smaller
+ * modules, faster imports and less memory in processes hosting many
+ * workflows.
+ *
+ * Models used as an agent's `output_type` are never aliased: their class name
+ * is the name of the JSON schema sent to the model.
+ */
+
+// Key of an internable statement, and the name it defines
+function definitionKey(
+  statement: Statement,
+  renames: Map<string, string>
+): { name: string; key: string } | null {
+  const start = statement.lines.findIndex((line) => !/^(#|@)/.test(line))
+  const header = statement.lines[start] ?? ''
+  const rename = (text: string) =>
+    text.replace(/\b\w+\b/g, (word) => renames.get(word) ?? word)
+
+  if (statement.lines.slice(0, start).includes('@function_tool')) {
+    const name = header.match(/^def (\w+)\(/)?.[1]
+    const definition = statement.lines.filter((line) => !/^#/.test(line))
+    return name ? { name, key: definition.join('\n').trim() } : null
+  }
+  const model = header.match(/^class (\w+)\(BaseModel\):$/)
+  if (model) {
+    const body = statement.lines.slice(start + 1).join('\n').trim()
+    return { name: model[1], key: `class:${rename(body)}` }
+  }
+  const call = header.match(/^(\w+) = ((?:Agent|WebSearchTool)\([^]*)$/)
+  if (call) {
+    const value = [call[2], ...statement.lines.slice(start + 1)]
+    return { name: call[1], key: rename(value.join('\n').trim()) }
+  }
+  return null
+}
+
+export function internDefinitions(code: string): string {
+  const statements = splitStatements(code)
+  const outputTypes = new Set(
+    Array.from(code.matchAll(/\boutput_type=(\w+)/g), (match) => match[1])
+  )
+  // Content -> name of its first definition
+  const interned = new Map<string, string>()
+  // Alias -> the name it stands for
+  const renames = new Map<string, string>()
+  const output: string[] = []
+  for (const statement of statements) {
+    const definition = definitionKey(statement, renames)
+    const first = definition && interned.get(definition.key)
+    if (!definition || first === undefined) {
+      if (definition) interned.set(definition.key, definition.name)
+      output.push(...statement.lines)
+      continue
+    }
+    const blankLines = trailingBlankLines(statement.lines)
+    if (first === definition.name) {
+      // Same name and content: already defined
+      const missing = blankLines - trailingBlankLines(output)
+      output.push(...Array(Math.max(missing, 0)).fill(''))
+    } else if (outputTypes.has(definition.name)) {
+      output.push(...statement.lines)
+    } else {
+      renames.set(definition.name, first)
+      output.push(
+        ...statement.lines.filter((line) => /^#/.test(line)),
+        `${definition.name} = ${first}`,
+        ...Array(blankLines).fill('')
+      )
+    }
+  }
+  return output.join('\n')
+}
@@ -0,0 +1,245 @@
+import { WorkflowNode } from '../types/workflow'
+
+/**
+ * Durable User Approval nodes.
+ *
+ * Each approval calls `request_approval(...)`. Inside `start_workflow` or
+ * `resume_workflow` a pending approval suspends the run: the workflow input,
+ * the decisions taken so far, the journal of the nodes that already ran (see
+ * workflow-journal.ts) and a snapshot of `state`, `workflow` and
+ * `conversation_history` are saved to `approval_store` and a
+ * `PendingApproval` is returned. Resuming re-runs `run_workflow`, replaying
+ * the journal and decisions up to the approval, so a pending approval holds
+ * no task or memory.
+ */
+
+export interface ApprovalTimeout {
+  // Seconds; null waits indefinitely
+  timeout: number | null
+  // Branch taken once the timeout has passed
+  onTimeout: boolean
+}
+
+export function getApprovalTimeout(node?: WorkflowNode): ApprovalTimeout {
+  const config = node?.config || {}
+  // Empty inputs from the config panel arrive as ''
+  const timeout =
+    config.timeout_seconds === '' ? NaN : Number(config.timeout_seconds)
+  return {
+    timeout: Number.isFinite(timeout) && timeout > 0 ? timeout : null,
+    onTimeout: config.on_timeout === 'approve',
+  }
+}
+
+/**
+ * `approval_request` function for one User Approval node, e.g.
+ * `approval_request1`. The snapshot keywords come from the call site.
+ */
+export function generateApprovalRequestFunction(
+  name: string,
+  node?: WorkflowNode
+): string {
+  const { timeout, onTimeout } = getApprovalTimeout(node)
+  const nodeId = node ? `"${node.id}"` : 'None'
+  return `async def ${name}(message: str, **snapshot):
+  return await request_approval(${nodeId}, message, snapshot, timeout=${timeout ?? 'None'}, on_timeout=${onTimeout ? 'True' : 'False'})`
+}
+
+/**
+ * Condition of a User Approval node: the awaited call of its
+ * `approval_request` function. Every node generator emits it through here, so
+ * no call is left un-awaited, where the coroutine would always be truthy.
+ */
+export function generateApprovalCall(name: string, messageVar: string): string {
+  return `await ${name}(${messageVar})`
+}
+
+/**
+ * Pass every `approval_request(...)` call the variables saved when the run
+ * suspends. `state` is only defined by workflows that declare it. Throws if a
+ * call wasn't emitted by generateApprovalCall.
+ */
+export function applyDurableApprovals(code: string, hasState: boolean): string {
+  const snapshot = [
+    ...(hasState ? ['state=state'] : []),
+    'workflow=workflow',
+    'conversation_history=conversation_history',
+  ].join(', ')
+  const unawaited = code.match(
+    /^.*(?<!\bawait |\bdef )\bapproval_request\d*\(.*$/m
+  )
+  if (unawaited) {
+    throw new Error(
+      `User Approval call is not awaited: ${unawaited[0].trim()}`
+    )
+  }
+  return code.replace(
+    /\bawait (approval_request\d*)\((approval_message\d*)\)/g,
+    `await $1($2, ${snapshot})`
+  )
+}
+
+export const DURABLE_APPROVAL_UTILS = `# Durable approvals
+
+class WorkflowSuspended(BaseException):
+    # A BaseException, like CancelledError, so node error handlers let it through
+    def __init__(self, node_id, message, snapshot, timeout, on_timeout):
+        super().__init__(node_id)
+        self.node_id = node_id
+        self.message = message
+        self.snapshot = snapshot
+        self.timeout = timeout
+        self.on_timeout = on_timeout
+
+
+@dataclass
+class PendingApproval:
+    handle: str
+    node_id: Optional[str]
+    message: str
+    created_at: float
+    # After this time (time.time()) the node's default branch is taken
+    expires_at: Optional[float] = None
+    # state, workflow and conversation_history when the run was suspended
+    snapshot: Optional[dict] = None
+
+
+async def request_approval(node_id, message, snapshot, timeout=None, on_timeout=False):
+    run = _journaled_run.get()
+    if run is None or run.decisions is None:
+        # Outside start_workflow/resume_workflow there is nobody to ask
+        return True
+    index = run.approvals
+    run.approvals += 1
+    if index < len(run.decisions):
+        recorded_id, approved = run.decisions[index]
+        if recorded_id != node_id:
+            raise RuntimeError(f"Cannot resume: expected approval {recorded_id}, reached {node_id}; the workflow changed")
+        return approved
+    raise WorkflowSuspended(node_id, message, snapshot, timeout, on_timeout)
+
+
+class ApprovalStore:
+    """Suspended workflow runs waiting for a User Approval decision, in SQLite.
+
+    A row holds everything resume_workflow() needs: the workflow input, the
+    decisions taken so far, the recorded results of the nodes that already
+    ran and the snapshot taken at the approval. Node results must pickle.
+    """
+
+    def __init__(self, path="workflow_approvals.sqlite3"):
+        self.path = path
+        self._db = None
+
+    def _connect(self):
+        if self._db is None:
+            self._db = sqlite3.connect(self.path)
+            with self._db:
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS approvals (handle TEXT PRIMARY KEY, node_id TEXT, message TEXT, "
+                    "created_at REAL, expires_at REAL, record BLOB)"
+                )
+                self._db.execute("CREATE INDEX IF NOT EXISTS approvals_expires_at ON approvals (expires_at)")
+        return self._db
+
+    def save(self, input, run, suspended):
+        now = time.time()
+        approval = PendingApproval(
+            handle=uuid.uuid4().hex,
+            node_id=suspended.node_id,
+            message=suspended.message,
+            created_at=now,
+            expires_at=now + suspended.timeout if suspended.timeout else None,
+            snapshot=suspended.snapshot,
+        )
+        record = pickle.dumps({
+            "input": input,
+            "journal": run.journal,
+            "decisions": run.decisions,
+            "node_id": suspended.node_id,
+            "on_timeout": suspended.on_timeout,
+            "expires_at": approval.expires_at,
+            "snapshot": suspended.snapshot,
+        })
+        with self._connect() as db:
+            db.execute(
+                "INSERT INTO approvals VALUES (?, ?, ?, ?, ?, ?)",
+                (approval.handle, approval.node_id, approval.message, approval.created_at, approval.expires_at, record),
+            )
+        return approval
+
+    def take(self, handle):
+        # Removing the row first means a handle can only be resumed once
+        with self._connect() as db:
+            row = db.execute("SELECT record FROM approvals WHERE handle = ?", (handle,)).fetchone()
+            if row is None or db.execute("DELETE FROM approvals WHERE handle = ?", (handle,)).rowcount == 0:
+                return None
+        return pickle.loads(row[0])
+
+    def get(self, handle):
+        """The pending approval with its snapshot, or None once it was resumed."""
+        row = self._connect().execute(
+            "SELECT handle, node_id, message, created_at, expires_at, record FROM approvals WHERE handle = ?", (handle,)
+        ).fetchone()
+        if row is None:
+            return None
+        return PendingApproval(*row[:5], snapshot=pickle.loads(row[5])["snapshot"])
+
+    def pending(self, expired=False):
+        """Pending approvals, oldest first, without their snapshots."""
+        query = "SELECT handle, node_id, message, created_at, expires_at FROM approvals"
+        params = ()
+        if expired:
+            query += " WHERE expires_at <= ?"
+            params = (time.time(),)
+        rows = self._connect().execute(query + " ORDER BY created_at", params).fetchall()
+        return [PendingApproval(*row) for row in rows]
+
+
+approval_store = ApprovalStore()`
+
+export const DURABLE_APPROVAL_ENTRYPOINTS = `# Durable entrypoints
+async def _run_durable(input, journal, decisions):
+  run = _JournaledRun(journal, decisions=decisions)
+  token = _journaled_run.set(run)
+  try:
+    return await run_workflow(WorkflowInput(**input))
+  except WorkflowSuspended as suspended:
+    return approval_store.save(input, run, suspended)
+  finally:
+    _journaled_run.reset(token)
+
+
+async def start_workflow(workflow_input: WorkflowInput):
+  """Run the workflow until it ends or reaches a User Approval node.
+
+  Returns the workflow output, or a PendingApproval whose handle is passed
+  to resume_workflow() once someone decides. The suspended run lives in
+  approval_store only, so pending approvals hold no task or memory.
+  """
+  return await _run_durable(workflow_input.model_dump(), [], [])
+
+
+async def resume_workflow(handle, approved):
+  """Continue a suspended run with the decision for its pending approval.
+
+  Nodes that ran before the approval are replayed from their recorded
+  results, not called again. An approval past its timeout takes the node's
+  default branch whatever approved says. Returns the workflow output or the
+  next PendingApproval.
+  """
+  record = approval_store.take(handle)
+  if record is None:
+    raise KeyError(f"No pending approval with handle {handle!r}")
+  if record["expires_at"] is not None and record["expires_at"] <= time.time():
+    approved = record["on_timeout"]
+  decisions = [*record["decisions"], (record["node_id"], bool(approved))]
+  return await _run_durable(record["input"], record["journal"], decisions)
+
+
+async def expire_approvals():
+  """Resume every run whose approval timed out; returns results by handle."""
+  return {
+    approval.handle: await resume_workflow(approval.handle, False)
+    for approval in approval_store.pending(expired=True)
+  }`
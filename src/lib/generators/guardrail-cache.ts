@@ -0,0 +1,147 @@
+import { WorkflowNode } from '../types/workflow'
+import { parseCacheSettings } from './node-cache'
+
+/**
+ * Result cache for the checks of Guardrails nodes, enabled per node with the
+ * same `cache` config as the node result cache:
+ *
+ *   "config": { "cache": { "enabled": true, "backend": "sqlite", "ttl_seconds": 3600 } }
+ *
+ * Each check's result is stored in `guardrail_cache` under a hash of the text,
+ * the media type, the guardrail name and its config, so the same text is not
+ * checked twice by the same guardrail: an agent output checked again further
+ * on, chained Guardrails nodes sharing a check, or a While loop re-checking
+ * unchanged text. `run_guardrails_in_cost_order` looks the checks up before
+ * running any and only runs the ones without a cached result.
+ */
+
+/**
+ * Keyword arguments that enable the cache for a Guardrails node's call, e.g.
+ * `, cache_backend="sqlite", cache_ttl=3600`, or '' when it is disabled.
+ */
+export function generateGuardrailCacheArgs(node: WorkflowNode): string {
+  const settings = parseCacheSettings(node.config?.cache)
+  if (!settings) {
+    return ''
+  }
+  return `, cache_backend="${settings.backend}", cache_ttl=${settings.ttl ?? 'None'}`
+}
+
+export const GUARDRAIL_CACHE_UTILS = `# Guardrail result cache
+
+class GuardrailResultCache:
+    """Results of guardrail checks, keyed by text, media type, guardrail name and config.
+
+    The "memory" backend is an LRU of max_entries entries; the "sqlite" backend
+    persists pickled results in the database at path. Results expire after ttl
+    seconds (None keeps them until evicted). Failed checks are not stored.
+    hits and misses count lookups per guardrail name.
+    """
+
+    def __init__(self, max_entries=4096, path="guardrail_cache.sqlite3"):
+        self.max_entries = max_entries
+        self.path = path
+        self.hits = Counter()
+        self.misses = Counter()
+        self._memory = OrderedDict()
+        self._db = None
+
+    def stats(self):
+        return {"hits": dict(self.hits), "misses": dict(self.misses)}
+
+    def lookup(self, text, media_type, bundle, backend):
+        """Cached results of the guardrails in bundle, by index."""
+        found = {}
+        for index, guardrail in enumerate(bundle):
+            key = self._key(text, media_type, guardrail)
+            results = self._get_sqlite(key) if backend == "sqlite" else self._get_memory(key)
+            if results is None:
+                self.misses[guardrail.definition.name] += 1
+            else:
+                self.hits[guardrail.definition.name] += 1
+                found[index] = results
+        return found
+
+    def store(self, text, media_type, bundle, results, backend, ttl=None):
+        """Store the results (by index, like lookup) of checks that ran."""
+        expires_at = time.time() + ttl if ttl else None
+        for index, group in results.items():
+            if any(result.execution_failed for result in group):
+                continue
+            key = self._key(text, media_type, bundle[index])
+            if backend == "sqlite":
+                self._put_sqlite(key, group, expires_at)
+            else:
+                self._memory[key] = (expires_at, group)
+                self._memory.move_to_end(key)
+                while len(self._memory) > self.max_entries:
+                    self._memory.popitem(last=False)
+
+    def _key(self, text, media_type, guardrail):
+        config = guardrail.config
+        if isinstance(config, BaseModel):
+            config = config.model_dump(mode="json")
+        payload = json.dumps([guardrail.definition.name, config, media_type], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode() + b"\\0" + text.encode()).hexdigest()
+
+    def _get_memory(self, key):
+        entry = self._memory.get(key)
+        if entry is None:
+            return None
+        expires_at, results = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self._memory[key]
+            return None
+        self._memory.move_to_end(key)
+        return results
+
+    def _connect(self):
+        if self._db is None:
+            self._db = sqlite3.connect(self.path)
+            self._db.execute("CREATE TABLE IF NOT EXISTS guardrail_cache (key TEXT PRIMARY KEY, expires_at REAL, value BLOB)")
+        return self._db
+
+    def _get_sqlite(self, key):
+        row = self._connect().execute("SELECT expires_at, value FROM guardrail_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return None
+        expires_at, value = row
+        if expires_at is not None and expires_at <= time.time():
+            with self._db:
+                self._db.execute("DELETE FROM guardrail_cache WHERE key = ?", (key,))
+            return None
+        return pickle.loads(value)
+
+    def _put_sqlite(self, key, results, expires_at):
+        try:
+            value = pickle.dumps(results)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            # Results that can't be pickled are simply not persisted
+            return
+        with self._connect() as db:
+            db.execute("INSERT OR REPLACE INTO guardrail_cache VALUES (?, ?, ?)", (key, expires_at, value))
+
+
+guardrail_cache = GuardrailResultCache()`
+
+/**
+ * `run_guardrails_in_cost_order` with the cache lookup, replacing the plain
+ * version when a Guardrails node has its cache enabled.
+ */
+export const CACHED_COST_ORDER_GUARDRAILS = `async def run_guardrails_in_cost_order(ctx, text, media_type, bundle, cache_backend=None, cache_ttl=None, **kwargs):
+    # Local checks run first and the model/API checks, together, only once they
+    # pass. Checks skipped after a tripwire have no result. Results come back
+    # in bundle order, like run_guardrails. With a cache backend, checks with a
+    # cached result for this text are not run again.
+    results = guardrail_cache.lookup(text, media_type, bundle, cache_backend) if cache_backend else {}
+    fresh = [index for index in range(len(bundle)) if index not in results]
+    local = [index for index in fresh if _is_local_guardrail(bundle[index])]
+    remote = [index for index in fresh if index not in local]
+    tripped = any(guardrails_has_tripwire(group) for group in results.values())
+    for tier in (local, remote):
+        if tripped:
+            break
+        tripped = await _run_guardrails_tier(ctx, text, media_type, bundle, tier, results, **kwargs)
+    if cache_backend:
+        guardrail_cache.store(text, media_type, bundle, {index: results[index] for index in fresh if index in results}, cache_backend, cache_ttl)
+    return [result for _, group in sorted(results.items()) for result in group]`
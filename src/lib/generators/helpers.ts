@@ -118,3 +118,110 @@ export function checkNodeTypes(nodes: WorkflowNode[]) {
     hasSetState: nodes.some((n) => n.node_type === 'builtins.SetState'),
   }
 }
+
+// Index just past the bracket matching the one at `open`, skipping string literals
+export function findClosingBracket(code: string, open: number): number {
+  let depth = 0
+  let quote = ''
+  for (let i = open; i < code.length; i++) {
+    const ch = code[i]
+    if (quote) {
+      if (ch === '\\') {
+        i++
+      } else if (ch === quote) {
+        quote = ''
+      }
+    } else if (ch === '"' || ch === "'") {
+      quote = ch
+    } else if (ch === '[' || ch === '{' || ch === '(') {
+      depth++
+    } else if (ch === ']' || ch === '}' || ch === ')') {
+      depth--
+      if (depth === 0) {
+        return i + 1
+      }
+    }
+  }
+  return -1
+}
+
+export interface Statement {
+  lines: string[]
+  // The lines with string literals emptied and comments removed
+  code: string[]
+  // Whether each line starts inside a multi-line string
+  inString: boolean[]
+}
+
+/**
+ * Split Python source into its top-level statements. Comments and decorators
+ * directly above a statement belong to it; blank lines belong to the
+ * statement before them.
+ */
+export function splitStatements(source: string): Statement[] {
+  const statements: Statement[] = []
+  let current: Statement | null = null
+  let quote = ''
+  let depth = 0
+  let continued = false
+  for (const line of source.split('\n')) {
+    const startsInString = quote !== ''
+    const atBoundary = !startsInString && depth === 0 && !continued
+    let code = ''
+    for (let i = 0; i < line.length; i++) {
+      const ch = line[i]
+      if (quote) {
+        if (ch === '\\') {
+          i++
+        } else if (line.startsWith(quote, i)) {
+          i += quote.length - 1
+          quote = ''
+          code += '""'
+        }
+      } else if (ch === '#') {
+        break
+      } else if (ch === '"' || ch === "'") {
+        quote = line.startsWith(ch.repeat(3), i) ? ch.repeat(3) : ch
+        i += quote.length - 1
+      } else {
+        if ('([{'.includes(ch)) depth++
+        if (')]}'.includes(ch)) depth--
+        code += ch
+      }
+    }
+    if (quote.length === 1) {
+      // Unterminated single-quoted string
+      quote = ''
+    }
+    continued = !quote && /\\$/.test(line)
+
+    const starts =
+      atBoundary &&
+      /^[^\s#]/.test(line) &&
+      !/^(else|elif|except|finally)\b/.test(line)
+    const isPrefix = (text: string) => /^(#|@)/.test(text)
+    const attaches =
+      current !== null &&
+      current.lines.every(isPrefix) &&
+      atBoundary &&
+      line !== ''
+    const startsComment = atBoundary && /^#/.test(line)
+    if (current === null || ((starts || startsComment) && !attaches)) {
+      current = { lines: [], code: [], inString: [] }
+      statements.push(current)
+    }
+    current.lines.push(line)
+    current.code.push(code)
+    current.inString.push(startsInString)
+  }
+  return statements
+}
+
+// Number of blank lines at the end of lines
+export function trailingBlankLines(lines: string[]): number {
+  let count = 0
+  while (count < lines.length && lines[lines.length - 1 - count] === '') {
+    count++
+  }
+  return count
+}
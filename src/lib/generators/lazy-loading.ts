@@ -0,0 +1,253 @@
+import { WorkflowNode } from '../types/workflow'
+import { splitStatements, Statement, trailingBlankLines } from './helpers'
+
+/**
+ * Lazy loading, enabled on the Start node:
+ *
+ *   "config": { "lazy_loading": { "enabled": true } }
+ *
+ * Importing openai, agents, guardrails and mcp, then building the client,
+ * tools, schema models and agents, is most of a generated module's import
+ * time. With lazy loading the imports of those packages, and every top-level
+ * statement that needs them when it runs, move into `warmup()`. Schema
+ * models only used by moved statements move too. The module imports with the
+ * standard library and pydantic only, run_workflow calls `warmup()` first,
+ * and the module `__getattr__` calls it when one of the moved names is looked
+ * up from outside before then. Functions and classes that only use those
+ * names in their bodies stay where they are: their bodies run after warmup.
+ */
+
+// Top-level packages imported by warmup() rather than at import time
+const DEFERRED_PACKAGES = ['openai', 'agents', 'guardrails', 'mcp']
+
+export function usesLazyLoading(nodes: WorkflowNode[]): boolean {
+  const startNode = nodes.find((n) => n.node_type === 'builtins.Start')
+  return startNode?.config?.lazy_loading?.enabled === true
+}
+
+// Lines of a statement's code that run when the statement itself runs
+function definitionCode(statement: Statement): string {
+  const code = statement.code.filter((_, i) => !statement.inString[i])
+  const header = code.findIndex((line) => !/^@/.test(line) && line !== '')
+  const decorators = code.slice(0, Math.max(header, 0))
+  const first = code[header] ?? ''
+  if (/^(async\s+)?def\s/.test(first)) {
+    // Decorators, annotations and defaults; not the parameter names
+    const signature = code
+      .slice(header)
+      .join('\n')
+      .replace(/\)\s*(->[^:]*)?:[^]*$/, ')$1')
+      .replace(/^(async\s+)?def\s+\w+/, '')
+      .replace(/([(,]\s*\**)\w+(?=\s*[:=,)])/g, '$1')
+    return [...decorators, signature].join('\n')
+  }
+  if (/^class\s/.test(first)) {
+    // The class body runs, its methods' bodies don't
+    const kept: string[] = []
+    let methodIndent = -1
+    for (const line of code.slice(header)) {
+      const indent = line.search(/\S/)
+      if (methodIndent >= 0 && (indent === -1 || indent > methodIndent)) {
+        continue
+      }
+      methodIndent = /^\s+((async\s+)?def\s|@)/.test(line) ? indent : -1
+      if (methodIndent < 0) {
+        kept.push(line)
+      }
+    }
+    return [...decorators, ...kept].join('\n')
+  }
+  return code.join('\n')
+}
+
+// Global names a piece of code reads: not attributes or keyword arguments
+function referencedNames(code: string): Set<string> {
+  const names = new Set<string>()
+  const pattern = /[A-Za-z_]\w*/g
+  let match: RegExpExecArray | null
+  while ((match = pattern.exec(code)) !== null) {
+    let before = match.index - 1
+    while (before >= 0 && /\s/.test(code[before])) before--
+    let after = pattern.lastIndex
+    while (after < code.length && /[ \t]/.test(code[after])) after++
+    if (code[before] === '.' || /\d/.test(code[match.index - 1] ?? '')) {
+      continue
+    }
+    const keyword =
+      (code[before] === '(' || code[before] === ',') &&
+      code[after] === '=' &&
+      code[after + 1] !== '='
+    if (!keyword) {
+      names.add(match[0])
+    }
+  }
+  return names
+}
+
+// The global name a statement defines, if any
+function boundName(statement: Statement): string | null {
+  const first = statement.code.find((line) => !/^@/.test(line) && line !== '')
+  const match = first?.match(
+    /^(?:(?:async\s+)?def\s+(\w+)|class\s+(\w+)|(\w+)\s*(?::[^=]*)?=(?!=))/
+  )
+  return match ? match[1] || match[2] || match[3] : null
+}
+
+// Names imported from the deferred packages by an import statement, if it is one
+function deferredImport(statement: Statement): string[] | null {
+  const code = statement.code.join(' ')
+  const match = code.match(/^from\s+([\w.]+)\s+import\s+\(?([^)]*)\)?\s*$/)
+  if (!match || !DEFERRED_PACKAGES.includes(match[1].split('.')[0])) {
+    return null
+  }
+  return match[2]
+    .split(',')
+    .map((name) => name.trim().split(/\s+as\s+/).pop()!)
+    .filter(Boolean)
+}
+
+/**
+ * Move the imports of the SDKs, and the top-level statements that use them
+ * when they run, into `warmup()`, called by run_workflow and by the module
+ * `__getattr__`.
+ */
+export function applyLazyLoading(code: string): string {
+  const statements = splitStatements(code)
+  const deferredNames = new Set<string>()
+  const imports: string[] = []
+  const deferred = new Set<Statement>()
+  for (const statement of statements) {
+    const names = deferredImport(statement)
+    if (names) {
+      names.forEach((name) => deferredNames.add(name))
+      imports.push(statement.lines.join('\n').trim())
+      deferred.add(statement)
+    }
+  }
+  if (deferred.size === 0) {
+    return code
+  }
+
+  const definitions = new Map(
+    statements.map((s) => [s, referencedNames(definitionCode(s))])
+  )
+  const uses = new Map(
+    statements.map((s) => [s, referencedNames(s.code.join('\n'))])
+  )
+  const defer = (statement: Statement) => {
+    deferred.add(statement)
+    const name = boundName(statement)
+    if (name) deferredNames.add(name)
+  }
+  let changed = true
+  while (changed) {
+    changed = false
+    // Statements that need a deferred name to run
+    for (const statement of statements) {
+      if (deferred.has(statement)) continue
+      const needs = Array.from(definitions.get(statement)!)
+      if (needs.some((name) => deferredNames.has(name))) {
+        defer(statement)
+        changed = true
+      }
+    }
+    // Schema models only used by deferred statements
+    for (const statement of statements) {
+      const name = boundName(statement)
+      if (
+        deferred.has(statement) ||
+        !name ||
+        !/^class\s+\w+\(BaseModel\)/.test(statement.code.join('').trim())
+      ) {
+        continue
+      }
+      const users = statements.filter(
+        (s) => s !== statement && uses.get(s)!.has(name)
+      )
+      if (users.length > 0 && users.every((s) => deferred.has(s))) {
+        defer(statement)
+        changed = true
+      }
+    }
+  }
+
+  // The deferred statements, in order, indented into the body of warmup()
+  const body: string[] = []
+  let adjacent = false
+  for (const statement of statements) {
+    if (!deferred.has(statement) || deferredImport(statement)) {
+      adjacent = false
+      continue
+    }
+    const lines = statement.lines.slice(
+      0,
+      statement.lines.length - trailingBlankLines(statement.lines)
+    )
+    if (body.length > 0 && !adjacent) {
+      body.push('')
+    }
+    body.push(
+      ...lines.map((line, i) =>
+        statement.inString[i] || line === '' ? line : `    ${line}`
+      )
+    )
+    // Statements with no blank line between them stay together
+    adjacent = lines.length === statement.lines.length
+  }
+
+  const names = Array.from(deferredNames)
+  const block = `# Lazy loading
+
+# Names defined by warmup(); module attribute lookups load them on first use
+_DEFERRED_NAMES = frozenset({${names
+    .slice()
+    .sort()
+    .map((name) => `"${name}"`)
+    .join(', ')}})
+_warmed_up = False
+
+
+def warmup():
+    """Import the SDKs and build the client, tools, schemas and agents, once.
+
+    run_workflow calls it first, and so does looking up one of _DEFERRED_NAMES
+    on the module before then. Long-lived servers can call it at startup so
+    the first run doesn't wait for it.
+    """
+    global _warmed_up, ${names.join(', ')}
+    if _warmed_up:
+        return
+${imports.map((line) => `    ${line}`).join('\n')}
+${body.length > 0 ? `\n${body.join('\n')}` : ''}
+    _warmed_up = True
+
+
+def __getattr__(name):
+    # Only called for names the module doesn't define (yet)
+    if name in _DEFERRED_NAMES:
+        warmup()
+        return globals()[name]
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")`
+
+  // The block takes the place of the last deferred statement
+  const last = statements.filter((s) => deferred.has(s)).pop()!
+  const output: string[] = []
+  for (const statement of statements) {
+    if (statement === last) {
+      output.push(block, '', '')
+    } else if (!deferred.has(statement)) {
+      output.push(...statement.lines)
+    } else {
+      // Keep the blank lines that followed the moved statement
+      const missing =
+        trailingBlankLines(statement.lines) - trailingBlankLines(output)
+      output.push(...Array(Math.max(missing, 0)).fill(''))
+    }
+  }
+  return output
+    .join('\n')
+    .replace(
+      /^(async def run_workflow\(.*\):\n)/m,
+      '$1  # Imports the SDKs and builds the agents on the first run\n  warmup()\n'
+    )
+}
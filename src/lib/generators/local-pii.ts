@@ -0,0 +1,226 @@
+import { WorkflowNode } from '../types/workflow'
+
+/**
+ * Local PII detection, selected per PII guardrail with `engine: "local"`:
+ *
+ *   { "type": "pii", "config": {
+ *     "engine": "local",
+ *     "block": true,
+ *     "entities": ["EMAIL_ADDRESS", "CREDIT_CARD"],
+ *     "custom_entities": { "PROJECT": ["Falcon", "Project Osprey"] }
+ *   } }
+ *
+ * The guardrail is emitted as "Local PII" instead of "Contains PII" and runs
+ * in-process instead of through Presidio: one compiled regex per built-in
+ * entity type (card numbers are Luhn-checked and IBANs mod-97-checked) and an
+ * Aho-Corasick automaton for the custom terms, so a check is a few linear
+ * passes over the text. Its result info has the same keys as "Contains PII",
+ * including `checked_text` with each match replaced by `<ENTITY_TYPE>`.
+ */
+
+export function isLocalPIIGuardrail(guardrail: any): boolean {
+  return guardrail?.type === 'pii' && guardrail.config?.engine === 'local'
+}
+
+/**
+ * Whether a Guardrails node, at top level or in a While body, uses the local
+ * PII engine.
+ */
+export function usesLocalPII(nodes: WorkflowNode[]): boolean {
+  const guardrailsNodes = nodes.flatMap((n) =>
+    n.node_type === 'builtins.While' ? n.config?.body?.nodes || [] : [n]
+  )
+  return guardrailsNodes.some(
+    (n: WorkflowNode) =>
+      n.node_type === 'builtins.Guardrails' &&
+      (n.config?.guardrails || []).some(isLocalPIIGuardrail)
+  )
+}
+
+export const LOCAL_PII_IMPORTS = `from guardrails.registry import default_spec_registry
+from guardrails.spec import GuardrailSpecMetadata
+from guardrails.types import GuardrailResult
+`
+
+export const LOCAL_PII_UTILS = `# Local PII
+
+# Checked in this order, so where two patterns match the same span the first wins.
+# Every quantifier is bounded, which keeps each scan linear in the length of the text.
+_LOCAL_PII_PATTERNS = {
+    "EMAIL_ADDRESS": r"(?<![\\w.%+-])[A-Za-z0-9._%+-]{1,64}@[A-Za-z0-9-]{1,63}(?:\\.[A-Za-z0-9-]{1,63}){0,8}\\.[A-Za-z]{2,24}(?![\\w-])",
+    "CREDIT_CARD": r"(?<![\\w-])\\d(?:[ -]?\\d){12,18}(?![\\w-])",
+    "IBAN_CODE": r"(?<!\\w)[A-Z]{2}\\d{2}(?: ?[A-Z0-9]){11,30}(?!\\w)",
+    "IP_ADDRESS": r"(?<![\\w.])(?:(?:25[0-5]|2[0-4]\\d|1\\d\\d|[1-9]?\\d)\\.){3}(?:25[0-5]|2[0-4]\\d|1\\d\\d|[1-9]?\\d)(?![\\w.])",
+    "US_SSN": r"(?<![\\w-])(?!000|666|9\\d\\d)\\d{3}-(?!00)\\d{2}-(?!0000)\\d{4}(?![\\w-])",
+    "PHONE_NUMBER": r"(?<![\\w+])(?<!\\d[ ().-])(?<!\\d[ ().-]{2})\\+?\\(?\\d(?:[ ().-]{0,2}\\d){6,14}(?!\\w|[ ().-]{1,2}\\d)",
+}
+_ISO_DATE = re.compile(r"\\d{4}-\\d{2}-\\d{2}")
+
+
+# Validators return the length of the valid prefix of a match, or None
+def _luhn_valid(match):
+    total = 0
+    for position, digit in enumerate(int(ch) for ch in reversed(match) if ch.isdigit()):
+        if position % 2:
+            digit = digit * 2 - 9 if digit > 4 else digit * 2
+        total += digit
+    return len(match) if total % 10 == 0 else None
+
+
+def _iban_valid(match):
+    # The pattern can run on into following uppercase words, so retry without them
+    end = len(match)
+    while end >= 15:
+        compact = match[:end].replace(" ", "")
+        if len(compact) <= 34 and int("".join(str(int(ch, 36)) for ch in compact[4:] + compact[:4])) % 97 == 1:
+            return end
+        end = match.rfind(" ", 0, end)
+    return None
+
+
+def _phone_valid(match):
+    if _ISO_DATE.fullmatch(match):
+        return None
+    return len(match) if 7 <= sum(ch.isdigit() for ch in match) <= 15 else None
+
+
+_LOCAL_PII_VALIDATORS = {
+    "CREDIT_CARD": _luhn_valid,
+    "IBAN_CODE": _iban_valid,
+    "PHONE_NUMBER": _phone_valid,
+}
+
+
+class _AhoCorasick:
+    """Case-insensitive whole-word matcher for any number of terms in one pass over the text."""
+
+    def __init__(self, terms):
+        # terms: (term, entity) pairs
+        self.goto = [{}]
+        self.fail = [0]
+        self.outputs = [[]]
+        for term, entity in terms:
+            term = term.lower()
+            state = 0
+            for ch in term:
+                if ch not in self.goto[state]:
+                    self.goto[state][ch] = len(self.goto)
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.outputs.append([])
+                state = self.goto[state][ch]
+            if state:
+                self.outputs[state].append((len(term), entity))
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for ch, child in self.goto[state].items():
+                queue.append(child)
+                if state:
+                    fallback = self.fail[state]
+                    while fallback and ch not in self.goto[fallback]:
+                        fallback = self.fail[fallback]
+                    self.fail[child] = self.goto[fallback].get(ch, 0)
+                # Terms ending at the fallback state also end here
+                self.outputs[child] = self.outputs[child] + self.outputs[self.fail[child]]
+
+    def find(self, text):
+        lowered = text.lower()
+        if len(lowered) != len(text):
+            # A few characters lowercase to several; keep offsets aligned with text
+            lowered = "".join(ch.lower()[0] for ch in text)
+        goto, fail, outputs = self.goto, self.fail, self.outputs
+        state = 0
+        for end, ch in enumerate(lowered, 1):
+            while state and ch not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(ch, 0)
+            for length, entity in outputs[state]:
+                start = end - length
+                if (start == 0 or not text[start - 1].isalnum()) and (end == len(text) or not text[end].isalnum()):
+                    yield start, end, entity
+
+
+class _LocalPIIMatcher:
+    def __init__(self, entities, custom_entities):
+        self.patterns = [
+            (entity, re.compile(pattern), _LOCAL_PII_VALIDATORS.get(entity))
+            for entity, pattern in _LOCAL_PII_PATTERNS.items()
+            if entity in entities
+        ]
+        terms = [(term, entity) for entity, values in custom_entities.items() for term in values if term.strip()]
+        self.terms = _AhoCorasick(terms) if terms else None
+
+    def find(self, text):
+        """Non-overlapping (start, end, entity) spans; the longest wins where matches overlap."""
+        spans = []
+        for entity, pattern, validate in self.patterns:
+            for match in pattern.finditer(text):
+                length = validate(match.group()) if validate else match.end() - match.start()
+                if length:
+                    spans.append((match.start(), match.start() + length, entity))
+        if self.terms is not None:
+            spans.extend(self.terms.find(text))
+        spans.sort(key=lambda span: (span[0], span[0] - span[1]))
+        kept = []
+        covered = 0
+        for span in spans:
+            if span[0] >= covered:
+                kept.append(span)
+                covered = span[1]
+        return kept
+
+
+class LocalPIIConfig(BaseModel):
+    entities: list[str] = ["EMAIL_ADDRESS", "PHONE_NUMBER", "CREDIT_CARD", "IBAN_CODE"]
+    block: bool = False
+    # Entity type -> terms matched case-insensitively as whole words
+    custom_entities: dict[str, list[str]] = {}
+
+
+_local_pii_matchers = {}
+
+
+def _check_local_pii(data, config):
+    key = config.model_dump_json()
+    matcher = _local_pii_matchers.get(key)
+    if matcher is None:
+        matcher = _local_pii_matchers[key] = _LocalPIIMatcher(config.entities, config.custom_entities)
+    detected = {}
+    parts = []
+    position = 0
+    for start, end, entity in matcher.find(data):
+        detected.setdefault(entity, []).append(data[start:end])
+        parts += (data[position:start], f"<{entity}>")
+        position = end
+    parts.append(data[position:])
+    return GuardrailResult(
+        tripwire_triggered=bool(detected) and config.block,
+        info={
+            "guardrail_name": "Local PII",
+            "detected_entities": detected,
+            "entity_types_checked": [*config.entities, *config.custom_entities],
+            "checked_text": "".join(parts),
+            "block_mode": config.block,
+            "pii_detected": bool(detected),
+        },
+    )
+
+
+async def local_pii(ctx: Any, data: str, config: LocalPIIConfig) -> GuardrailResult:
+    """Mask PII in data with <ENTITY_TYPE> placeholders, without calling external services."""
+    # Long inputs are scanned in a thread so the event loop stays responsive
+    if len(data) > 65536:
+        return await asyncio.to_thread(_check_local_pii, data, config)
+    return _check_local_pii(data, config)
+
+
+if "Local PII" not in {spec.name for spec in default_spec_registry.get_all()}:
+    # "RegEx" puts it in the local tier of run_guardrails_in_cost_order
+    default_spec_registry.register(
+        name="Local PII",
+        check_fn=local_pii,
+        description="Detects emails, phone numbers, card numbers, IBANs and custom terms locally",
+        media_type="text/plain",
+        metadata=GuardrailSpecMetadata(engine="RegEx"),
+    )`
@@ -0,0 +1,146 @@
+import { WorkflowNode } from '../types/workflow'
+import { MODERATION_RATE_LIMIT_KEY } from './rate-limiter'
+
+/**
+ * Micro-batching of moderation requests, enabled on the Start node:
+ *
+ *   "config": {
+ *     "moderation_batching": { "enabled": true, "max_batch_size": 32, "max_wait_ms": 5 }
+ *   }
+ *
+ * The guardrails context gets a copy of the shared client whose
+ * `moderations.create` goes through `moderation_batcher`. Moderation checks
+ * started by concurrent runs within `max_wait_ms` of the first one, or until
+ * `max_batch_size` are waiting, are sent as a single request with a list
+ * input, and each check gets a response holding only its own result. The
+ * moderation endpoint is the only one the guardrails call that accepts
+ * several inputs per request; LLM-based checks are not batched. Guardrails
+ * nodes that only run moderation then skip `rate_limited_guardrails`: each
+ * batch takes one slot of the "moderation" rate limit instead.
+ */
+
+export interface ModerationBatchingSettings {
+  maxBatchSize: number
+  // Seconds
+  maxWait: number
+}
+
+// Empty inputs from the config panel arrive as ''
+const toNumber = (value: number | string | undefined): number =>
+  value === '' || value === undefined ? NaN : Number(value)
+
+export function getModerationBatching(
+  nodes: WorkflowNode[]
+): ModerationBatchingSettings | null {
+  const startNode = nodes.find((n) => n.node_type === 'builtins.Start')
+  const batching = startNode?.config?.moderation_batching
+  if (batching?.enabled !== true) {
+    return null
+  }
+  const maxBatchSize = Math.floor(toNumber(batching.max_batch_size))
+  const maxWaitMs = toNumber(batching.max_wait_ms)
+  return {
+    maxBatchSize: maxBatchSize >= 1 ? maxBatchSize : 32,
+    maxWait:
+      Number.isFinite(maxWaitMs) && maxWaitMs >= 0 ? maxWaitMs / 1000 : 0.005,
+  }
+}
+
+export function generateModerationBatchingCode(
+  settings: ModerationBatchingSettings
+): string {
+  return `${MODERATION_BATCHING_UTILS}
+
+
+moderation_batcher = ModerationBatcher(max_batch_size=${settings.maxBatchSize}, max_wait=${settings.maxWait})
+# Moderation checks of concurrent runs share requests
+ctx.guardrail_llm = moderation_batcher.wrap(client)`
+}
+
+const MODERATION_BATCHING_UTILS = `# Moderation batching
+
+class _BatchedModerations:
+    def __init__(self, batcher, moderations):
+        self._batcher = batcher
+        self._moderations = moderations
+
+    async def create(self, *, input, model="omni-moderation-latest", **options):
+        # Requests that already hold several inputs or set request options go out as they are
+        if options or not isinstance(input, str):
+            return await self._moderations.create(input=input, model=model, **options)
+        return await self._batcher.submit(self._moderations, model, input)
+
+
+class ModerationBatcher:
+    """Sends the single-input moderation requests of concurrent runs together.
+
+    A request waits at most max_wait seconds for others with the same client
+    and model, or until max_batch_size are waiting, then they are sent as one
+    request with a list input, under the moderation rate limit. Each caller gets a copy of the response with
+    only its own result; if the request fails, every caller gets the error.
+    batches and items count the requests sent and the inputs they carried.
+    """
+
+    def __init__(self, max_batch_size=32, max_wait=0.005):
+        self.max_batch_size = max_batch_size
+        self.max_wait = max_wait
+        self.batches = 0
+        self.items = 0
+        self._pending = {}
+        self._timers = {}
+        self._requests = set()
+
+    def wrap(self, client):
+        """A copy of client whose moderations.create goes through the batcher."""
+        batched = client.copy()
+        batched.moderations = _BatchedModerations(self, client.moderations)
+        return batched
+
+    def stats(self):
+        return {
+            "batches": self.batches,
+            "items": self.items,
+            "mean_batch_size": self.items / self.batches if self.batches else None,
+        }
+
+    async def submit(self, moderations, model, text):
+        loop = asyncio.get_running_loop()
+        key = (moderations, model)
+        future = loop.create_future()
+        batch = self._pending.setdefault(key, [])
+        batch.append((text, future))
+        if len(batch) >= self.max_batch_size:
+            self._flush(key)
+        elif len(batch) == 1:
+            self._timers[key] = loop.call_later(self.max_wait, self._flush, key)
+        return await future
+
+    def _flush(self, key):
+        timer = self._timers.pop(key, None)
+        if timer is not None:
+            timer.cancel()
+        batch = self._pending.pop(key, None)
+        if batch:
+            request = asyncio.ensure_future(self._send(key, batch))
+            self._requests.add(request)
+            request.add_done_callback(self._requests.discard)
+
+    async def _send(self, key, batch):
+        moderations, model = key
+        self.batches += 1
+        self.items += len(batch)
+        texts = [text for text, _ in batch]
+        try:
+            async with rate_limits.acquire("${MODERATION_RATE_LIMIT_KEY}", tokens=estimate_request_tokens(texts)):
+                response = await moderations.create(model=model, input=texts)
+            if len(response.results) != len(batch):
+                raise RuntimeError(f"Moderation returned {len(response.results)} results for {len(batch)} inputs")
+        except Exception as error:
+            for _, future in batch:
+                if not future.done():
+                    future.set_exception(error)
+            return
+        for (_, future), result in zip(batch, response.results):
+            # Callers that were cancelled while waiting are skipped
+            if not future.done():
+                future.set_result(response.model_copy(update={"results": [result]}))`
@@ -0,0 +1,287 @@
+import { NodeCacheConfig } from '../nodes/types'
+import { WorkflowNode } from '../types/workflow'
+import { findClosingBracket } from './helpers'
+
+/**
+ * Opt-in result cache for Agent, FileSearch and MCP nodes.
+ *
+ * A node is cached when its config has `cache.enabled`. Its call then goes
+ * through the module-level `node_cache` with the node id, a fingerprint of
+ * the rest of the node config, the backend and the TTL; the resolved inputs
+ * (agent input items, search parameters, tool arguments) complete the key.
+ */
+
+const CACHEABLE_NODE_TYPES = [
+  'builtins.Agent',
+  'builtins.tool.FileSearch',
+  'builtins.MCP',
+]
+
+export interface NodeCacheSettings {
+  backend: 'memory' | 'sqlite'
+  // Seconds; null keeps entries until they are evicted
+  ttl: number | null
+}
+
+export function getNodeCacheConfig(
+  node: WorkflowNode
+): NodeCacheSettings | null {
+  if (!CACHEABLE_NODE_TYPES.includes(node.node_type)) {
+    return null
+  }
+  return parseCacheSettings(node.config?.cache)
+}
+
+/**
+ * Backend and TTL of a `cache` config, or null when it is not enabled.
+ * Guardrails nodes use the same config for their result cache.
+ */
+export function parseCacheSettings(
+  cache: NodeCacheConfig | undefined
+): NodeCacheSettings | null {
+  if (!cache?.enabled) {
+    return null
+  }
+  // Empty inputs from the config panel arrive as ''
+  const ttl = cache.ttl_seconds === '' ? NaN : Number(cache.ttl_seconds)
+  return {
+    backend: cache.backend === 'sqlite' ? 'sqlite' : 'memory',
+    ttl: Number.isFinite(ttl) && ttl > 0 ? ttl : null,
+  }
+}
+
+// cyrb53: a fast 53-bit string hash, enough to tell node configs apart
+function hashString(value: string): string {
+  let h1 = 0xdeadbeef
+  let h2 = 0x41c6ce57
+  for (let i = 0; i < value.length; i++) {
+    const ch = value.charCodeAt(i)
+    h1 = Math.imul(h1 ^ ch, 2654435761)
+    h2 = Math.imul(h2 ^ ch, 1597334677)
+  }
+  h1 = Math.imul(h1 ^ (h1 >>> 16), 2246822507)
+  h1 ^= Math.imul(h2 ^ (h2 >>> 13), 3266489909)
+  h2 = Math.imul(h2 ^ (h2 >>> 16), 2246822507)
+  h2 ^= Math.imul(h1 ^ (h1 >>> 13), 3266489909)
+  return (4294967296 * (2097151 & h2) + (h1 >>> 0)).toString(16)
+}
+
+/**
+ * Keyword arguments that select a node's cache entry, e.g.
+ * `fingerprint="1a2b3c", backend="sqlite", ttl=3600`.
+ */
+export function generateNodeCacheArgs(node: WorkflowNode): string {
+  const settings = getNodeCacheConfig(node)
+  if (!settings) {
+    return ''
+  }
+  // Settings that do not change the result stay out of the fingerprint
+  const { cache, retry, ...config } = node.config || {}
+  const fingerprint = hashString(JSON.stringify(config))
+  return `fingerprint="${fingerprint}", backend="${settings.backend}", ttl=${settings.ttl ?? 'None'}`
+}
+
+/**
+ * Picklable stand-ins for agent runs and vector store search pages, used
+ * when a node result comes from the node cache or a durable run's journal.
+ */
+export const RECORDED_RESULTS = `# Recorded node results
+
+class RecordedRunItem:
+    def __init__(self, item):
+        self._item = item
+
+    def to_input_item(self):
+        return dict(self._item)
+
+
+class RecordedRunResult:
+    """Stands in for an agent run with the new_items and final_output it recorded."""
+
+    def __init__(self, record):
+        self.final_output = record["final_output"]
+        self.new_items = [RecordedRunItem(item) for item in record["new_items"]]
+
+    def final_output_as(self, cls, raise_if_incorrect_type=False):
+        return self.final_output
+
+
+class RecordedSearchResult:
+    def __init__(self, file_id, filename, score):
+        self.file_id = file_id
+        self.filename = filename
+        self.score = score
+
+
+class RecordedSearchPage:
+    def __init__(self, results):
+        self.data = [RecordedSearchResult(**result) for result in results]`
+
+export const NODE_CACHE_UTILS = `# Node result cache
+
+_CACHE_MISS = object()
+
+
+class NodeResultCache:
+    """Results of nodes with caching enabled, keyed by node, config and inputs.
+
+    The "memory" backend is an LRU of max_entries entries; the "sqlite" backend
+    persists pickled entries in the database at path. Entries expire after the
+    node's ttl in seconds (None keeps them until evicted). hits and misses count
+    lookups per node id.
+    """
+
+    def __init__(self, max_entries=1024, path="workflow_cache.sqlite3"):
+        self.max_entries = max_entries
+        self.path = path
+        self.hits = Counter()
+        self.misses = Counter()
+        self._memory = OrderedDict()
+        self._db = None
+
+    def stats(self):
+        return {"hits": dict(self.hits), "misses": dict(self.misses)}
+
+    def run_agent(self, node_id, agent, input, *, fingerprint, backend="memory", ttl=None):
+        # Hits are reported to the node hooks like real runs
+        return run_node(node_id, self._run_agent(node_id, agent, input, fingerprint, backend, ttl))
+
+    async def _run_agent(self, node_id, agent, input, fingerprint, backend, ttl):
+        key = self._key(node_id, fingerprint, input)
+        record = self._get(node_id, backend, key)
+        if record is not _CACHE_MISS:
+            # Streamed runs still see the node, just without text deltas
+            events = _workflow_events.get()
+            result = RecordedRunResult(record)
+            if events is not None:
+                events.put_nowait(WorkflowEvent("node_started", node_id=node_id))
+                events.put_nowait(WorkflowEvent("node_finished", node_id=node_id, output=result.final_output))
+            return result
+        result = await _run_agent_node(node_id, agent, input)
+        self._put(backend, key, {
+            "final_output": result.final_output,
+            "new_items": [item.to_input_item() for item in result.new_items],
+        }, ttl)
+        return result
+
+    async def search_vector_store(self, node_id, *, fingerprint, backend="memory", ttl=None, **params):
+        key = self._key(node_id, fingerprint, params)
+        record = self._get(node_id, backend, key)
+        if record is _CACHE_MISS:
+            response = await rate_limited_search(**params)
+            record = [
+                {"file_id": result.file_id, "filename": result.filename, "score": result.score}
+                for result in response.data
+            ]
+            self._put(backend, key, record, ttl)
+        return RecordedSearchPage(record)
+
+    async def call_mcp_tool(self, node_id, transport, target, headers=None, *, name, arguments, timeout=None, fingerprint, backend="memory", ttl=None):
+        key = self._key(node_id, fingerprint, [transport, target, headers, name, arguments])
+        record = self._get(node_id, backend, key)
+        if record is _CACHE_MISS:
+            record = await mcp_sessions.call_tool(transport, target, headers, name=name, arguments=arguments, timeout=timeout)
+            self._put(backend, key, record, ttl)
+        return record
+
+    def _key(self, node_id, fingerprint, inputs):
+        payload = json.dumps([node_id, fingerprint, inputs], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _get(self, node_id, backend, key):
+        record = self._get_sqlite(key) if backend == "sqlite" else self._get_memory(key)
+        if record is _CACHE_MISS:
+            self.misses[node_id] += 1
+        else:
+            self.hits[node_id] += 1
+        return record
+
+    def _put(self, backend, key, record, ttl):
+        expires_at = time.time() + ttl if ttl else None
+        if backend == "sqlite":
+            self._put_sqlite(key, record, expires_at)
+        else:
+            self._memory[key] = (expires_at, record)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _get_memory(self, key):
+        entry = self._memory.get(key)
+        if entry is None:
+            return _CACHE_MISS
+        expires_at, record = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self._memory[key]
+            return _CACHE_MISS
+        self._memory.move_to_end(key)
+        return record
+
+    def _connect(self):
+        if self._db is None:
+            self._db = sqlite3.connect(self.path)
+            self._db.execute("CREATE TABLE IF NOT EXISTS node_cache (key TEXT PRIMARY KEY, expires_at REAL, value BLOB)")
+        return self._db
+
+    def _get_sqlite(self, key):
+        row = self._connect().execute("SELECT expires_at, value FROM node_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return _CACHE_MISS
+        expires_at, value = row
+        if expires_at is not None and expires_at <= time.time():
+            with self._db:
+                self._db.execute("DELETE FROM node_cache WHERE key = ?", (key,))
+            return _CACHE_MISS
+        return pickle.loads(value)
+
+    def _put_sqlite(self, key, record, expires_at):
+        try:
+            value = pickle.dumps(record)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            # Results that can't be pickled are simply not persisted
+            return
+        with self._connect() as db:
+            db.execute("INSERT OR REPLACE INTO node_cache VALUES (?, ?, ?)", (key, expires_at, value))
+
+
+node_cache = NodeResultCache()`
+
+/**
+ * Route the `run_agent_node(...)` calls of cached Agent nodes through
+ * `node_cache.run_agent(...)`. Calls are found by the node id literal that
+ * follows `run_agent_node(`, so every emission site is covered.
+ */
+export function applyAgentNodeCache(
+  code: string,
+  agentNodes: WorkflowNode[]
+): string {
+  for (const node of agentNodes) {
+    const cacheArgs = generateNodeCacheArgs(node)
+    if (!cacheArgs) {
+      continue
+    }
+    const callPattern = new RegExp(
+      `run_agent_node\\((\\s*)"${node.id.replace(/[.*+?^${}()|[\]\\]/g, '\\$&')}",`,
+      'g'
+    )
+    let match: RegExpExecArray | null
+    while ((match = callPattern.exec(code)) !== null) {
+      const open = match.index + 'run_agent_node'.length
+      const close = findClosingBracket(code, open)
+      // Keep the argument layout: the new keywords go on their own line
+      const closingIndent = code
+        .slice(0, close - 1)
+        .match(/\n([ ]*)$/)?.[1]
+      const argsIndent = match[1].replace(/^\n/, '')
+      const call =
+        'node_cache.run_agent' +
+        code.slice(open, close - 1).replace(/\s*$/, '') +
+        (closingIndent !== undefined
+          ? `,\n${argsIndent}${cacheArgs}\n${closingIndent})`
+          : `, ${cacheArgs})`)
+      code = code.slice(0, match.index) + call + code.slice(close)
+      callPattern.lastIndex = match.index + call.length
+    }
+  }
+  return code
+}
@@ -0,0 +1,184 @@
+import { WorkflowNode } from '../types/workflow'
+
+/**
+ * Node lifecycle hooks emitted for workflows with Agent, Guardrails,
+ * FileSearch or MCP nodes.
+ *
+ * Each such node is awaited through `run_node(node_id, awaitable)`, which
+ * reports it to the hooks installed with `set_workflow_hooks(...)`. Node ids
+ * are the ones from the workflow JSON; labels and types come from the
+ * emitted `_NODES` table.
+ *
+ * `run_node` also enforces the deadline passed to `run_workflow`: each node
+ * gets the remaining budget and is cancelled when it runs out, and the run
+ * fails with a `WorkflowTimeout` naming that node.
+ */
+
+export const RUN_NODE = 'run_node'
+
+const HOOKED_NODE_TYPES = [
+  'builtins.Agent',
+  'builtins.Guardrails',
+  'builtins.tool.FileSearch',
+  'builtins.MCP',
+]
+
+function collectHookedNodes(nodes: WorkflowNode[]): WorkflowNode[] {
+  return nodes.flatMap((node) => [
+    ...(HOOKED_NODE_TYPES.includes(node.node_type) ? [node] : []),
+    ...collectHookedNodes(node.config?.body?.nodes || []),
+  ])
+}
+
+/**
+ * Wrap a node's awaitable so its lifecycle is reported to the hooks.
+ */
+export function wrapNodeCall(node: WorkflowNode, expression: string): string {
+  return `${RUN_NODE}("${node.id}", ${expression})`
+}
+
+/**
+ * With `journaled` set (durable approvals or checkpoints), calls made inside
+ * a journaled run go through its journal so they can be replayed on resume.
+ */
+export function generateNodeHooksCode(
+  nodes: WorkflowNode[],
+  journaled: boolean = false
+): string {
+  const entries = collectHookedNodes(nodes)
+    .map(
+      (node) =>
+        `    "${node.id}": (${JSON.stringify(node.label || node.id)}, "${node.node_type}"),`
+    )
+    .join('\n')
+
+  return `# Node hooks
+
+class WorkflowHooks:
+    """Node lifecycle callbacks; override the ones you need.
+
+    Install an instance with set_workflow_hooks(). Each callback receives the
+    NodeRun of the Agent, Guardrails, FileSearch or MCP node concerned.
+    """
+
+    def on_node_start(self, node):
+        pass
+
+    def on_node_end(self, node):
+        pass
+
+    def on_error(self, node, error):
+        pass
+
+
+@dataclass
+class NodeRun:
+    id: str
+    label: str
+    type: str
+    # Wall-clock start (time.time()) and duration in seconds
+    started_at: float
+    duration: Optional[float] = None
+    # Token usage of agent runs, None for other nodes and cached results
+    usage: Optional[dict] = None
+
+
+class _InstalledHooks:
+    hooks = None
+
+
+_installed_hooks = _InstalledHooks()
+
+_NODES = {
+${entries}
+}
+
+
+def set_workflow_hooks(hooks):
+    """Install hooks for every workflow run in this module; None removes them."""
+    _installed_hooks.hooks = hooks
+
+
+def _usage(result):
+    usage = getattr(getattr(result, "context_wrapper", None), "usage", None)
+    if usage is None:
+        return None
+    return {
+        "requests": usage.requests,
+        "input_tokens": usage.input_tokens,
+        "output_tokens": usage.output_tokens,
+        "total_tokens": usage.total_tokens,
+    }
+
+
+async def _run_hooked_node(hooks, node_id, awaitable):
+    label, node_type = _NODES.get(node_id, (node_id, None))
+    node = NodeRun(node_id, label, node_type, time.time())
+    hooks.on_node_start(node)
+    start = time.perf_counter()
+    try:
+        result = await awaitable
+    except BaseException as error:
+        # Cancelled nodes are reported too, so every start has a matching end or error
+        node.duration = time.perf_counter() - start
+        hooks.on_error(node, error)
+        raise
+    node.duration = time.perf_counter() - start
+    node.usage = _usage(result)
+    hooks.on_node_end(node)
+    return result
+
+
+class WorkflowTimeout(Exception):
+    """Raised by run_workflow when its deadline passes; node_id names the node it stopped in."""
+
+    def __init__(self, node_id, deadline):
+        self.node_id = node_id
+        self.label = _NODES.get(node_id, (node_id, None))[0]
+        self.deadline = deadline
+        super().__init__(f"Workflow deadline exceeded in node {self.label!r} ({node_id})")
+
+
+# time.time() deadline of the run_workflow call this task belongs to, if any
+_workflow_deadline = ContextVar("workflow_deadline", default=None)
+
+
+async def _run_within_deadline(node_id, awaitable, deadline):
+    try:
+        # Cancels the node's requests when the budget runs out
+        return await asyncio.wait_for(awaitable, max(0.0, deadline - time.time()))
+    except asyncio.TimeoutError:
+        if time.time() < deadline:
+            # A timeout of the node itself, not of the workflow
+            raise
+        raise WorkflowTimeout(node_id, deadline) from None
+
+
+async def _workflow_timeout(node_id, deadline):
+    raise WorkflowTimeout(node_id, deadline)
+
+
+def _node_call(node_id, awaitable):
+    deadline = _workflow_deadline.get()
+    if deadline is not None and time.time() >= deadline:
+        # The node never starts: close its coroutine before anything wraps it
+        awaitable.close()
+        return _workflow_timeout(node_id, deadline)
+    hooks = _installed_hooks.hooks
+    if hooks is not None:
+        awaitable = _run_hooked_node(hooks, node_id, awaitable)
+    if deadline is not None:
+        awaitable = _run_within_deadline(node_id, awaitable, deadline)
+    return awaitable
+
+
+async def run_node(node_id, awaitable):${
+    journaled
+      ? `
+    journaled_run = _journaled_run.get()
+    if journaled_run is not None:
+        return await journaled_run.run_node(node_id, awaitable)`
+      : ''
+  }
+    return await _node_call(node_id, awaitable)`
+}
@@ -1,4 +1,8 @@
 import { Edge, WorkflowNode } from '../../types/workflow'
+import {
+  generateApprovalCall,
+  generateApprovalRequestFunction,
+} from '../durable-approvals'
 
 export function generateBinaryApprovalNodeCode(
   node: WorkflowNode,
@@ -49,7 +53,7 @@ export function generateBinaryApprovalNodeCode(
       mainFunctionBody += `
 ${baseIndent}${approvalMessageVar} = "${message}"
 
-${baseIndent}if ${approvalVarName}(${approvalMessageVar}):\n${baseIndent}  {CONTENT_APPROVE}
+${baseIndent}if ${generateApprovalCall(approvalVarName, approvalMessageVar)}:\n${baseIndent}  {CONTENT_APPROVE}
 ${baseIndent}else:\n${baseIndent}  {CONTENT_REJECT}`
 
       shouldBreak = false
@@ -71,16 +75,14 @@ ${baseIndent}else:\n${baseIndent}  {CONTENT_REJECT}`
       if (!topLevelCode.includes('def approval_request')) {
         topLevelCode += `
 
-def approval_request(message: str):
-  # TODO: Implement
-  return True`
+${generateApprovalRequestFunction('approval_request', node)}`
       }
 
       // Complex workflow with conditional branching
       mainFunctionBody += `
   approval_message = "${message}"
 
-  if approval_request(approval_message):`
+  if ${generateApprovalCall('approval_request', 'approval_message')}:`
 
       // Generate Agent running code
       if (approveNode && approveNode.node_type === 'builtins.Agent') {
@@ -103,7 +105,8 @@ def approval_request(message: str):
         }
 
         mainFunctionBody += `
-      agent_result_temp = await Runner.run(
+      agent_result_temp = await run_agent_node(
+        "${approveNode.id}",
         agent,
         input=[
           ${inputArray}
@@ -147,15 +150,13 @@ def approval_request(message: str):
     // Simple workflow without branching
     // Generate approval_request function if not already generated
     if (!topLevelCode.includes('def approval_request')) {
-      topLevelCode += `def approval_request(message: str):
-  # TODO: Implement
-  return True`
+      topLevelCode += generateApprovalRequestFunction('approval_request', node)
     }
 
     mainFunctionBody += `
   approval_message = "${message}"
 
-  if approval_request(approval_message):
+  if ${generateApprovalCall('approval_request', 'approval_message')}:
       pass
   else:
       pass`
@@ -1,9 +1,9 @@
 import { WorkflowNode } from '../../types/workflow'
+import { NodeStep } from '../dataflow'
+import { generateNodeCacheArgs } from '../node-cache'
+import { wrapNodeCall } from '../node-hooks'
 
-export function generateFileSearchNodeCode(
-  node: WorkflowNode,
-  fileSearchIndex: number = 0
-): string {
+function getFileSearchArgs(node: WorkflowNode) {
   const config = node.config || {}
   const vectorStoreId = config.vector_store_id
     ? `"${config.vector_store_id}"`
@@ -13,18 +13,54 @@ export function generateFileSearchNodeCode(
     : '""'
   const maxResults = config.max_results || 10
 
-  // Generate unique variable name based on index
-  const varName =
+  return { vectorStoreId, query, maxResults }
+}
+
+export function getFileSearchResultVar(fileSearchIndex: number = 0): string {
+  return fileSearchIndex === 0
+    ? 'filesearch_result'
+    : `filesearch_result${fileSearchIndex}`
+}
+
+/**
+ * Describe a FileSearch node as an awaited search followed by result shaping,
+ * so independent searches can be issued concurrently.
+ */
+export function generateFileSearchNodeStep(
+  node: WorkflowNode,
+  fileSearchIndex: number = 0,
+  indent: string = '  '
+): NodeStep {
+  const { vectorStoreId, query, maxResults } = getFileSearchArgs(node)
+
+  const responseVar =
     fileSearchIndex === 0
-      ? 'filesearch_result'
-      : `filesearch_result${fileSearchIndex}`
+      ? 'filesearch_response'
+      : `filesearch_response${fileSearchIndex}`
+  const resultVar = getFileSearchResultVar(fileSearchIndex)
+  const searchArgs = `vector_store_id=${vectorStoreId}, query=${query}, max_num_results=${maxResults}`
+  const cacheArgs = generateNodeCacheArgs(node)
 
-  return `
-  ${varName} = { "results": [
-    {
-      "id": result.file_id,
-      "filename": result.filename,
-      "score": result.score,
-    } for result in client.vector_stores.search(vector_store_id=${vectorStoreId}, query=${query}, max_num_results=${maxResults})
-  ]}`
+  return {
+    nodeId: node.id,
+    call: {
+      target: responseVar,
+      expression: wrapNodeCall(
+        node,
+        cacheArgs
+          ? `node_cache.search_vector_store("${node.id}", ${searchArgs}, ${cacheArgs})`
+          : `rate_limited_search(${searchArgs})`
+      ),
+    },
+    post: `
+${indent}${resultVar} = { "results": [
+${indent}  {
+${indent}    "id": result.file_id,
+${indent}    "filename": result.filename,
+${indent}    "score": result.score,
+${indent}  } for result in ${responseVar}.data
+${indent}]}`,
+    reads: [],
+    writes: [responseVar, resultVar],
+  }
 }
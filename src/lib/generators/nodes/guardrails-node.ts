@@ -1,4 +1,7 @@
 import { WorkflowNode } from '../../types/workflow'
+import { generateGuardrailCacheArgs } from '../guardrail-cache'
+import { wrapNodeCall } from '../node-hooks'
+import { getGuardrailsRateLimitKey } from '../rate-limiter'
 
 export function generateGuardrailsNodeCode(
   node: WorkflowNode,
@@ -37,6 +40,10 @@ export function generateGuardrailsNodeCode(
   const outputVar = `guardrails_output${varSuffix}`
 
   const continueOnError = config.continue_on_error === true
+  const guardrailsCall = wrapNodeCall(
+    node,
+    `rate_limited_guardrails("${getGuardrailsRateLimitKey(node)}", ctx, ${inputVar}, "text/plain", get_guardrails_bundle(${configVarName}), suppress_tripwire=True${generateGuardrailCacheArgs(node)})`
+  )
 
   // Calculate indentation based on index
   // guardrailsIndex 0: 2 spaces
@@ -49,7 +56,7 @@ export function generateGuardrailsNodeCode(
     return `
 ${indent}try:
 ${indent}  ${inputVar} = ${expr}
-${indent}  ${resultVar} = await run_guardrails(ctx, ${inputVar}, "text/plain", instantiate_guardrails(load_config_bundle(${configVarName})), suppress_tripwire=True)
+${indent}  ${resultVar} = await ${guardrailsCall}
 ${indent}  ${tripwireVar} = guardrails_has_tripwire(${resultVar})
 ${indent}  ${textVar} = get_guardrail_checked_text(${resultVar}, ${inputVar})
 ${indent}  ${outputVar} = (${tripwireVar} and build_guardrail_fail_output(${resultVar} or [])) or (${textVar} or ${inputVar})
@@ -64,7 +71,7 @@ ${indent}  }`
   } else {
     return `
 ${indent}${inputVar} = ${expr}
-${indent}${resultVar} = await run_guardrails(ctx, ${inputVar}, "text/plain", instantiate_guardrails(load_config_bundle(${configVarName})), suppress_tripwire=True)
+${indent}${resultVar} = await ${guardrailsCall}
 ${indent}${tripwireVar} = guardrails_has_tripwire(${resultVar})
 ${indent}${textVar} = get_guardrail_checked_text(${resultVar}, ${inputVar})
 ${indent}${outputVar} = (${tripwireVar} and build_guardrail_fail_output(${resultVar} or [])) or (${textVar} or ${inputVar})
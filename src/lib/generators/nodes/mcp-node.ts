@@ -1,9 +1,17 @@
 import { WorkflowNode } from '../../types/workflow'
+import { NodeStep } from '../dataflow'
+import { generateNodeCacheArgs } from '../node-cache'
+import { wrapNodeCall } from '../node-hooks'
 
-export function generateMcpNodeCode(
+/**
+ * Describe an MCP node as one call on a pooled session. The pool owns
+ * connection setup and release, so the node is a single awaitable and
+ * independent MCP calls can be issued concurrently.
+ */
+export function generateMcpNodeStep(
   node: WorkflowNode,
   mcpIndex: number = 0
-): string {
+): NodeStep {
   const config = node.config || {}
   const transportType = config.transportType || 'http'
   const url = config.url || ''
@@ -20,9 +28,6 @@ export function generateMcpNodeCode(
 
   // Generate variable names
   const varName = mcpIndex === 0 ? 'mcp_result' : `mcp_result${mcpIndex}`
-  const clientVarName = mcpIndex === 0 ? 'mcp_client' : `mcp_client${mcpIndex}`
-  const transportVarName =
-    mcpIndex === 0 ? 'mcp_transport' : `mcp_transport${mcpIndex}`
 
   // Format parameters as Python dict
   const formattedParams = Object.entries(parameters)
@@ -64,44 +69,34 @@ export function generateMcpNodeCode(
   // Generate timeout value
   const timeout = config.timeout || 30
 
-  if (transportType === 'http' || transportType === 'sse') {
-    // HTTP/SSE transport
-    return `
-  # MCP Client initialization (HTTP/SSE)
-  ${transportVarName} = SSEClientTransport(
-    url="${url}",
-    headers=${headersCode}
-  )
-  ${clientVarName} = Client(transport=${transportVarName})
-  await ${clientVarName}.initialize()
+  // Stdio servers are keyed by the script they run, HTTP/SSE ones by URL
+  const isStdio = transportType !== 'http' && transportType !== 'sse'
+  const target = isStdio ? config.serverUrl || '' : url
 
-  # Call MCP tool
-  ${varName} = await ${clientVarName}.call_tool(
-    name="${toolName}",
-    arguments=${parametersCode}
-  )
-
-  # Close connection
-  await ${clientVarName}.close()`
-  } else {
-    // Stdio transport (default)
-    const serverUrl = config.serverUrl || ''
-    return `
-  # MCP Client initialization (Stdio)
-  ${transportVarName} = StdioClientTransport(
-    command="python",
-    args=["${serverUrl}"]
-  )
-  ${clientVarName} = Client(transport=${transportVarName})
-  await ${clientVarName}.initialize()
+  // Cached nodes go through node_cache, which calls the pool on a miss
+  const cacheArgs = generateNodeCacheArgs(node)
+  const callee = cacheArgs
+    ? `node_cache.call_mcp_tool(\n    "${node.id}",`
+    : 'mcp_sessions.call_tool('
 
-  # Call MCP tool
-  ${varName} = await ${clientVarName}.call_tool(
+  return {
+    nodeId: node.id,
+    call: {
+      target: varName,
+      expression: wrapNodeCall(
+        node,
+        `${callee}
+    "${isStdio ? 'stdio' : 'sse'}",
+    "${target}",
+    headers=${headersCode},
     name="${toolName}",
-    arguments=${parametersCode}
-  )
-
-  # Close connection
-  await ${clientVarName}.close()`
+    arguments=${parametersCode},
+    timeout=${timeout}${cacheArgs ? `,\n    ${cacheArgs}` : ''}
+  )`
+      ),
+    },
+    post: '',
+    reads: [],
+    writes: [varName],
   }
 }
@@ -0,0 +1,345 @@
+import { WorkflowNode } from '../types/workflow'
+
+/**
+ * Client-side rate limiting emitted for workflows that call the model API.
+ *
+ * `run_agent_node`, `rate_limited_search` and `rate_limited_guardrails` wait
+ * for a slot on the module-level `rate_limits` before calling out, so bursts
+ * are queued in the workflow instead of being rejected by the provider.
+ *
+ * The limits follow the x-ratelimit-* headers of every response, successful
+ * ones included: agents, guardrails and file search share the module's client,
+ * whose httpx response hook passes the headers to the lease of the call that
+ * made the request.
+ */
+
+export const FILE_SEARCH_RATE_LIMIT_KEY = 'file_search'
+export const MODERATION_RATE_LIMIT_KEY = 'moderation'
+
+/**
+ * Rate limit key for a guardrails node: the model of its LLM-based checks,
+ * or the moderation endpoint when it only runs moderation/PII checks.
+ */
+export function getGuardrailsRateLimitKey(node: WorkflowNode): string {
+  const guardrails: any[] = node.config?.guardrails || []
+  const llmCheck = guardrails.find((g) => g.type === 'jailbreak')
+  if (llmCheck) {
+    return llmCheck.config?.model || 'gpt-4o-mini'
+  }
+  return MODERATION_RATE_LIMIT_KEY
+}
+
+const RATE_LIMITED_CLIENT = `AsyncOpenAI(http_client=DefaultAsyncHttpxClient(event_hooks={"response": [observe_rate_limit_headers]}))`
+
+/**
+ * The shared client, with the response hook feeding the rate limits. Guardrails
+ * and file search need it at import time, as before; with Agent nodes only it
+ * is built on the first agent run, so importing needs no credentials. Agents
+ * get it through a RunConfig rather than the agents SDK's process-wide default
+ * client, so each module's limits only see its own responses.
+ */
+export function generateRateLimitedClientCode(
+  usesAgents: boolean,
+  buildsClientAtImport: boolean
+): string {
+  const client = buildsClientAtImport
+    ? `client = ${RATE_LIMITED_CLIENT}`
+    : '# Built by agent_run_config() on the first agent run\nclient = None'
+  const runConfig = `
+
+_agent_run_config = None
+
+
+def agent_run_config():
+    # Agent runs call the model through client instead of the SDK's default client
+    global ${buildsClientAtImport ? '' : 'client, '}_agent_run_config
+    if _agent_run_config is None:${
+      buildsClientAtImport
+        ? ''
+        : `
+        if client is None:
+            client = ${RATE_LIMITED_CLIENT}`
+    }
+        _agent_run_config = RunConfig(model_provider=OpenAIProvider(openai_client=client))
+    return _agent_run_config`
+  return `# Shared client for agents, guardrails and file search. Every response, not
+# only 429s, updates the rate limits of the call that made the request
+_rate_limit_lease = ContextVar("rate_limit_lease", default=None)
+
+
+async def observe_rate_limit_headers(response):
+    # httpx response hook; add it to clients passed in from elsewhere too
+    lease = _rate_limit_lease.get()
+    if lease is not None:
+        lease.observe(response.headers)
+
+
+${client}${usesAgents ? runConfig : ''}`
+}
+
+/**
+ * Import the names generateRateLimitedClientCode uses.
+ */
+export function addRateLimitedClientImports(
+  importCode: string,
+  usesAgents: boolean
+): string {
+  const openaiImport = /^from openai import AsyncOpenAI$/m
+  importCode = openaiImport.test(importCode)
+    ? importCode.replace(
+        openaiImport,
+        'from openai import AsyncOpenAI, DefaultAsyncHttpxClient'
+      )
+    : `from openai import AsyncOpenAI, DefaultAsyncHttpxClient\n${importCode}`
+  return usesAgents
+    ? importCode.replace(
+        /^from agents import .+$/m,
+        (line) => `${line}, OpenAIProvider`
+      )
+    : importCode
+}
+
+export const RATE_LIMIT_UTILS = `# Rate limiting
+
+def estimate_request_tokens(payload):
+    # About four characters per token; corrected from usage where it is reported
+    text = payload if isinstance(payload, str) else json.dumps(payload, default=str)
+    return len(text) // 4 + 1
+
+
+_DURATION_PART = re.compile(r"(\\d+(?:\\.\\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def _parse_duration(value):
+    # Reset headers look like "20ms", "1s" or "6m0s"; retry-after is plain seconds
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        parts = _DURATION_PART.findall(value)
+        return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts) if parts else None
+
+
+class TokenBucket:
+    def __init__(self, per_minute):
+        self.level = 0.0
+        self.updated = time.monotonic()
+        self.set_limit(per_minute)
+        self.level = self.capacity
+
+    def set_limit(self, per_minute):
+        self.per_minute = per_minute
+        self.rate = per_minute / 60
+        # A few seconds of burst, not the whole minute at once
+        self.capacity = max(1.0, self.rate * 5)
+        self.level = min(self.level, self.capacity)
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount, now):
+        self._refill(now)
+        # Requests larger than the bucket wait for a full bucket and go into debt
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount):
+        self.level -= amount
+
+
+class _ModelLimits:
+    def __init__(self, concurrency, max_concurrency):
+        self.requests = None
+        self.tokens = None
+        self.concurrency = float(concurrency)
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.changed = asyncio.Condition()
+        self.calls = 0
+        self.rate_limited = 0
+        self.queue_delays = deque(maxlen=1024)
+
+    def delay(self, tokens):
+        now = time.monotonic()
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.in_flight >= max(1, int(self.concurrency)):
+            return float("inf")
+        delay = 0.0
+        if self.requests is not None:
+            delay = max(delay, self.requests.delay(1, now))
+        if self.tokens is not None and tokens:
+            delay = max(delay, self.tokens.delay(tokens, now))
+        return delay
+
+    def take(self, tokens):
+        self.in_flight += 1
+        self.calls += 1
+        if self.requests is not None:
+            self.requests.take(1)
+        if self.tokens is not None:
+            self.tokens.take(tokens)
+
+    def on_success(self):
+        # Additive increase: about one more slot per window of successful calls
+        self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+
+    def on_rate_limited(self, headers):
+        self.rate_limited += 1
+        now = time.monotonic()
+        # Multiplicative decrease, once per back-off rather than once per rejected call
+        if now >= self.blocked_until:
+            self.concurrency = max(1.0, self.concurrency / 2)
+        self.observe(headers)
+        retry_after = None
+        if headers:
+            retry_after_ms = _parse_duration(headers.get("retry-after-ms"))
+            retry_after = retry_after_ms / 1000 if retry_after_ms is not None else _parse_duration(headers.get("retry-after"))
+            if retry_after is None:
+                resets = [_parse_duration(headers.get(f"x-ratelimit-reset-{name}")) for name in ("requests", "tokens")]
+                retry_after = max((reset for reset in resets if reset is not None), default=None)
+        self.blocked_until = max(self.blocked_until, now + (retry_after if retry_after is not None else 1.0))
+
+    def observe(self, headers):
+        if not headers:
+            return
+        for name in ("requests", "tokens"):
+            limit = headers.get(f"x-ratelimit-limit-{name}")
+            if limit is None:
+                continue
+            bucket = getattr(self, name)
+            if bucket is None:
+                bucket = TokenBucket(float(limit))
+                setattr(self, name, bucket)
+            elif float(limit) != bucket.per_minute:
+                bucket.set_limit(float(limit))
+            remaining = headers.get(f"x-ratelimit-remaining-{name}")
+            if remaining is not None:
+                bucket.level = min(bucket.level, float(remaining))
+
+    def stats(self):
+        delays = sorted(self.queue_delays)
+        return {
+            "calls": self.calls,
+            "rate_limited": self.rate_limited,
+            "in_flight": self.in_flight,
+            "concurrency_limit": int(self.concurrency),
+            "requests_per_minute": self.requests.per_minute if self.requests is not None else None,
+            "tokens_per_minute": self.tokens.per_minute if self.tokens is not None else None,
+            "queue_delay_mean": sum(delays) / len(delays) if delays else 0.0,
+            "queue_delay_p95": delays[int(len(delays) * 0.95)] if delays else 0.0,
+            "queue_delay_max": delays[-1] if delays else 0.0,
+        }
+
+
+class RateLimitLease:
+    def __init__(self, limits, tokens):
+        self._limits = limits
+        self.tokens = tokens
+
+    def observe(self, headers):
+        self._limits.observe(headers)
+
+    def settle(self, tokens):
+        # Charge the difference between the estimate and the reported usage
+        if tokens is not None and self._limits.tokens is not None:
+            self._limits.tokens.take(tokens - self.tokens)
+            self.tokens = tokens
+
+
+class RateLimiter:
+    """Client-side request shaping per model.
+
+    Each model has a concurrency limit adjusted with AIMD: it grows by about
+    one per window of successful calls and halves when the provider answers
+    429, after which the model is paused until the reset the response asks
+    for. Request and token buckets start unlimited and follow the
+    x-ratelimit-* headers seen in responses, or the limits given to
+    configure(). stats() reports the time calls spent queued per model.
+    """
+
+    def __init__(self, initial_concurrency=16, max_concurrency=256):
+        self.initial_concurrency = initial_concurrency
+        self.max_concurrency = max_concurrency
+        self._models = {}
+
+    def _limits(self, model):
+        limits = self._models.get(model)
+        if limits is None:
+            limits = _ModelLimits(self.initial_concurrency, self.max_concurrency)
+            self._models[model] = limits
+        return limits
+
+    def configure(self, model, requests_per_minute=None, tokens_per_minute=None, concurrency=None):
+        limits = self._limits(model)
+        if requests_per_minute is not None:
+            limits.observe({"x-ratelimit-limit-requests": requests_per_minute})
+        if tokens_per_minute is not None:
+            limits.observe({"x-ratelimit-limit-tokens": tokens_per_minute})
+        if concurrency is not None:
+            limits.concurrency = float(concurrency)
+
+    def observe(self, model, headers):
+        self._limits(model).observe(headers)
+
+    def stats(self):
+        return {model: limits.stats() for model, limits in self._models.items()}
+
+    @asynccontextmanager
+    async def acquire(self, model, tokens=0):
+        limits = self._limits(model)
+        queued_at = time.monotonic()
+        async with limits.changed:
+            while (delay := limits.delay(tokens)) > 0:
+                try:
+                    await asyncio.wait_for(limits.changed.wait(), None if delay == float("inf") else delay)
+                except asyncio.TimeoutError:
+                    pass
+            limits.take(tokens)
+        limits.queue_delays.append(time.monotonic() - queued_at)
+        lease = RateLimitLease(limits, tokens)
+        # observe_rate_limit_headers passes the call's responses to its lease
+        token = _rate_limit_lease.set(lease)
+        try:
+            yield lease
+        except Exception as error:
+            if getattr(error, "status_code", None) == 429:
+                limits.on_rate_limited(getattr(getattr(error, "response", None), "headers", None))
+            raise
+        else:
+            limits.on_success()
+        finally:
+            _rate_limit_lease.reset(token)
+            async with limits.changed:
+                limits.in_flight -= 1
+                limits.changed.notify_all()
+
+
+rate_limits = RateLimiter()
+
+
+def _model_key(agent):
+    model = getattr(agent, "model", None)
+    return model if isinstance(model, str) else getattr(model, "model", None) or "default"`
+
+export const RATE_LIMITED_SEARCH = `async def rate_limited_search(**params):
+    async with rate_limits.acquire("${FILE_SEARCH_RATE_LIMIT_KEY}"):
+        return await client.vector_stores.search(**params)`
+
+export const RATE_LIMITED_GUARDRAILS = `async def _run_guardrail_check(ctx, text, media_type, guardrail, rate_limit=None, **kwargs):
+    # Under a rate limit key, a check that calls out holds a slot of its own
+    # model, or of the key for checks without one, while it runs
+    if rate_limit is None or _is_local_guardrail(guardrail):
+        return await run_guardrails(ctx, text, media_type, [guardrail], **kwargs)
+    model = getattr(guardrail.config, "model", None) or rate_limit
+    async with rate_limits.acquire(model, tokens=estimate_request_tokens(text)):
+        return await run_guardrails(ctx, text, media_type, [guardrail], **kwargs)
+
+
+async def rate_limited_guardrails(model, ctx, text, media_type, bundle, **kwargs):
+    # Each check that calls a model or an API takes a slot of its own
+    return await run_guardrails_in_cost_order(ctx, text, media_type, bundle, rate_limit=model, **kwargs)`
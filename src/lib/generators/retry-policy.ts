@@ -0,0 +1,205 @@
+import { RetryPolicyConfig } from '../nodes/types'
+import { WorkflowNode } from '../types/workflow'
+
+/**
+ * Per-node retry and hedging policy for Agent nodes (`config.retry`):
+ *
+ *   "retry": {
+ *     "max_attempts": 3,
+ *     "attempt_timeout_seconds": 20,
+ *     "backoff_seconds": 0.5,
+ *     "hedge_percentile": 95
+ *   }
+ *
+ * generateAgentCode registers a `RetryPolicy` for the node in
+ * `retry_policies`, and `run_agent_node` runs its requests through it.
+ * Attempts that time out or fail with a transient error are retried after
+ * an exponential backoff with full jitter; 429s are retried without one, as
+ * the rate limiter has already paused the model for as long as the response
+ * asked. With a hedge percentile set, a duplicate request is started once an
+ * attempt has run longer than that percentile of the node's recent
+ * latencies; the first to succeed wins and the other is cancelled. Streamed
+ * runs are not hedged, and stop timing out and retrying once they have
+ * published a text delta. Counts are kept per node in `retry_metrics`.
+ */
+
+export interface RetryPolicySettings {
+  maxAttempts: number
+  // Seconds; null lets an attempt run until it completes
+  attemptTimeout: number | null
+  backoff: number
+  // Percentile (0-100) of recent latencies after which to hedge; null disables hedging
+  hedgePercentile: number | null
+}
+
+// Empty inputs from the config panel arrive as ''
+const toNumber = (value: number | string | undefined): number =>
+  value === '' || value === undefined ? NaN : Number(value)
+
+export function getRetryPolicy(node: WorkflowNode): RetryPolicySettings | null {
+  const retry: RetryPolicyConfig | undefined = node.config?.retry
+  if (!retry || node.node_type !== 'builtins.Agent') {
+    return null
+  }
+  const maxAttempts = Math.floor(toNumber(retry.max_attempts))
+  const attemptTimeout = toNumber(retry.attempt_timeout_seconds)
+  const backoff = toNumber(retry.backoff_seconds)
+  const hedgePercentile = toNumber(retry.hedge_percentile)
+  const settings = {
+    maxAttempts: maxAttempts >= 1 ? maxAttempts : 1,
+    attemptTimeout:
+      Number.isFinite(attemptTimeout) && attemptTimeout > 0
+        ? attemptTimeout
+        : null,
+    backoff: Number.isFinite(backoff) && backoff >= 0 ? backoff : 0.5,
+    hedgePercentile:
+      Number.isFinite(hedgePercentile) &&
+      hedgePercentile > 0 &&
+      hedgePercentile < 100
+        ? hedgePercentile
+        : null,
+  }
+  // A single attempt without timeout or hedging behaves like no policy
+  if (
+    settings.maxAttempts === 1 &&
+    settings.attemptTimeout === null &&
+    settings.hedgePercentile === null
+  ) {
+    return null
+  }
+  return settings
+}
+
+/**
+ * `retry_policies["<node id>"] = RetryPolicy(...)` for an Agent node with a
+ * retry policy, or '' without one.
+ */
+export function generateRetryPolicyCode(node: WorkflowNode): string {
+  const policy = getRetryPolicy(node)
+  if (!policy) {
+    return ''
+  }
+  const args = [
+    `max_attempts=${policy.maxAttempts}`,
+    `attempt_timeout=${policy.attemptTimeout ?? 'None'}`,
+    `backoff=${policy.backoff}`,
+    `hedge_percentile=${policy.hedgePercentile ?? 'None'}`,
+  ].join(', ')
+  return `retry_policies["${node.id}"] = RetryPolicy(${args})\n`
+}
+
+export const RETRY_POLICY_UTILS = `# Retry policies
+
+@dataclass
+class RetryPolicy:
+    max_attempts: int = 1
+    # Seconds before an attempt is abandoned; None waits until it completes
+    attempt_timeout: Optional[float] = None
+    # Backoff before attempt n is drawn from [0, backoff * 2 ** (n - 2)], capped at max_backoff
+    backoff: float = 0.5
+    max_backoff: float = 30.0
+    # Hedge once an attempt runs longer than this percentile of recent latencies
+    hedge_percentile: Optional[float] = None
+    # Latencies needed before hedging starts
+    hedge_min_samples: int = 20
+
+
+@dataclass
+class RetryStats:
+    attempts: int = 0
+    retries: int = 0
+    timeouts: int = 0
+    hedges: int = 0
+    # Attempts won by the hedged duplicate rather than the original request
+    hedge_wins: int = 0
+
+    @property
+    def hedge_win_rate(self):
+        return self.hedge_wins / self.hedges if self.hedges else None
+
+
+# Keyed by node id; policies are registered next to their agents
+retry_policies = {}
+retry_metrics = {}
+_retry_latencies = {}
+
+
+def _is_transient(error):
+    if isinstance(error, (asyncio.TimeoutError, ConnectionError)):
+        return True
+    status = getattr(error, "status_code", None)
+    if status is None:
+        # openai.APIConnectionError and APITimeoutError carry no status code
+        return type(error).__name__ in ("APIConnectionError", "APITimeoutError")
+    return status in (408, 409, 429) or status >= 500
+
+
+def _hedge_delay(policy, latencies):
+    if policy.hedge_percentile is None or len(latencies) < policy.hedge_min_samples:
+        return None
+    ordered = sorted(latencies)
+    return ordered[min(len(ordered) - 1, int(len(ordered) * policy.hedge_percentile / 100))]
+
+
+async def _run_attempt(policy, stats, latencies, call, hedge, retryable):
+    loop = asyncio.get_running_loop()
+    start = loop.time()
+    deadline = start + policy.attempt_timeout if policy.attempt_timeout else None
+    hedge_delay = _hedge_delay(policy, latencies) if hedge else None
+    hedge_at = start + hedge_delay if hedge_delay is not None else None
+    original = asyncio.create_task(call())
+    pending = {original}
+    try:
+        while True:
+            if deadline is not None and not retryable():
+                # A streamed attempt that has published output runs to completion
+                deadline = None
+            wake = min((at for at in (deadline, hedge_at) if at is not None), default=None)
+            timeout = None if wake is None else max(0.0, wake - loop.time())
+            done, pending = await asyncio.wait(pending, timeout=timeout, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                if task.exception() is None:
+                    latencies.append(loop.time() - start)
+                    if task is not original:
+                        stats.hedge_wins += 1
+                    return task.result()
+            if done and not pending:
+                raise next(iter(done)).exception()
+            now = loop.time()
+            if deadline is not None and now >= deadline and retryable():
+                stats.timeouts += 1
+                raise asyncio.TimeoutError()
+            if hedge_at is not None and now >= hedge_at:
+                stats.hedges += 1
+                hedge_at = None
+                pending.add(asyncio.create_task(call()))
+    finally:
+        # Losers, and every request when the attempt fails or is cancelled
+        for task in pending:
+            task.cancel()
+
+
+async def run_with_retry_policy(node_id, call, hedge=True, retryable=lambda: True):
+    """Await call() under the node's RetryPolicy.
+
+    call must start a new request, with its own rate limit lease, each time.
+    Once retryable() is false a failed attempt is not retried, and the
+    attempt timeout no longer applies.
+    """
+    policy = retry_policies.get(node_id)
+    if policy is None:
+        return await call()
+    stats = retry_metrics.setdefault(node_id, RetryStats())
+    latencies = _retry_latencies.setdefault(node_id, deque(maxlen=200))
+    for attempt in range(1, policy.max_attempts + 1):
+        stats.attempts += 1
+        try:
+            return await _run_attempt(policy, stats, latencies, call, hedge, retryable)
+        except Exception as error:
+            if attempt == policy.max_attempts or not _is_transient(error) or not retryable():
+                raise
+            # The rate limiter already waits out a 429 for as long as Retry-After asks
+            rate_limited = getattr(error, "status_code", None) == 429
+        stats.retries += 1
+        if not rate_limited:
+            await asyncio.sleep(random.uniform(0, min(policy.max_backoff, policy.backoff * 2 ** (attempt - 1))))`
@@ -0,0 +1,105 @@
+import { Edge, WorkflowNode } from '../types/workflow'
+import { NodeStep } from './dataflow'
+
+/**
+ * Speculative agents, enabled per Guardrails node:
+ *
+ *   "config": { "speculative_agent": true }
+ *
+ * When the node's pass branch continues with an Agent, the agent starts as a
+ * task while the guardrail check runs instead of after it, so the check adds
+ * no latency to runs that pass. If the tripwire fires the task is cancelled
+ * and its output discarded. The agent runs on a copy of the history and its
+ * items are only added to `conversation_history` once the check has passed.
+ */
+
+/**
+ * The Agent started alongside `node`, if the option is enabled and supported.
+ * Only the first top-level Guardrails node without an error path qualifies:
+ * later ones are nested in the previous node's branches.
+ */
+export function getSpeculativeAgent(
+  node: WorkflowNode,
+  nodes: WorkflowNode[],
+  edges: Edge[],
+  guardrailsIndex: number
+): WorkflowNode | undefined {
+  const config = node.config || {}
+  if (
+    config.speculative_agent !== true ||
+    config.continue_on_error === true ||
+    guardrailsIndex > 0
+  ) {
+    return undefined
+  }
+  // The edge the top-level traversal follows next
+  const edge = edges.find((e) => e.source_node_id === node.id)
+  if (edge?.source_port_id !== 'on_pass') {
+    return undefined
+  }
+  const target = nodes.find((n) => n.id === edge.target_node_id)
+  return target?.node_type === 'builtins.Agent' ? target : undefined
+}
+
+/**
+ * Merge the code of a first Guardrails node with the step of the Agent on its
+ * pass branch: the guardrail call is awaited through `run_speculatively`, the
+ * tripwire branch discards the agent and the pass branch awaits it. Throws if
+ * the guardrails code doesn't have the shape the merge expects, rather than
+ * dropping the agent.
+ */
+export function generateSpeculativeGuardrailsCode(
+  guardrailsCode: string,
+  step: NodeStep
+): string {
+  const agentCall = step.call.expression.replace(/\n/g, '\n  ')
+  const guardrailsCall = /^ {2}guardrails_result = await (.+)$/m
+  const branches =
+    /\n {2}if guardrails_hastripwire:\n {4}return guardrails_output\n {2}else:\n {4}return guardrails_output$/
+  if (!guardrailsCall.test(guardrailsCode) || !branches.test(guardrailsCode)) {
+    throw new Error(
+      `Cannot start agent ${step.nodeId} speculatively: unexpected guardrails code`
+    )
+  }
+  return guardrailsCode
+    .replace(
+      guardrailsCall,
+      (_, call) => `  guardrails_result, guardrails_speculative_agent = await run_speculatively(
+    ${call},
+    ${agentCall}
+  )`
+    )
+    .replace(
+      branches,
+      `
+  if guardrails_hastripwire:
+    await discard_speculative(guardrails_speculative_agent)
+    return guardrails_output
+  ${step.call.target} = await guardrails_speculative_agent${step.post}`
+    )
+}
+
+export const SPECULATIVE_AGENT_UTILS = `# Speculative agents
+
+async def discard_speculative(task):
+    """Cancel a speculative task and wait for it to finish, dropping its outcome."""
+    task.cancel()
+    await asyncio.wait([task])
+    if not task.cancelled():
+        # Retrieved, so a failure doesn't surface later as "Task exception was never retrieved"
+        task.exception()
+
+
+async def run_speculatively(check, speculative):
+    """Await check while speculative already runs as a task.
+
+    Returns the check's result and the task, which the caller awaits once the
+    check passes or discards when it does not. If the check raises, the task is
+    discarded before the error propagates.
+    """
+    task = asyncio.create_task(speculative)
+    try:
+        return await check, task
+    except BaseException:
+        await discard_speculative(task)
+        raise`
@@ -0,0 +1,78 @@
+/**
+ * Results of Agent nodes with an output type.
+ *
+ * The result of such an agent used to be a dict serializing the parsed model
+ * twice, with `.json()` and `.model_dump()`, whether or not the workflow read
+ * either. It is now a `StructuredOutput`: a read-only mapping holding the
+ * model, whose "output_text" and "output_parsed" keys are serialized on first
+ * access with a TypeAdapter cached per output type, then kept. Expressions
+ * like `agent_result["output_parsed"]["name"]` read it as before.
+ *
+ * The record is not a dict, so it never leaves run_workflow: a returned
+ * record is converted with `to_dict()`, and callers still get a plain dict
+ * they can check with isinstance or pass to json.dumps.
+ */
+
+export const STRUCTURED_OUTPUT = 'StructuredOutput'
+
+export const STRUCTURED_OUTPUT_UTILS = `# Structured outputs
+
+@functools.lru_cache(maxsize=None)
+def _output_adapter(output_type):
+    return TypeAdapter(output_type)
+
+
+class StructuredOutput(Mapping):
+    """Result of an agent with an output type, serialized when first read.
+
+    \`model\` is the parsed output; the "output_text" key is its JSON and
+    "output_parsed" its dict form, each computed once.
+    """
+
+    _KEYS = ("output_text", "output_parsed")
+
+    def __init__(self, model):
+        self.model = model
+
+    @functools.cached_property
+    def output_text(self):
+        return _output_adapter(type(self.model)).dump_json(self.model).decode()
+
+    @functools.cached_property
+    def output_parsed(self):
+        return _output_adapter(type(self.model)).dump_python(self.model)
+
+    def __getitem__(self, key):
+        if key not in self._KEYS:
+            raise KeyError(key)
+        return getattr(self, key)
+
+    def __iter__(self):
+        return iter(self._KEYS)
+
+    def __len__(self):
+        return len(self._KEYS)
+
+    def to_dict(self):
+        return {key: self[key] for key in self._KEYS}
+
+    def __repr__(self):
+        # Stable, so results hashed with json.dumps(default=str) key the same
+        return f"StructuredOutput({self.model!r})"`
+
+
+/**
+ * Return plain dicts from run_workflow wherever it returns a structured
+ * output record.
+ */
+export function returnStructuredOutputsAsDicts(body: string): string {
+  const records = new Set(
+    Array.from(
+      body.matchAll(new RegExp(`^ *(\\w+) = ${STRUCTURED_OUTPUT}\\(`, 'gm')),
+      (match) => match[1]
+    )
+  )
+  return body.replace(/^( *)return (\w+)$/gm, (line, indent, name) =>
+    records.has(name) ? `${indent}return ${name}.to_dict()` : line
+  )
+}
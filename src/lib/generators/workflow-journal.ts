@@ -0,0 +1,65 @@
+/**
+ * Journal of the node calls made by a run, shared by durable approvals and
+ * checkpointed runs.
+ *
+ * While a `_JournaledRun` is active, `run_node` records each node's result in
+ * call order. A run started with an existing journal replays the recorded
+ * results instead of calling the nodes again, so `run_workflow` can be
+ * re-executed up to the point where the earlier run stopped.
+ */
+
+export const WORKFLOW_JOURNAL_UTILS = `# Workflow journal
+
+class _JournaledRun:
+    def __init__(self, journal=(), decisions=None, on_record=None):
+        self.journal = list(journal)
+        # Approval decisions taken so far; None outside start_workflow/resume_workflow
+        self.decisions = decisions
+        self.approvals = 0
+        self.on_record = on_record
+        # Variables registered by run_workflow for checkpoint snapshots
+        self.variables = {}
+        self._nodes = 0
+
+    async def run_node(self, node_id, awaitable):
+        # Slots are taken in call order, so nodes awaited together replay in the same order
+        index = self._nodes
+        self._nodes += 1
+        if index < len(self.journal):
+            recorded_id, kind, value = self.journal[index]
+            if recorded_id != node_id:
+                raise RuntimeError(f"Cannot resume: expected node {recorded_id}, reached {node_id}; the workflow changed")
+            awaitable.close()
+            return _revive_result(kind, value)
+        self.journal.append(None)
+        result = await _node_call(node_id, awaitable)
+        entry = _record_result(node_id, result)
+        self.journal[index] = entry
+        if self.on_record is not None:
+            self.on_record(self, index, entry)
+        return result
+
+
+_journaled_run: ContextVar[Optional[_JournaledRun]] = ContextVar("journaled_run", default=None)
+
+
+def _record_result(node_id, result):
+    if hasattr(result, "new_items") and hasattr(result, "final_output"):
+        return node_id, "agent", {
+            "final_output": result.final_output,
+            "new_items": [item.to_input_item() for item in result.new_items],
+        }
+    if hasattr(result, "data"):
+        return node_id, "search", [
+            {"file_id": item.file_id, "filename": item.filename, "score": item.score}
+            for item in result.data
+        ]
+    return node_id, "value", result
+
+
+def _revive_result(kind, value):
+    if kind == "agent":
+        return RecordedRunResult(value)
+    if kind == "search":
+        return RecordedSearchPage(value)
+    return value`
@@ -2,7 +2,7 @@
 
 import { GuardrailsConfig } from '@/app/(without-sidebar)/edit/form-nodes'
 import { getNodeBasicPropsForDefinition } from '@/lib/node-configs'
-import { NodeDefinition } from '../types'
+import { NodeCacheConfig, NodeDefinition } from '../types'
 
 interface Expr {
   expression: string
@@ -13,6 +13,10 @@ export interface GuardrailsNodeConfig {
   continue_on_error: boolean
   guardrails: unknown[]
   expr: Expr
+  // Start the Agent on the pass branch while the check runs
+  speculative_agent?: boolean
+  // Reuse check results for text already checked
+  cache?: NodeCacheConfig
 }
 
 export const guardrailsNodeDefinition: NodeDefinition = {
@@ -1,3 +1,4 @@
+import { NodeCacheConfig } from '@/app/(without-sidebar)/edit/form-nodes'
 import { Input } from '@/components/ui/input'
 import { Label } from '@/components/ui/label'
 import { Textarea } from '@/components/ui/textarea'
@@ -154,6 +155,11 @@ const McpConfigComponent: React.FC<ConfigComponentProps> = ({
           className="mt-1 font-mono text-sm"
         />
       </div>
+
+      <NodeCacheConfig
+        value={config.cache}
+        onChange={(cache) => onChange({ ...config, cache })}
+      />
     </div>
   )
 }
@@ -18,8 +18,41 @@ export interface StateVariable {
   default?: string | number | boolean | object | any[]
 }
 
+// Token budget for conversation_history in generated code
+export interface ConversationHistorySettings {
+  max_tokens?: number | string
+  keep_prefix?: number | string
+}
+
+// Per-node checkpoints (run_workflow_checkpointed / resume_run) in generated code
+export interface CheckpointSettings {
+  enabled?: boolean
+}
+
+// Moderation requests of concurrent runs sent together in generated code
+export interface ModerationBatchingSettings {
+  enabled?: boolean
+  max_batch_size?: number | string
+  max_wait_ms?: number | string
+}
+
+// SDK imports and agent definitions deferred to warmup() in generated code
+export interface LazyLoadingSettings {
+  enabled?: boolean
+}
+
+// run_workflow_batch / iter_workflow_batch in generated code
+export interface BatchEntrypointSettings {
+  enabled?: boolean
+}
+
 export interface StartConfig {
   state_vars: StateVariable[]
+  conversation_history?: ConversationHistorySettings
+  checkpoints?: CheckpointSettings
+  moderation_batching?: ModerationBatchingSettings
+  lazy_loading?: LazyLoadingSettings
+  batch_entrypoints?: BatchEntrypointSettings
 }
 
 // Configuration component wrapper
@@ -6,6 +6,9 @@ import { ConfigComponentProps, NodeDefinition } from '../types'
 // Type definitions for User Approval config (matching OpenAI format)
 export interface UserApprovalConfig {
   message: string
+  // Seconds before the default branch is taken; empty waits indefinitely
+  timeout_seconds?: number | string
+  on_timeout?: 'approve' | 'reject'
   variable_mapping: Array<{
     variable_name: string
     source_path: string
@@ -45,3 +45,19 @@ export interface NodeData {
   config?: any
   inputSchema?: any
 }
+
+// Opt-in result cache for Agent, FileSearch and MCP nodes (`config.cache`)
+export interface NodeCacheConfig {
+  enabled?: boolean
+  backend?: 'memory' | 'sqlite'
+  ttl_seconds?: number | string
+}
+
+// Retry and hedging policy for Agent nodes (`config.retry`)
+export interface RetryPolicyConfig {
+  max_attempts?: number | string
+  attempt_timeout_seconds?: number | string
+  backoff_seconds?: number | string
+  // Percentile (0-100) of recent latencies after which a duplicate is sent
+  hedge_percentile?: number | string
+}
@@ -22,4 +22,3 @@ async def run_workflow(workflow_input: WorkflowInput):
       ]
     }
   ]
-  transform_result = {}
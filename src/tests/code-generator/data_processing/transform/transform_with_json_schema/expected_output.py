@@ -22,9 +22,3 @@ async def run_workflow(workflow_input: WorkflowInput):
       ]
     }
   ]
-  transform_result = {
-    "first_name": "",
-    "last_name": "",
-    "age": None,
-    "email": ""
-  }
@@ -22,4 +22,3 @@ async def run_workflow(workflow_input: WorkflowInput):
       ]
     }
   ]
-  transform_result = {"result": workflow["input_as_text"], "result2": workflow["input_as_text"] + "123"}
@@ -1,7 +1,666 @@
-from agents import Agent, ModelSettings, TResponseInputItem, Runner, RunConfig
+import asyncio
+import json
+import pickle
+import re
+import sqlite3
+import time
+import uuid
+from collections import deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Optional
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+from agents import Agent, ModelSettings, TResponseInputItem, Runner, RunConfig, OpenAIProvider
 from openai.types.shared.reasoning import Reasoning
 from pydantic import BaseModel
 
+# Shared client for agents, guardrails and file search. Every response, not
+# only 429s, updates the rate limits of the call that made the request
+_rate_limit_lease = ContextVar("rate_limit_lease", default=None)
+
+
+async def observe_rate_limit_headers(response):
+    # httpx response hook; add it to clients passed in from elsewhere too
+    lease = _rate_limit_lease.get()
+    if lease is not None:
+        lease.observe(response.headers)
+
+
+# Built by agent_run_config() on the first agent run
+client = None
+
+_agent_run_config = None
+
+
+def agent_run_config():
+    # Agent runs call the model through client instead of the SDK's default client
+    global client, _agent_run_config
+    if _agent_run_config is None:
+        if client is None:
+            client = AsyncOpenAI(http_client=DefaultAsyncHttpxClient(event_hooks={"response": [observe_rate_limit_headers]}))
+        _agent_run_config = RunConfig(model_provider=OpenAIProvider(openai_client=client))
+    return _agent_run_config
+
+# Node hooks
+
+class WorkflowHooks:
+    """Node lifecycle callbacks; override the ones you need.
+
+    Install an instance with set_workflow_hooks(). Each callback receives the
+    NodeRun of the Agent, Guardrails, FileSearch or MCP node concerned.
+    """
+
+    def on_node_start(self, node):
+        pass
+
+    def on_node_end(self, node):
+        pass
+
+    def on_error(self, node, error):
+        pass
+
+
+@dataclass
+class NodeRun:
+    id: str
+    label: str
+    type: str
+    # Wall-clock start (time.time()) and duration in seconds
+    started_at: float
+    duration: Optional[float] = None
+    # Token usage of agent runs, None for other nodes and cached results
+    usage: Optional[dict] = None
+
+
+class _InstalledHooks:
+    hooks = None
+
+
+_installed_hooks = _InstalledHooks()
+
+_NODES = {
+    "node_t4cftwv9": ("Agent", "builtins.Agent"),
+}
+
+
+def set_workflow_hooks(hooks):
+    """Install hooks for every workflow run in this module; None removes them."""
+    _installed_hooks.hooks = hooks
+
+
+def _usage(result):
+    usage = getattr(getattr(result, "context_wrapper", None), "usage", None)
+    if usage is None:
+        return None
+    return {
+        "requests": usage.requests,
+        "input_tokens": usage.input_tokens,
+        "output_tokens": usage.output_tokens,
+        "total_tokens": usage.total_tokens,
+    }
+
+
+async def _run_hooked_node(hooks, node_id, awaitable):
+    label, node_type = _NODES.get(node_id, (node_id, None))
+    node = NodeRun(node_id, label, node_type, time.time())
+    hooks.on_node_start(node)
+    start = time.perf_counter()
+    try:
+        result = await awaitable
+    except BaseException as error:
+        # Cancelled nodes are reported too, so every start has a matching end or error
+        node.duration = time.perf_counter() - start
+        hooks.on_error(node, error)
+        raise
+    node.duration = time.perf_counter() - start
+    node.usage = _usage(result)
+    hooks.on_node_end(node)
+    return result
+
+
+class WorkflowTimeout(Exception):
+    """Raised by run_workflow when its deadline passes; node_id names the node it stopped in."""
+
+    def __init__(self, node_id, deadline):
+        self.node_id = node_id
+        self.label = _NODES.get(node_id, (node_id, None))[0]
+        self.deadline = deadline
+        super().__init__(f"Workflow deadline exceeded in node {self.label!r} ({node_id})")
+
+
+# time.time() deadline of the run_workflow call this task belongs to, if any
+_workflow_deadline = ContextVar("workflow_deadline", default=None)
+
+
+async def _run_within_deadline(node_id, awaitable, deadline):
+    try:
+        # Cancels the node's requests when the budget runs out
+        return await asyncio.wait_for(awaitable, max(0.0, deadline - time.time()))
+    except asyncio.TimeoutError:
+        if time.time() < deadline:
+            # A timeout of the node itself, not of the workflow
+            raise
+        raise WorkflowTimeout(node_id, deadline) from None
+
+
+async def _workflow_timeout(node_id, deadline):
+    raise WorkflowTimeout(node_id, deadline)
+
+
+def _node_call(node_id, awaitable):
+    deadline = _workflow_deadline.get()
+    if deadline is not None and time.time() >= deadline:
+        # The node never starts: close its coroutine before anything wraps it
+        awaitable.close()
+        return _workflow_timeout(node_id, deadline)
+    hooks = _installed_hooks.hooks
+    if hooks is not None:
+        awaitable = _run_hooked_node(hooks, node_id, awaitable)
+    if deadline is not None:
+        awaitable = _run_within_deadline(node_id, awaitable, deadline)
+    return awaitable
+
+
+async def run_node(node_id, awaitable):
+    journaled_run = _journaled_run.get()
+    if journaled_run is not None:
+        return await journaled_run.run_node(node_id, awaitable)
+    return await _node_call(node_id, awaitable)
+
+
+# Rate limiting
+
+def estimate_request_tokens(payload):
+    # About four characters per token; corrected from usage where it is reported
+    text = payload if isinstance(payload, str) else json.dumps(payload, default=str)
+    return len(text) // 4 + 1
+
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def _parse_duration(value):
+    # Reset headers look like "20ms", "1s" or "6m0s"; retry-after is plain seconds
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        parts = _DURATION_PART.findall(value)
+        return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts) if parts else None
+
+
+class TokenBucket:
+    def __init__(self, per_minute):
+        self.level = 0.0
+        self.updated = time.monotonic()
+        self.set_limit(per_minute)
+        self.level = self.capacity
+
+    def set_limit(self, per_minute):
+        self.per_minute = per_minute
+        self.rate = per_minute / 60
+        # A few seconds of burst, not the whole minute at once
+        self.capacity = max(1.0, self.rate * 5)
+        self.level = min(self.level, self.capacity)
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount, now):
+        self._refill(now)
+        # Requests larger than the bucket wait for a full bucket and go into debt
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount):
+        self.level -= amount
+
+
+class _ModelLimits:
+    def __init__(self, concurrency, max_concurrency):
+        self.requests = None
+        self.tokens = None
+        self.concurrency = float(concurrency)
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.changed = asyncio.Condition()
+        self.calls = 0
+        self.rate_limited = 0
+        self.queue_delays = deque(maxlen=1024)
+
+    def delay(self, tokens):
+        now = time.monotonic()
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.in_flight >= max(1, int(self.concurrency)):
+            return float("inf")
+        delay = 0.0
+        if self.requests is not None:
+            delay = max(delay, self.requests.delay(1, now))
+        if self.tokens is not None and tokens:
+            delay = max(delay, self.tokens.delay(tokens, now))
+        return delay
+
+    def take(self, tokens):
+        self.in_flight += 1
+        self.calls += 1
+        if self.requests is not None:
+            self.requests.take(1)
+        if self.tokens is not None:
+            self.tokens.take(tokens)
+
+    def on_success(self):
+        # Additive increase: about one more slot per window of successful calls
+        self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+
+    def on_rate_limited(self, headers):
+        self.rate_limited += 1
+        now = time.monotonic()
+        # Multiplicative decrease, once per back-off rather than once per rejected call
+        if now >= self.blocked_until:
+            self.concurrency = max(1.0, self.concurrency / 2)
+        self.observe(headers)
+        retry_after = None
+        if headers:
+            retry_after_ms = _parse_duration(headers.get("retry-after-ms"))
+            retry_after = retry_after_ms / 1000 if retry_after_ms is not None else _parse_duration(headers.get("retry-after"))
+            if retry_after is None:
+                resets = [_parse_duration(headers.get(f"x-ratelimit-reset-{name}")) for name in ("requests", "tokens")]
+                retry_after = max((reset for reset in resets if reset is not None), default=None)
+        self.blocked_until = max(self.blocked_until, now + (retry_after if retry_after is not None else 1.0))
+
+    def observe(self, headers):
+        if not headers:
+            return
+        for name in ("requests", "tokens"):
+            limit = headers.get(f"x-ratelimit-limit-{name}")
+            if limit is None:
+                continue
+            bucket = getattr(self, name)
+            if bucket is None:
+                bucket = TokenBucket(float(limit))
+                setattr(self, name, bucket)
+            elif float(limit) != bucket.per_minute:
+                bucket.set_limit(float(limit))
+            remaining = headers.get(f"x-ratelimit-remaining-{name}")
+            if remaining is not None:
+                bucket.level = min(bucket.level, float(remaining))
+
+    def stats(self):
+        delays = sorted(self.queue_delays)
+        return {
+            "calls": self.calls,
+            "rate_limited": self.rate_limited,
+            "in_flight": self.in_flight,
+            "concurrency_limit": int(self.concurrency),
+            "requests_per_minute": self.requests.per_minute if self.requests is not None else None,
+            "tokens_per_minute": self.tokens.per_minute if self.tokens is not None else None,
+            "queue_delay_mean": sum(delays) / len(delays) if delays else 0.0,
+            "queue_delay_p95": delays[int(len(delays) * 0.95)] if delays else 0.0,
+            "queue_delay_max": delays[-1] if delays else 0.0,
+        }
+
+
+class RateLimitLease:
+    def __init__(self, limits, tokens):
+        self._limits = limits
+        self.tokens = tokens
+
+    def observe(self, headers):
+        self._limits.observe(headers)
+
+    def settle(self, tokens):
+        # Charge the difference between the estimate and the reported usage
+        if tokens is not None and self._limits.tokens is not None:
+            self._limits.tokens.take(tokens - self.tokens)
+            self.tokens = tokens
+
+
+class RateLimiter:
+    """Client-side request shaping per model.
+
+    Each model has a concurrency limit adjusted with AIMD: it grows by about
+    one per window of successful calls and halves when the provider answers
+    429, after which the model is paused until the reset the response asks
+    for. Request and token buckets start unlimited and follow the
+    x-ratelimit-* headers seen in responses, or the limits given to
+    configure(). stats() reports the time calls spent queued per model.
+    """
+
+    def __init__(self, initial_concurrency=16, max_concurrency=256):
+        self.initial_concurrency = initial_concurrency
+        self.max_concurrency = max_concurrency
+        self._models = {}
+
+    def _limits(self, model):
+        limits = self._models.get(model)
+        if limits is None:
+            limits = _ModelLimits(self.initial_concurrency, self.max_concurrency)
+            self._models[model] = limits
+        return limits
+
+    def configure(self, model, requests_per_minute=None, tokens_per_minute=None, concurrency=None):
+        limits = self._limits(model)
+        if requests_per_minute is not None:
+            limits.observe({"x-ratelimit-limit-requests": requests_per_minute})
+        if tokens_per_minute is not None:
+            limits.observe({"x-ratelimit-limit-tokens": tokens_per_minute})
+        if concurrency is not None:
+            limits.concurrency = float(concurrency)
+
+    def observe(self, model, headers):
+        self._limits(model).observe(headers)
+
+    def stats(self):
+        return {model: limits.stats() for model, limits in self._models.items()}
+
+    @asynccontextmanager
+    async def acquire(self, model, tokens=0):
+        limits = self._limits(model)
+        queued_at = time.monotonic()
+        async with limits.changed:
+            while (delay := limits.delay(tokens)) > 0:
+                try:
+                    await asyncio.wait_for(limits.changed.wait(), None if delay == float("inf") else delay)
+                except asyncio.TimeoutError:
+                    pass
+            limits.take(tokens)
+        limits.queue_delays.append(time.monotonic() - queued_at)
+        lease = RateLimitLease(limits, tokens)
+        # observe_rate_limit_headers passes the call's responses to its lease
+        token = _rate_limit_lease.set(lease)
+        try:
+            yield lease
+        except Exception as error:
+            if getattr(error, "status_code", None) == 429:
+                limits.on_rate_limited(getattr(getattr(error, "response", None), "headers", None))
+            raise
+        else:
+            limits.on_success()
+        finally:
+            _rate_limit_lease.reset(token)
+            async with limits.changed:
+                limits.in_flight -= 1
+                limits.changed.notify_all()
+
+
+rate_limits = RateLimiter()
+
+
+def _model_key(agent):
+    model = getattr(agent, "model", None)
+    return model if isinstance(model, str) else getattr(model, "model", None) or "default"
+
+
+# Agent runtime
+
+@dataclass
+class WorkflowEvent:
+    # "node_started", "text_delta", "node_finished" or "final_output"
+    type: str
+    node_id: Optional[str] = None
+    delta: Optional[str] = None
+    output: Any = None
+
+
+# Event queue of the run_workflow_streamed call this task belongs to, if any
+_workflow_events = ContextVar("workflow_events", default=None)
+
+
+def run_agent_node(node_id, agent, input):
+    return run_node(node_id, _run_agent_node(node_id, agent, input))
+
+
+def _settle_usage(lease, result):
+    usage = getattr(getattr(result, "context_wrapper", None), "usage", None)
+    lease.settle(getattr(usage, "total_tokens", None))
+
+
+async def _run_agent_request(agent, input):
+    async with rate_limits.acquire(_model_key(agent), tokens=estimate_request_tokens(input)) as lease:
+        result = await Runner.run(agent, input=input, run_config=agent_run_config())
+        _settle_usage(lease, result)
+    return result
+
+
+async def _run_agent_node(node_id, agent, input):
+    events = _workflow_events.get()
+    if events is None:
+        return await _run_agent_request(agent, input)
+    events.put_nowait(WorkflowEvent("node_started", node_id=node_id))
+    published = False
+
+    async def stream_request():
+        nonlocal published
+        async with rate_limits.acquire(_model_key(agent), tokens=estimate_request_tokens(input)) as lease:
+            result = Runner.run_streamed(agent, input=input, run_config=agent_run_config())
+            async for event in result.stream_events():
+                if event.type == "raw_response_event" and event.data.type == "response.output_text.delta":
+                    published = True
+                    events.put_nowait(WorkflowEvent("text_delta", node_id=node_id, delta=event.data.delta))
+            _settle_usage(lease, result)
+        return result
+
+    result = await stream_request()
+    events.put_nowait(WorkflowEvent("node_finished", node_id=node_id, output=result.final_output))
+    return result
+
+
+# Recorded node results
+
+class RecordedRunItem:
+    def __init__(self, item):
+        self._item = item
+
+    def to_input_item(self):
+        return dict(self._item)
+
+
+class RecordedRunResult:
+    """Stands in for an agent run with the new_items and final_output it recorded."""
+
+    def __init__(self, record):
+        self.final_output = record["final_output"]
+        self.new_items = [RecordedRunItem(item) for item in record["new_items"]]
+
+    def final_output_as(self, cls, raise_if_incorrect_type=False):
+        return self.final_output
+
+
+class RecordedSearchResult:
+    def __init__(self, file_id, filename, score):
+        self.file_id = file_id
+        self.filename = filename
+        self.score = score
+
+
+class RecordedSearchPage:
+    def __init__(self, results):
+        self.data = [RecordedSearchResult(**result) for result in results]
+
+
+# Workflow journal
+
+class _JournaledRun:
+    def __init__(self, journal=(), decisions=None, on_record=None):
+        self.journal = list(journal)
+        # Approval decisions taken so far; None outside start_workflow/resume_workflow
+        self.decisions = decisions
+        self.approvals = 0
+        self.on_record = on_record
+        # Variables registered by run_workflow for checkpoint snapshots
+        self.variables = {}
+        self._nodes = 0
+
+    async def run_node(self, node_id, awaitable):
+        # Slots are taken in call order, so nodes awaited together replay in the same order
+        index = self._nodes
+        self._nodes += 1
+        if index < len(self.journal):
+            recorded_id, kind, value = self.journal[index]
+            if recorded_id != node_id:
+                raise RuntimeError(f"Cannot resume: expected node {recorded_id}, reached {node_id}; the workflow changed")
+            awaitable.close()
+            return _revive_result(kind, value)
+        self.journal.append(None)
+        result = await _node_call(node_id, awaitable)
+        entry = _record_result(node_id, result)
+        self.journal[index] = entry
+        if self.on_record is not None:
+            self.on_record(self, index, entry)
+        return result
+
+
+_journaled_run: ContextVar[Optional[_JournaledRun]] = ContextVar("journaled_run", default=None)
+
+
+def _record_result(node_id, result):
+    if hasattr(result, "new_items") and hasattr(result, "final_output"):
+        return node_id, "agent", {
+            "final_output": result.final_output,
+            "new_items": [item.to_input_item() for item in result.new_items],
+        }
+    if hasattr(result, "data"):
+        return node_id, "search", [
+            {"file_id": item.file_id, "filename": item.filename, "score": item.score}
+            for item in result.data
+        ]
+    return node_id, "value", result
+
+
+def _revive_result(kind, value):
+    if kind == "agent":
+        return RecordedRunResult(value)
+    if kind == "search":
+        return RecordedSearchPage(value)
+    return value
+
+
+# Durable approvals
+
+class WorkflowSuspended(BaseException):
+    # A BaseException, like CancelledError, so node error handlers let it through
+    def __init__(self, node_id, message, snapshot, timeout, on_timeout):
+        super().__init__(node_id)
+        self.node_id = node_id
+        self.message = message
+        self.snapshot = snapshot
+        self.timeout = timeout
+        self.on_timeout = on_timeout
+
+
+@dataclass
+class PendingApproval:
+    handle: str
+    node_id: Optional[str]
+    message: str
+    created_at: float
+    # After this time (time.time()) the node's default branch is taken
+    expires_at: Optional[float] = None
+    # state, workflow and conversation_history when the run was suspended
+    snapshot: Optional[dict] = None
+
+
+async def request_approval(node_id, message, snapshot, timeout=None, on_timeout=False):
+    run = _journaled_run.get()
+    if run is None or run.decisions is None:
+        # Outside start_workflow/resume_workflow there is nobody to ask
+        return True
+    index = run.approvals
+    run.approvals += 1
+    if index < len(run.decisions):
+        recorded_id, approved = run.decisions[index]
+        if recorded_id != node_id:
+            raise RuntimeError(f"Cannot resume: expected approval {recorded_id}, reached {node_id}; the workflow changed")
+        return approved
+    raise WorkflowSuspended(node_id, message, snapshot, timeout, on_timeout)
+
+
+class ApprovalStore:
+    """Suspended workflow runs waiting for a User Approval decision, in SQLite.
+
+    A row holds everything resume_workflow() needs: the workflow input, the
+    decisions taken so far, the recorded results of the nodes that already
+    ran and the snapshot taken at the approval. Node results must pickle.
+    """
+
+    def __init__(self, path="workflow_approvals.sqlite3"):
+        self.path = path
+        self._db = None
+
+    def _connect(self):
+        if self._db is None:
+            self._db = sqlite3.connect(self.path)
+            with self._db:
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS approvals (handle TEXT PRIMARY KEY, node_id TEXT, message TEXT, "
+                    "created_at REAL, expires_at REAL, record BLOB)"
+                )
+                self._db.execute("CREATE INDEX IF NOT EXISTS approvals_expires_at ON approvals (expires_at)")
+        return self._db
+
+    def save(self, input, run, suspended):
+        now = time.time()
+        approval = PendingApproval(
+            handle=uuid.uuid4().hex,
+            node_id=suspended.node_id,
+            message=suspended.message,
+            created_at=now,
+            expires_at=now + suspended.timeout if suspended.timeout else None,
+            snapshot=suspended.snapshot,
+        )
+        record = pickle.dumps({
+            "input": input,
+            "journal": run.journal,
+            "decisions": run.decisions,
+            "node_id": suspended.node_id,
+            "on_timeout": suspended.on_timeout,
+            "expires_at": approval.expires_at,
+            "snapshot": suspended.snapshot,
+        })
+        with self._connect() as db:
+            db.execute(
+                "INSERT INTO approvals VALUES (?, ?, ?, ?, ?, ?)",
+                (approval.handle, approval.node_id, approval.message, approval.created_at, approval.expires_at, record),
+            )
+        return approval
+
+    def take(self, handle):
+        # Removing the row first means a handle can only be resumed once
+        with self._connect() as db:
+            row = db.execute("SELECT record FROM approvals WHERE handle = ?", (handle,)).fetchone()
+            if row is None or db.execute("DELETE FROM approvals WHERE handle = ?", (handle,)).rowcount == 0:
+                return None
+        return pickle.loads(row[0])
+
+    def get(self, handle):
+        """The pending approval with its snapshot, or None once it was resumed."""
+        row = self._connect().execute(
+            "SELECT handle, node_id, message, created_at, expires_at, record FROM approvals WHERE handle = ?", (handle,)
+        ).fetchone()
+        if row is None:
+            return None
+        return PendingApproval(*row[:5], snapshot=pickle.loads(row[5])["snapshot"])
+
+    def pending(self, expired=False):
+        """Pending approvals, oldest first, without their snapshots."""
+        query = "SELECT handle, node_id, message, created_at, expires_at FROM approvals"
+        params = ()
+        if expired:
+            query += " WHERE expires_at <= ?"
+            params = (time.time(),)
+        rows = self._connect().execute(query + " ORDER BY created_at", params).fetchall()
+        return [PendingApproval(*row) for row in rows]
+
+
+approval_store = ApprovalStore()
+
+
 agent = Agent(
   name="Agent",
   instructions="",
@@ -9,23 +668,23 @@ agent = Agent(
   model_settings=ModelSettings(
     store=True,
     reasoning=Reasoning(
-      effort="low",
-      summary="auto"
+      effort="low"
     )
   )
 )
 
 
-def approval_request(message: str):
-  # TODO: Implement
-  return True
+async def approval_request(message: str, **snapshot):
+  return await request_approval("node_f95sw3y5", message, snapshot, timeout=None, on_timeout=False)
 
 class WorkflowInput(BaseModel):
   input_as_text: str
 
 
 # Main code entrypoint
-async def run_workflow(workflow_input: WorkflowInput):
+async def run_workflow(workflow_input: WorkflowInput, deadline: Optional[float] = None):
+  # Past deadline (a time.time() timestamp) node calls raise WorkflowTimeout
+  _workflow_deadline.set(deadline)
   state = {
     "string_var_name": "tom",
     "num_var": 0
@@ -45,8 +704,9 @@ async def run_workflow(workflow_input: WorkflowInput):
   if state["string_var_name"]:
     approval_message = ""
 
-    if approval_request(approval_message):
-        agent_result_temp = await Runner.run(
+    if await approval_request(approval_message, state=state, workflow=workflow, conversation_history=conversation_history):
+        agent_result_temp = await run_agent_node(
+          "node_t4cftwv9",
           agent,
           input=[
             *conversation_history
@@ -63,3 +723,73 @@ async def run_workflow(workflow_input: WorkflowInput):
         return workflow
   else:
     return workflow
+
+
+# Streaming entrypoint
+async def run_workflow_streamed(workflow_input: WorkflowInput, deadline: Optional[float] = None):
+  """Run the workflow, yielding WorkflowEvents as soon as agents produce them."""
+  events = asyncio.Queue()
+
+  async def run():
+    _workflow_events.set(events)
+    try:
+      output = await run_workflow(workflow_input, deadline=deadline)
+      events.put_nowait(WorkflowEvent("final_output", output=output))
+    finally:
+      events.put_nowait(None)
+
+  task = asyncio.create_task(run())
+  try:
+    while (event := await events.get()) is not None:
+      yield event
+    # Surface errors raised by the workflow itself
+    await task
+  finally:
+    task.cancel()
+
+
+# Durable entrypoints
+async def _run_durable(input, journal, decisions):
+  run = _JournaledRun(journal, decisions=decisions)
+  token = _journaled_run.set(run)
+  try:
+    return await run_workflow(WorkflowInput(**input))
+  except WorkflowSuspended as suspended:
+    return approval_store.save(input, run, suspended)
+  finally:
+    _journaled_run.reset(token)
+
+
+async def start_workflow(workflow_input: WorkflowInput):
+  """Run the workflow until it ends or reaches a User Approval node.
+
+  Returns the workflow output, or a PendingApproval whose handle is passed
+  to resume_workflow() once someone decides. The suspended run lives in
+  approval_store only, so pending approvals hold no task or memory.
+  """
+  return await _run_durable(workflow_input.model_dump(), [], [])
+
+
+async def resume_workflow(handle, approved):
+  """Continue a suspended run with the decision for its pending approval.
+
+  Nodes that ran before the approval are replayed from their recorded
+  results, not called again. An approval past its timeout takes the node's
+  default branch whatever approved says. Returns the workflow output or the
+  next PendingApproval.
+  """
+  record = approval_store.take(handle)
+  if record is None:
+    raise KeyError(f"No pending approval with handle {handle!r}")
+  if record["expires_at"] is not None and record["expires_at"] <= time.time():
+    approved = record["on_timeout"]
+  decisions = [*record["decisions"], (record["node_id"], bool(approved))]
+  return await _run_durable(record["input"], record["journal"], decisions)
+
+
+async def expire_approvals():
+  """Resume every run whose approval timed out; returns results by handle."""
+  return {
+    approval.handle: await resume_workflow(approval.handle, False)
+    for approval in approval_store.pending(expired=True)
+  }
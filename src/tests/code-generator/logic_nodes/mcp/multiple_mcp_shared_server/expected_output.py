@@ -0,0 +1,349 @@
+import asyncio
+import json
+import time
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
+from mcp.client import Client, StdioClientTransport, SSEClientTransport
+from pydantic import BaseModel
+from agents import TResponseInputItem
+
+# Node hooks
+
+class WorkflowHooks:
+    """Node lifecycle callbacks; override the ones you need.
+
+    Install an instance with set_workflow_hooks(). Each callback receives the
+    NodeRun of the Agent, Guardrails, FileSearch or MCP node concerned.
+    """
+
+    def on_node_start(self, node):
+        pass
+
+    def on_node_end(self, node):
+        pass
+
+    def on_error(self, node, error):
+        pass
+
+
+@dataclass
+class NodeRun:
+    id: str
+    label: str
+    type: str
+    # Wall-clock start (time.time()) and duration in seconds
+    started_at: float
+    duration: Optional[float] = None
+    # Token usage of agent runs, None for other nodes and cached results
+    usage: Optional[dict] = None
+
+
+class _InstalledHooks:
+    hooks = None
+
+
+_installed_hooks = _InstalledHooks()
+
+_NODES = {
+    "node_mcp": ("MCP", "builtins.MCP"),
+    "node_mcp2": ("MCP 2", "builtins.MCP"),
+    "node_mcp3": ("MCP 3", "builtins.MCP"),
+}
+
+
+def set_workflow_hooks(hooks):
+    """Install hooks for every workflow run in this module; None removes them."""
+    _installed_hooks.hooks = hooks
+
+
+def _usage(result):
+    usage = getattr(getattr(result, "context_wrapper", None), "usage", None)
+    if usage is None:
+        return None
+    return {
+        "requests": usage.requests,
+        "input_tokens": usage.input_tokens,
+        "output_tokens": usage.output_tokens,
+        "total_tokens": usage.total_tokens,
+    }
+
+
+async def _run_hooked_node(hooks, node_id, awaitable):
+    label, node_type = _NODES.get(node_id, (node_id, None))
+    node = NodeRun(node_id, label, node_type, time.time())
+    hooks.on_node_start(node)
+    start = time.perf_counter()
+    try:
+        result = await awaitable
+    except BaseException as error:
+        # Cancelled nodes are reported too, so every start has a matching end or error
+        node.duration = time.perf_counter() - start
+        hooks.on_error(node, error)
+        raise
+    node.duration = time.perf_counter() - start
+    node.usage = _usage(result)
+    hooks.on_node_end(node)
+    return result
+
+
+class WorkflowTimeout(Exception):
+    """Raised by run_workflow when its deadline passes; node_id names the node it stopped in."""
+
+    def __init__(self, node_id, deadline):
+        self.node_id = node_id
+        self.label = _NODES.get(node_id, (node_id, None))[0]
+        self.deadline = deadline
+        super().__init__(f"Workflow deadline exceeded in node {self.label!r} ({node_id})")
+
+
+# time.time() deadline of the run_workflow call this task belongs to, if any
+_workflow_deadline = ContextVar("workflow_deadline", default=None)
+
+
+async def _run_within_deadline(node_id, awaitable, deadline):
+    try:
+        # Cancels the node's requests when the budget runs out
+        return await asyncio.wait_for(awaitable, max(0.0, deadline - time.time()))
+    except asyncio.TimeoutError:
+        if time.time() < deadline:
+            # A timeout of the node itself, not of the workflow
+            raise
+        raise WorkflowTimeout(node_id, deadline) from None
+
+
+async def _workflow_timeout(node_id, deadline):
+    raise WorkflowTimeout(node_id, deadline)
+
+
+def _node_call(node_id, awaitable):
+    deadline = _workflow_deadline.get()
+    if deadline is not None and time.time() >= deadline:
+        # The node never starts: close its coroutine before anything wraps it
+        awaitable.close()
+        return _workflow_timeout(node_id, deadline)
+    hooks = _installed_hooks.hooks
+    if hooks is not None:
+        awaitable = _run_hooked_node(hooks, node_id, awaitable)
+    if deadline is not None:
+        awaitable = _run_within_deadline(node_id, awaitable, deadline)
+    return awaitable
+
+
+async def run_node(node_id, awaitable):
+    return await _node_call(node_id, awaitable)
+
+
+# MCP utils
+
+class _MCPSession:
+    def __init__(self, key, connecting):
+        self.key = key
+        self.connecting = connecting
+        self.client = None
+        self.users = 0
+        self.last_used = time.monotonic()
+        self.broken = False
+
+
+class MCPSessionPool:
+    """Shares initialized MCP clients across nodes and workflow runs.
+
+    Sessions are keyed by transport, target and headers, so nodes that talk to
+    the same server reuse one connection (and one stdio process). Idle sessions
+    are closed after idle_timeout seconds, the least recently used idle session
+    makes room once max_size is reached, and sessions idle for longer than
+    health_check_interval are pinged before they are handed out again.
+    """
+
+    def __init__(self, max_size=8, idle_timeout=300.0, health_check_interval=30.0):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self._sessions = {}
+        self._changed = asyncio.Condition()
+
+    async def call_tool(self, transport, target, headers=None, *, name, arguments, timeout=None):
+        session = await self._acquire(transport, target, headers or {})
+        try:
+            return await asyncio.wait_for(
+                session.client.call_tool(name=name, arguments=arguments), timeout
+            )
+        except (OSError, EOFError, asyncio.TimeoutError, asyncio.CancelledError):
+            # The connection state is unknown after a lost connection, a timeout
+            # or a cancelled call; a tool that raised leaves it usable
+            session.broken = True
+            raise
+        finally:
+            await self._release(session)
+
+    async def aclose(self):
+        async with self._changed:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        # Sessions still in use are closed by their last _release
+        await self._close_all([s for s in sessions if s.users == 0])
+
+    async def _acquire(self, transport, target, headers):
+        key = (transport, target, json.dumps(headers, sort_keys=True))
+        while True:
+            stale = []
+            async with self._changed:
+                stale += self._take_expired()
+                session = self._sessions.get(key)
+                if session is not None:
+                    ping = self._needs_ping(session)
+                    session.users += 1
+                elif len(self._sessions) < self.max_size or self._evict_lru(stale):
+                    ping = False
+                    connecting = asyncio.ensure_future(self._connect(transport, target, headers))
+                    session = self._sessions[key] = _MCPSession(key, connecting)
+                    session.users += 1
+                else:
+                    await self._changed.wait()
+            # Closing and pinging talk to the server, so they run unlocked
+            await self._close_all(stale)
+            if session is None:
+                continue
+            if ping and not await self._ping(session):
+                session.broken = True
+                await self._release(session)
+                continue
+            break
+        try:
+            # Shielded so one cancelled caller doesn't abort a shared connect
+            session.client = await asyncio.shield(session.connecting)
+        except BaseException:
+            session.broken = True
+            await self._release(session)
+            raise
+        return session
+
+    async def _release(self, session):
+        async with self._changed:
+            session.users -= 1
+            session.last_used = time.monotonic()
+            if session.broken and self._sessions.get(session.key) is session:
+                del self._sessions[session.key]
+            orphaned = session.users == 0 and self._sessions.get(session.key) is not session
+            self._changed.notify_all()
+        if orphaned:
+            await self._close(session)
+
+    async def _connect(self, transport, target, headers):
+        if transport == "stdio":
+            mcp_transport = StdioClientTransport(command="python", args=[target])
+        else:
+            mcp_transport = SSEClientTransport(url=target, headers=headers)
+        client = Client(transport=mcp_transport)
+        await client.initialize()
+        return client
+
+    def _needs_ping(self, session):
+        # Only sessions nobody is using and that sat idle for a while are pinged
+        if session.users > 0 or session.client is None:
+            return False
+        return time.monotonic() - session.last_used >= self.health_check_interval
+
+    async def _ping(self, session):
+        try:
+            await asyncio.wait_for(session.client.ping(), 5)
+            return True
+        except Exception:
+            return False
+
+    def _take_expired(self):
+        now = time.monotonic()
+        expired = [
+            s for s in self._sessions.values()
+            if s.users == 0 and now - s.last_used > self.idle_timeout
+        ]
+        for session in expired:
+            del self._sessions[session.key]
+        return expired
+
+    def _evict_lru(self, evicted):
+        idle = [s for s in self._sessions.values() if s.users == 0]
+        if not idle:
+            return False
+        session = min(idle, key=lambda s: s.last_used)
+        del self._sessions[session.key]
+        evicted.append(session)
+        return True
+
+    async def _close_all(self, sessions):
+        await asyncio.gather(*(self._close(session) for session in sessions))
+
+    async def _close(self, session):
+        try:
+            client = await session.connecting
+            await client.close()
+        except Exception:
+            pass
+
+mcp_sessions = MCPSessionPool()
+
+class WorkflowInput(BaseModel):
+  input_as_text: str
+
+
+# Main code entrypoint
+async def run_workflow(workflow_input: WorkflowInput, deadline: Optional[float] = None):
+  # Past deadline (a time.time() timestamp) node calls raise WorkflowTimeout
+  _workflow_deadline.set(deadline)
+  state = {
+
+  }
+  workflow = workflow_input.model_dump()
+  conversation_history: list[TResponseInputItem] = [
+    {
+      "role": "user",
+      "content": [
+        {
+          "type": "input_text",
+          "text": workflow["input_as_text"]
+        }
+      ]
+    }
+  ]
+  # Unused: nothing reads the result of "MCP" (node_mcp); it still runs since it may have side effects
+  # Unused: nothing reads the result of "MCP 2" (node_mcp2); it still runs since it may have side effects
+  # Unused: nothing reads the result of "MCP 3" (node_mcp3); it still runs since it may have side effects
+  mcp_result, mcp_result1, mcp_result2 = await asyncio.gather(
+    run_node("node_mcp", mcp_sessions.call_tool(
+      "sse",
+      "https://api.example.com/mcp",
+      headers={
+        "Authorization": "Bearer sk-test-token-123"
+      },
+      name="database_query",
+      arguments={
+        "table": "users",
+        "limit": 10
+      },
+      timeout=30
+    )),
+    run_node("node_mcp2", mcp_sessions.call_tool(
+      "sse",
+      "https://api.example.com/mcp",
+      headers={
+        "Authorization": "Bearer sk-test-token-123"
+      },
+      name="database_count",
+      arguments={
+        "table": "orders"
+      },
+      timeout=30
+    )),
+    run_node("node_mcp3", mcp_sessions.call_tool(
+      "stdio",
+      "servers/files.py",
+      headers={},
+      name="read_file",
+      arguments={
+        "path": "README.md"
+      },
+      timeout=10
+    ))
+  )
+  return workflow
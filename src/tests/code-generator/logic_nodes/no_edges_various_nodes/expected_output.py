@@ -1,3 +1,12 @@
+import asyncio
+import json
+import pickle
+import sqlite3
+import time
+import uuid
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Optional
 from openai import AsyncOpenAI
 from types import SimpleNamespace
 from guardrails.runtime import load_config_bundle, instantiate_guardrails, run_guardrails
@@ -16,9 +25,64 @@ guardrails_config = {
 }
 # Guardrails utils
 
+_guardrails_bundles = {}
+_guardrails_bundles_by_id = {}
+
+def get_guardrails_bundle(config):
+    # Config dicts are module-level constants, so the id() lookup is the hot path.
+    # The entry keeps the config alive so its id can never be reused.
+    entry = _guardrails_bundles_by_id.get(id(config))
+    if entry is not None:
+        return entry[1]
+    key = json.dumps(config, sort_keys=True)
+    bundle = _guardrails_bundles.get(key)
+    if bundle is None:
+        bundle = instantiate_guardrails(load_config_bundle(config))
+        _guardrails_bundles[key] = bundle
+    _guardrails_bundles_by_id[id(config)] = (config, bundle)
+    return bundle
+
 def guardrails_has_tripwire(results):
     return any(getattr(r, "tripwire_triggered", False) is True for r in (results or []))
 
+# Engines of the checks that run in-process; the others call a model or an API
+_LOCAL_GUARDRAIL_ENGINES = ("regex", "presidio")
+
+def _is_local_guardrail(guardrail):
+    engine = getattr(guardrail.definition.metadata, "engine", None) or ""
+    return engine.lower() in _LOCAL_GUARDRAIL_ENGINES
+
+async def _run_guardrails_tier(ctx, text, media_type, bundle, tier, results, **kwargs):
+    # Returns True as soon as a check trips, cancelling the ones still running
+    tasks = {
+        asyncio.create_task(run_guardrails(ctx, text, media_type, [bundle[index]], **kwargs)): index
+        for index in tier
+    }
+    pending = set(tasks)
+    try:
+        while pending:
+            done, pending = await asyncio.wait(pending, return_when=asyncio.FIRST_COMPLETED)
+            for task in done:
+                results[tasks[task]] = task.result()
+            if any(guardrails_has_tripwire(results[tasks[task]]) for task in done):
+                return True
+        return False
+    finally:
+        for task in pending:
+            task.cancel()
+
+async def run_guardrails_in_cost_order(ctx, text, media_type, bundle, **kwargs):
+    # Local checks run first and the model/API checks, together, only once they
+    # pass. Checks skipped after a tripwire have no result. Results come back
+    # in bundle order, like run_guardrails.
+    results = {}
+    local = [index for index, guardrail in enumerate(bundle) if _is_local_guardrail(guardrail)]
+    remote = [index for index in range(len(bundle)) if index not in local]
+    for tier in (local, remote):
+        if await _run_guardrails_tier(ctx, text, media_type, bundle, tier, results, **kwargs):
+            break
+    return [result for _, group in sorted(results.items()) for result in group]
+
 def get_guardrail_checked_text(results, fallback_text):
     for r in (results or []):
         info = getattr(r, "info", None) or {}
@@ -39,6 +103,216 @@ def build_guardrail_fail_output(results):
                     failure[key] = info.get(key)
             failures.append(failure)
     return {"failed": len(failures) > 0, "failures": failures}
+
+# Recorded node results
+
+class RecordedRunItem:
+    def __init__(self, item):
+        self._item = item
+
+    def to_input_item(self):
+        return dict(self._item)
+
+
+class RecordedRunResult:
+    """Stands in for an agent run with the new_items and final_output it recorded."""
+
+    def __init__(self, record):
+        self.final_output = record["final_output"]
+        self.new_items = [RecordedRunItem(item) for item in record["new_items"]]
+
+    def final_output_as(self, cls, raise_if_incorrect_type=False):
+        return self.final_output
+
+
+class RecordedSearchResult:
+    def __init__(self, file_id, filename, score):
+        self.file_id = file_id
+        self.filename = filename
+        self.score = score
+
+
+class RecordedSearchPage:
+    def __init__(self, results):
+        self.data = [RecordedSearchResult(**result) for result in results]
+
+
+# Workflow journal
+
+class _JournaledRun:
+    def __init__(self, journal=(), decisions=None, on_record=None):
+        self.journal = list(journal)
+        # Approval decisions taken so far; None outside start_workflow/resume_workflow
+        self.decisions = decisions
+        self.approvals = 0
+        self.on_record = on_record
+        # Variables registered by run_workflow for checkpoint snapshots
+        self.variables = {}
+        self._nodes = 0
+
+    async def run_node(self, node_id, awaitable):
+        # Slots are taken in call order, so nodes awaited together replay in the same order
+        index = self._nodes
+        self._nodes += 1
+        if index < len(self.journal):
+            recorded_id, kind, value = self.journal[index]
+            if recorded_id != node_id:
+                raise RuntimeError(f"Cannot resume: expected node {recorded_id}, reached {node_id}; the workflow changed")
+            awaitable.close()
+            return _revive_result(kind, value)
+        self.journal.append(None)
+        result = await _node_call(node_id, awaitable)
+        entry = _record_result(node_id, result)
+        self.journal[index] = entry
+        if self.on_record is not None:
+            self.on_record(self, index, entry)
+        return result
+
+
+_journaled_run: ContextVar[Optional[_JournaledRun]] = ContextVar("journaled_run", default=None)
+
+
+def _record_result(node_id, result):
+    if hasattr(result, "new_items") and hasattr(result, "final_output"):
+        return node_id, "agent", {
+            "final_output": result.final_output,
+            "new_items": [item.to_input_item() for item in result.new_items],
+        }
+    if hasattr(result, "data"):
+        return node_id, "search", [
+            {"file_id": item.file_id, "filename": item.filename, "score": item.score}
+            for item in result.data
+        ]
+    return node_id, "value", result
+
+
+def _revive_result(kind, value):
+    if kind == "agent":
+        return RecordedRunResult(value)
+    if kind == "search":
+        return RecordedSearchPage(value)
+    return value
+
+
+# Durable approvals
+
+class WorkflowSuspended(BaseException):
+    # A BaseException, like CancelledError, so node error handlers let it through
+    def __init__(self, node_id, message, snapshot, timeout, on_timeout):
+        super().__init__(node_id)
+        self.node_id = node_id
+        self.message = message
+        self.snapshot = snapshot
+        self.timeout = timeout
+        self.on_timeout = on_timeout
+
+
+@dataclass
+class PendingApproval:
+    handle: str
+    node_id: Optional[str]
+    message: str
+    created_at: float
+    # After this time (time.time()) the node's default branch is taken
+    expires_at: Optional[float] = None
+    # state, workflow and conversation_history when the run was suspended
+    snapshot: Optional[dict] = None
+
+
+async def request_approval(node_id, message, snapshot, timeout=None, on_timeout=False):
+    run = _journaled_run.get()
+    if run is None or run.decisions is None:
+        # Outside start_workflow/resume_workflow there is nobody to ask
+        return True
+    index = run.approvals
+    run.approvals += 1
+    if index < len(run.decisions):
+        recorded_id, approved = run.decisions[index]
+        if recorded_id != node_id:
+            raise RuntimeError(f"Cannot resume: expected approval {recorded_id}, reached {node_id}; the workflow changed")
+        return approved
+    raise WorkflowSuspended(node_id, message, snapshot, timeout, on_timeout)
+
+
+class ApprovalStore:
+    """Suspended workflow runs waiting for a User Approval decision, in SQLite.
+
+    A row holds everything resume_workflow() needs: the workflow input, the
+    decisions taken so far, the recorded results of the nodes that already
+    ran and the snapshot taken at the approval. Node results must pickle.
+    """
+
+    def __init__(self, path="workflow_approvals.sqlite3"):
+        self.path = path
+        self._db = None
+
+    def _connect(self):
+        if self._db is None:
+            self._db = sqlite3.connect(self.path)
+            with self._db:
+                self._db.execute(
+                    "CREATE TABLE IF NOT EXISTS approvals (handle TEXT PRIMARY KEY, node_id TEXT, message TEXT, "
+                    "created_at REAL, expires_at REAL, record BLOB)"
+                )
+                self._db.execute("CREATE INDEX IF NOT EXISTS approvals_expires_at ON approvals (expires_at)")
+        return self._db
+
+    def save(self, input, run, suspended):
+        now = time.time()
+        approval = PendingApproval(
+            handle=uuid.uuid4().hex,
+            node_id=suspended.node_id,
+            message=suspended.message,
+            created_at=now,
+            expires_at=now + suspended.timeout if suspended.timeout else None,
+            snapshot=suspended.snapshot,
+        )
+        record = pickle.dumps({
+            "input": input,
+            "journal": run.journal,
+            "decisions": run.decisions,
+            "node_id": suspended.node_id,
+            "on_timeout": suspended.on_timeout,
+            "expires_at": approval.expires_at,
+            "snapshot": suspended.snapshot,
+        })
+        with self._connect() as db:
+            db.execute(
+                "INSERT INTO approvals VALUES (?, ?, ?, ?, ?, ?)",
+                (approval.handle, approval.node_id, approval.message, approval.created_at, approval.expires_at, record),
+            )
+        return approval
+
+    def take(self, handle):
+        # Removing the row first means a handle can only be resumed once
+        with self._connect() as db:
+            row = db.execute("SELECT record FROM approvals WHERE handle = ?", (handle,)).fetchone()
+            if row is None or db.execute("DELETE FROM approvals WHERE handle = ?", (handle,)).rowcount == 0:
+                return None
+        return pickle.loads(row[0])
+
+    def get(self, handle):
+        """The pending approval with its snapshot, or None once it was resumed."""
+        row = self._connect().execute(
+            "SELECT handle, node_id, message, created_at, expires_at, record FROM approvals WHERE handle = ?", (handle,)
+        ).fetchone()
+        if row is None:
+            return None
+        return PendingApproval(*row[:5], snapshot=pickle.loads(row[5])["snapshot"])
+
+    def pending(self, expired=False):
+        """Pending approvals, oldest first, without their snapshots."""
+        query = "SELECT handle, node_id, message, created_at, expires_at FROM approvals"
+        params = ()
+        if expired:
+            query += " WHERE expires_at <= ?"
+            params = (time.time(),)
+        rows = self._connect().execute(query + " ORDER BY created_at", params).fetchall()
+        return [PendingApproval(*row) for row in rows]
+
+
+approval_store = ApprovalStore()
+
 agent = Agent(
   name="Agent",
   instructions="",
@@ -46,16 +320,14 @@ agent = Agent(
   model_settings=ModelSettings(
     store=True,
     reasoning=Reasoning(
-      effort="low",
-      summary="auto"
+      effort="low"
     )
   )
 )
 
 
-def approval_request(message: str):
-  # TODO: Implement
-  return True
+async def approval_request(message: str, **snapshot):
+  return await request_approval("node_k6xbdsw8", message, snapshot, timeout=None, on_timeout=False)
 
 class WorkflowInput(BaseModel):
   input_as_text: str
@@ -78,3 +350,50 @@ async def run_workflow(workflow_input: WorkflowInput):
       ]
     }
   ]
+
+
+# Durable entrypoints
+async def _run_durable(input, journal, decisions):
+  run = _JournaledRun(journal, decisions=decisions)
+  token = _journaled_run.set(run)
+  try:
+    return await run_workflow(WorkflowInput(**input))
+  except WorkflowSuspended as suspended:
+    return approval_store.save(input, run, suspended)
+  finally:
+    _journaled_run.reset(token)
+
+
+async def start_workflow(workflow_input: WorkflowInput):
+  """Run the workflow until it ends or reaches a User Approval node.
+
+  Returns the workflow output, or a PendingApproval whose handle is passed
+  to resume_workflow() once someone decides. The suspended run lives in
+  approval_store only, so pending approvals hold no task or memory.
+  """
+  return await _run_durable(workflow_input.model_dump(), [], [])
+
+
+async def resume_workflow(handle, approved):
+  """Continue a suspended run with the decision for its pending approval.
+
+  Nodes that ran before the approval are replayed from their recorded
+  results, not called again. An approval past its timeout takes the node's
+  default branch whatever approved says. Returns the workflow output or the
+  next PendingApproval.
+  """
+  record = approval_store.take(handle)
+  if record is None:
+    raise KeyError(f"No pending approval with handle {handle!r}")
+  if record["expires_at"] is not None and record["expires_at"] <= time.time():
+    approved = record["on_timeout"]
+  decisions = [*record["decisions"], (record["node_id"], bool(approved))]
+  return await _run_durable(record["input"], record["journal"], decisions)
+
+
+async def expire_approvals():
+  """Resume every run whose approval timed out; returns results by handle."""
+  return {
+    approval.handle: await resume_workflow(approval.handle, False)
+    for approval in approval_store.pending(expired=True)
+  }
@@ -0,0 +1,877 @@
+import asyncio
+import hashlib
+import json
+import pickle
+import re
+import sqlite3
+import time
+from collections import Counter, OrderedDict, deque
+from contextlib import asynccontextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
+from typing import Any, Optional
+from mcp.client import Client, StdioClientTransport, SSEClientTransport
+from openai import AsyncOpenAI, DefaultAsyncHttpxClient
+from types import SimpleNamespace
+from agents import Agent, ModelSettings, TResponseInputItem, Runner, RunConfig, OpenAIProvider
+from openai.types.shared.reasoning import Reasoning
+from pydantic import BaseModel
+
+# Shared client for agents, guardrails and file search. Every response, not
+# only 429s, updates the rate limits of the call that made the request
+_rate_limit_lease = ContextVar("rate_limit_lease", default=None)
+
+
+async def observe_rate_limit_headers(response):
+    # httpx response hook; add it to clients passed in from elsewhere too
+    lease = _rate_limit_lease.get()
+    if lease is not None:
+        lease.observe(response.headers)
+
+
+client = AsyncOpenAI(http_client=DefaultAsyncHttpxClient(event_hooks={"response": [observe_rate_limit_headers]}))
+
+_agent_run_config = None
+
+
+def agent_run_config():
+    # Agent runs call the model through client instead of the SDK's default client
+    global _agent_run_config
+    if _agent_run_config is None:
+        _agent_run_config = RunConfig(model_provider=OpenAIProvider(openai_client=client))
+    return _agent_run_config
+ctx = SimpleNamespace(guardrail_llm=client)
+
+# Node hooks
+
+class WorkflowHooks:
+    """Node lifecycle callbacks; override the ones you need.
+
+    Install an instance with set_workflow_hooks(). Each callback receives the
+    NodeRun of the Agent, Guardrails, FileSearch or MCP node concerned.
+    """
+
+    def on_node_start(self, node):
+        pass
+
+    def on_node_end(self, node):
+        pass
+
+    def on_error(self, node, error):
+        pass
+
+
+@dataclass
+class NodeRun:
+    id: str
+    label: str
+    type: str
+    # Wall-clock start (time.time()) and duration in seconds
+    started_at: float
+    duration: Optional[float] = None
+    # Token usage of agent runs, None for other nodes and cached results
+    usage: Optional[dict] = None
+
+
+class _InstalledHooks:
+    hooks = None
+
+
+_installed_hooks = _InstalledHooks()
+
+_NODES = {
+    "node_triage": ("Triage", "builtins.Agent"),
+    "node_search": ("File Search", "builtins.tool.FileSearch"),
+    "node_lookup": ("MCP", "builtins.MCP"),
+    "node_reply": ("Reply", "builtins.Agent"),
+}
+
+
+def set_workflow_hooks(hooks):
+    """Install hooks for every workflow run in this module; None removes them."""
+    _installed_hooks.hooks = hooks
+
+
+def _usage(result):
+    usage = getattr(getattr(result, "context_wrapper", None), "usage", None)
+    if usage is None:
+        return None
+    return {
+        "requests": usage.requests,
+        "input_tokens": usage.input_tokens,
+        "output_tokens": usage.output_tokens,
+        "total_tokens": usage.total_tokens,
+    }
+
+
+async def _run_hooked_node(hooks, node_id, awaitable):
+    label, node_type = _NODES.get(node_id, (node_id, None))
+    node = NodeRun(node_id, label, node_type, time.time())
+    hooks.on_node_start(node)
+    start = time.perf_counter()
+    try:
+        result = await awaitable
+    except BaseException as error:
+        # Cancelled nodes are reported too, so every start has a matching end or error
+        node.duration = time.perf_counter() - start
+        hooks.on_error(node, error)
+        raise
+    node.duration = time.perf_counter() - start
+    node.usage = _usage(result)
+    hooks.on_node_end(node)
+    return result
+
+
+class WorkflowTimeout(Exception):
+    """Raised by run_workflow when its deadline passes; node_id names the node it stopped in."""
+
+    def __init__(self, node_id, deadline):
+        self.node_id = node_id
+        self.label = _NODES.get(node_id, (node_id, None))[0]
+        self.deadline = deadline
+        super().__init__(f"Workflow deadline exceeded in node {self.label!r} ({node_id})")
+
+
+# time.time() deadline of the run_workflow call this task belongs to, if any
+_workflow_deadline = ContextVar("workflow_deadline", default=None)
+
+
+async def _run_within_deadline(node_id, awaitable, deadline):
+    try:
+        # Cancels the node's requests when the budget runs out
+        return await asyncio.wait_for(awaitable, max(0.0, deadline - time.time()))
+    except asyncio.TimeoutError:
+        if time.time() < deadline:
+            # A timeout of the node itself, not of the workflow
+            raise
+        raise WorkflowTimeout(node_id, deadline) from None
+
+
+async def _workflow_timeout(node_id, deadline):
+    raise WorkflowTimeout(node_id, deadline)
+
+
+def _node_call(node_id, awaitable):
+    deadline = _workflow_deadline.get()
+    if deadline is not None and time.time() >= deadline:
+        # The node never starts: close its coroutine before anything wraps it
+        awaitable.close()
+        return _workflow_timeout(node_id, deadline)
+    hooks = _installed_hooks.hooks
+    if hooks is not None:
+        awaitable = _run_hooked_node(hooks, node_id, awaitable)
+    if deadline is not None:
+        awaitable = _run_within_deadline(node_id, awaitable, deadline)
+    return awaitable
+
+
+async def run_node(node_id, awaitable):
+    return await _node_call(node_id, awaitable)
+
+
+# Rate limiting
+
+def estimate_request_tokens(payload):
+    # About four characters per token; corrected from usage where it is reported
+    text = payload if isinstance(payload, str) else json.dumps(payload, default=str)
+    return len(text) // 4 + 1
+
+
+_DURATION_PART = re.compile(r"(\d+(?:\.\d+)?)(ms|s|m|h)")
+_DURATION_UNITS = {"ms": 0.001, "s": 1, "m": 60, "h": 3600}
+
+
+def _parse_duration(value):
+    # Reset headers look like "20ms", "1s" or "6m0s"; retry-after is plain seconds
+    if value is None:
+        return None
+    try:
+        return float(value)
+    except ValueError:
+        parts = _DURATION_PART.findall(value)
+        return sum(float(amount) * _DURATION_UNITS[unit] for amount, unit in parts) if parts else None
+
+
+class TokenBucket:
+    def __init__(self, per_minute):
+        self.level = 0.0
+        self.updated = time.monotonic()
+        self.set_limit(per_minute)
+        self.level = self.capacity
+
+    def set_limit(self, per_minute):
+        self.per_minute = per_minute
+        self.rate = per_minute / 60
+        # A few seconds of burst, not the whole minute at once
+        self.capacity = max(1.0, self.rate * 5)
+        self.level = min(self.level, self.capacity)
+
+    def _refill(self, now):
+        self.level = min(self.capacity, self.level + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def delay(self, amount, now):
+        self._refill(now)
+        # Requests larger than the bucket wait for a full bucket and go into debt
+        amount = min(amount, self.capacity)
+        return 0.0 if self.level >= amount else (amount - self.level) / self.rate
+
+    def take(self, amount):
+        self.level -= amount
+
+
+class _ModelLimits:
+    def __init__(self, concurrency, max_concurrency):
+        self.requests = None
+        self.tokens = None
+        self.concurrency = float(concurrency)
+        self.max_concurrency = max_concurrency
+        self.in_flight = 0
+        self.blocked_until = 0.0
+        self.changed = asyncio.Condition()
+        self.calls = 0
+        self.rate_limited = 0
+        self.queue_delays = deque(maxlen=1024)
+
+    def delay(self, tokens):
+        now = time.monotonic()
+        if now < self.blocked_until:
+            return self.blocked_until - now
+        if self.in_flight >= max(1, int(self.concurrency)):
+            return float("inf")
+        delay = 0.0
+        if self.requests is not None:
+            delay = max(delay, self.requests.delay(1, now))
+        if self.tokens is not None and tokens:
+            delay = max(delay, self.tokens.delay(tokens, now))
+        return delay
+
+    def take(self, tokens):
+        self.in_flight += 1
+        self.calls += 1
+        if self.requests is not None:
+            self.requests.take(1)
+        if self.tokens is not None:
+            self.tokens.take(tokens)
+
+    def on_success(self):
+        # Additive increase: about one more slot per window of successful calls
+        self.concurrency = min(self.max_concurrency, self.concurrency + 1 / self.concurrency)
+
+    def on_rate_limited(self, headers):
+        self.rate_limited += 1
+        now = time.monotonic()
+        # Multiplicative decrease, once per back-off rather than once per rejected call
+        if now >= self.blocked_until:
+            self.concurrency = max(1.0, self.concurrency / 2)
+        self.observe(headers)
+        retry_after = None
+        if headers:
+            retry_after_ms = _parse_duration(headers.get("retry-after-ms"))
+            retry_after = retry_after_ms / 1000 if retry_after_ms is not None else _parse_duration(headers.get("retry-after"))
+            if retry_after is None:
+                resets = [_parse_duration(headers.get(f"x-ratelimit-reset-{name}")) for name in ("requests", "tokens")]
+                retry_after = max((reset for reset in resets if reset is not None), default=None)
+        self.blocked_until = max(self.blocked_until, now + (retry_after if retry_after is not None else 1.0))
+
+    def observe(self, headers):
+        if not headers:
+            return
+        for name in ("requests", "tokens"):
+            limit = headers.get(f"x-ratelimit-limit-{name}")
+            if limit is None:
+                continue
+            bucket = getattr(self, name)
+            if bucket is None:
+                bucket = TokenBucket(float(limit))
+                setattr(self, name, bucket)
+            elif float(limit) != bucket.per_minute:
+                bucket.set_limit(float(limit))
+            remaining = headers.get(f"x-ratelimit-remaining-{name}")
+            if remaining is not None:
+                bucket.level = min(bucket.level, float(remaining))
+
+    def stats(self):
+        delays = sorted(self.queue_delays)
+        return {
+            "calls": self.calls,
+            "rate_limited": self.rate_limited,
+            "in_flight": self.in_flight,
+            "concurrency_limit": int(self.concurrency),
+            "requests_per_minute": self.requests.per_minute if self.requests is not None else None,
+            "tokens_per_minute": self.tokens.per_minute if self.tokens is not None else None,
+            "queue_delay_mean": sum(delays) / len(delays) if delays else 0.0,
+            "queue_delay_p95": delays[int(len(delays) * 0.95)] if delays else 0.0,
+            "queue_delay_max": delays[-1] if delays else 0.0,
+        }
+
+
+class RateLimitLease:
+    def __init__(self, limits, tokens):
+        self._limits = limits
+        self.tokens = tokens
+
+    def observe(self, headers):
+        self._limits.observe(headers)
+
+    def settle(self, tokens):
+        # Charge the difference between the estimate and the reported usage
+        if tokens is not None and self._limits.tokens is not None:
+            self._limits.tokens.take(tokens - self.tokens)
+            self.tokens = tokens
+
+
+class RateLimiter:
+    """Client-side request shaping per model.
+
+    Each model has a concurrency limit adjusted with AIMD: it grows by about
+    one per window of successful calls and halves when the provider answers
+    429, after which the model is paused until the reset the response asks
+    for. Request and token buckets start unlimited and follow the
+    x-ratelimit-* headers seen in responses, or the limits given to
+    configure(). stats() reports the time calls spent queued per model.
+    """
+
+    def __init__(self, initial_concurrency=16, max_concurrency=256):
+        self.initial_concurrency = initial_concurrency
+        self.max_concurrency = max_concurrency
+        self._models = {}
+
+    def _limits(self, model):
+        limits = self._models.get(model)
+        if limits is None:
+            limits = _ModelLimits(self.initial_concurrency, self.max_concurrency)
+            self._models[model] = limits
+        return limits
+
+    def configure(self, model, requests_per_minute=None, tokens_per_minute=None, concurrency=None):
+        limits = self._limits(model)
+        if requests_per_minute is not None:
+            limits.observe({"x-ratelimit-limit-requests": requests_per_minute})
+        if tokens_per_minute is not None:
+            limits.observe({"x-ratelimit-limit-tokens": tokens_per_minute})
+        if concurrency is not None:
+            limits.concurrency = float(concurrency)
+
+    def observe(self, model, headers):
+        self._limits(model).observe(headers)
+
+    def stats(self):
+        return {model: limits.stats() for model, limits in self._models.items()}
+
+    @asynccontextmanager
+    async def acquire(self, model, tokens=0):
+        limits = self._limits(model)
+        queued_at = time.monotonic()
+        async with limits.changed:
+            while (delay := limits.delay(tokens)) > 0:
+                try:
+                    await asyncio.wait_for(limits.changed.wait(), None if delay == float("inf") else delay)
+                except asyncio.TimeoutError:
+                    pass
+            limits.take(tokens)
+        limits.queue_delays.append(time.monotonic() - queued_at)
+        lease = RateLimitLease(limits, tokens)
+        # observe_rate_limit_headers passes the call's responses to its lease
+        token = _rate_limit_lease.set(lease)
+        try:
+            yield lease
+        except Exception as error:
+            if getattr(error, "status_code", None) == 429:
+                limits.on_rate_limited(getattr(getattr(error, "response", None), "headers", None))
+            raise
+        else:
+            limits.on_success()
+        finally:
+            _rate_limit_lease.reset(token)
+            async with limits.changed:
+                limits.in_flight -= 1
+                limits.changed.notify_all()
+
+
+rate_limits = RateLimiter()
+
+
+def _model_key(agent):
+    model = getattr(agent, "model", None)
+    return model if isinstance(model, str) else getattr(model, "model", None) or "default"
+
+
+# MCP utils
+
+class _MCPSession:
+    def __init__(self, key, connecting):
+        self.key = key
+        self.connecting = connecting
+        self.client = None
+        self.users = 0
+        self.last_used = time.monotonic()
+        self.broken = False
+
+
+class MCPSessionPool:
+    """Shares initialized MCP clients across nodes and workflow runs.
+
+    Sessions are keyed by transport, target and headers, so nodes that talk to
+    the same server reuse one connection (and one stdio process). Idle sessions
+    are closed after idle_timeout seconds, the least recently used idle session
+    makes room once max_size is reached, and sessions idle for longer than
+    health_check_interval are pinged before they are handed out again.
+    """
+
+    def __init__(self, max_size=8, idle_timeout=300.0, health_check_interval=30.0):
+        self.max_size = max_size
+        self.idle_timeout = idle_timeout
+        self.health_check_interval = health_check_interval
+        self._sessions = {}
+        self._changed = asyncio.Condition()
+
+    async def call_tool(self, transport, target, headers=None, *, name, arguments, timeout=None):
+        session = await self._acquire(transport, target, headers or {})
+        try:
+            return await asyncio.wait_for(
+                session.client.call_tool(name=name, arguments=arguments), timeout
+            )
+        except (OSError, EOFError, asyncio.TimeoutError, asyncio.CancelledError):
+            # The connection state is unknown after a lost connection, a timeout
+            # or a cancelled call; a tool that raised leaves it usable
+            session.broken = True
+            raise
+        finally:
+            await self._release(session)
+
+    async def aclose(self):
+        async with self._changed:
+            sessions = list(self._sessions.values())
+            self._sessions.clear()
+        # Sessions still in use are closed by their last _release
+        await self._close_all([s for s in sessions if s.users == 0])
+
+    async def _acquire(self, transport, target, headers):
+        key = (transport, target, json.dumps(headers, sort_keys=True))
+        while True:
+            stale = []
+            async with self._changed:
+                stale += self._take_expired()
+                session = self._sessions.get(key)
+                if session is not None:
+                    ping = self._needs_ping(session)
+                    session.users += 1
+                elif len(self._sessions) < self.max_size or self._evict_lru(stale):
+                    ping = False
+                    connecting = asyncio.ensure_future(self._connect(transport, target, headers))
+                    session = self._sessions[key] = _MCPSession(key, connecting)
+                    session.users += 1
+                else:
+                    await self._changed.wait()
+            # Closing and pinging talk to the server, so they run unlocked
+            await self._close_all(stale)
+            if session is None:
+                continue
+            if ping and not await self._ping(session):
+                session.broken = True
+                await self._release(session)
+                continue
+            break
+        try:
+            # Shielded so one cancelled caller doesn't abort a shared connect
+            session.client = await asyncio.shield(session.connecting)
+        except BaseException:
+            session.broken = True
+            await self._release(session)
+            raise
+        return session
+
+    async def _release(self, session):
+        async with self._changed:
+            session.users -= 1
+            session.last_used = time.monotonic()
+            if session.broken and self._sessions.get(session.key) is session:
+                del self._sessions[session.key]
+            orphaned = session.users == 0 and self._sessions.get(session.key) is not session
+            self._changed.notify_all()
+        if orphaned:
+            await self._close(session)
+
+    async def _connect(self, transport, target, headers):
+        if transport == "stdio":
+            mcp_transport = StdioClientTransport(command="python", args=[target])
+        else:
+            mcp_transport = SSEClientTransport(url=target, headers=headers)
+        client = Client(transport=mcp_transport)
+        await client.initialize()
+        return client
+
+    def _needs_ping(self, session):
+        # Only sessions nobody is using and that sat idle for a while are pinged
+        if session.users > 0 or session.client is None:
+            return False
+        return time.monotonic() - session.last_used >= self.health_check_interval
+
+    async def _ping(self, session):
+        try:
+            await asyncio.wait_for(session.client.ping(), 5)
+            return True
+        except Exception:
+            return False
+
+    def _take_expired(self):
+        now = time.monotonic()
+        expired = [
+            s for s in self._sessions.values()
+            if s.users == 0 and now - s.last_used > self.idle_timeout
+        ]
+        for session in expired:
+            del self._sessions[session.key]
+        return expired
+
+    def _evict_lru(self, evicted):
+        idle = [s for s in self._sessions.values() if s.users == 0]
+        if not idle:
+            return False
+        session = min(idle, key=lambda s: s.last_used)
+        del self._sessions[session.key]
+        evicted.append(session)
+        return True
+
+    async def _close_all(self, sessions):
+        await asyncio.gather(*(self._close(session) for session in sessions))
+
+    async def _close(self, session):
+        try:
+            client = await session.connecting
+            await client.close()
+        except Exception:
+            pass
+
+mcp_sessions = MCPSessionPool()
+
+# Agent runtime
+
+@dataclass
+class WorkflowEvent:
+    # "node_started", "text_delta", "node_finished" or "final_output"
+    type: str
+    node_id: Optional[str] = None
+    delta: Optional[str] = None
+    output: Any = None
+
+
+# Event queue of the run_workflow_streamed call this task belongs to, if any
+_workflow_events = ContextVar("workflow_events", default=None)
+
+
+def run_agent_node(node_id, agent, input):
+    return run_node(node_id, _run_agent_node(node_id, agent, input))
+
+
+def _settle_usage(lease, result):
+    usage = getattr(getattr(result, "context_wrapper", None), "usage", None)
+    lease.settle(getattr(usage, "total_tokens", None))
+
+
+async def _run_agent_request(agent, input):
+    async with rate_limits.acquire(_model_key(agent), tokens=estimate_request_tokens(input)) as lease:
+        result = await Runner.run(agent, input=input, run_config=agent_run_config())
+        _settle_usage(lease, result)
+    return result
+
+
+async def _run_agent_node(node_id, agent, input):
+    events = _workflow_events.get()
+    if events is None:
+        return await _run_agent_request(agent, input)
+    events.put_nowait(WorkflowEvent("node_started", node_id=node_id))
+    published = False
+
+    async def stream_request():
+        nonlocal published
+        async with rate_limits.acquire(_model_key(agent), tokens=estimate_request_tokens(input)) as lease:
+            result = Runner.run_streamed(agent, input=input, run_config=agent_run_config())
+            async for event in result.stream_events():
+                if event.type == "raw_response_event" and event.data.type == "response.output_text.delta":
+                    published = True
+                    events.put_nowait(WorkflowEvent("text_delta", node_id=node_id, delta=event.data.delta))
+            _settle_usage(lease, result)
+        return result
+
+    result = await stream_request()
+    events.put_nowait(WorkflowEvent("node_finished", node_id=node_id, output=result.final_output))
+    return result
+
+
+# Recorded node results
+
+class RecordedRunItem:
+    def __init__(self, item):
+        self._item = item
+
+    def to_input_item(self):
+        return dict(self._item)
+
+
+class RecordedRunResult:
+    """Stands in for an agent run with the new_items and final_output it recorded."""
+
+    def __init__(self, record):
+        self.final_output = record["final_output"]
+        self.new_items = [RecordedRunItem(item) for item in record["new_items"]]
+
+    def final_output_as(self, cls, raise_if_incorrect_type=False):
+        return self.final_output
+
+
+class RecordedSearchResult:
+    def __init__(self, file_id, filename, score):
+        self.file_id = file_id
+        self.filename = filename
+        self.score = score
+
+
+class RecordedSearchPage:
+    def __init__(self, results):
+        self.data = [RecordedSearchResult(**result) for result in results]
+
+
+# Node result cache
+
+_CACHE_MISS = object()
+
+
+class NodeResultCache:
+    """Results of nodes with caching enabled, keyed by node, config and inputs.
+
+    The "memory" backend is an LRU of max_entries entries; the "sqlite" backend
+    persists pickled entries in the database at path. Entries expire after the
+    node's ttl in seconds (None keeps them until evicted). hits and misses count
+    lookups per node id.
+    """
+
+    def __init__(self, max_entries=1024, path="workflow_cache.sqlite3"):
+        self.max_entries = max_entries
+        self.path = path
+        self.hits = Counter()
+        self.misses = Counter()
+        self._memory = OrderedDict()
+        self._db = None
+
+    def stats(self):
+        return {"hits": dict(self.hits), "misses": dict(self.misses)}
+
+    def run_agent(self, node_id, agent, input, *, fingerprint, backend="memory", ttl=None):
+        # Hits are reported to the node hooks like real runs
+        return run_node(node_id, self._run_agent(node_id, agent, input, fingerprint, backend, ttl))
+
+    async def _run_agent(self, node_id, agent, input, fingerprint, backend, ttl):
+        key = self._key(node_id, fingerprint, input)
+        record = self._get(node_id, backend, key)
+        if record is not _CACHE_MISS:
+            # Streamed runs still see the node, just without text deltas
+            events = _workflow_events.get()
+            result = RecordedRunResult(record)
+            if events is not None:
+                events.put_nowait(WorkflowEvent("node_started", node_id=node_id))
+                events.put_nowait(WorkflowEvent("node_finished", node_id=node_id, output=result.final_output))
+            return result
+        result = await _run_agent_node(node_id, agent, input)
+        self._put(backend, key, {
+            "final_output": result.final_output,
+            "new_items": [item.to_input_item() for item in result.new_items],
+        }, ttl)
+        return result
+
+    async def search_vector_store(self, node_id, *, fingerprint, backend="memory", ttl=None, **params):
+        key = self._key(node_id, fingerprint, params)
+        record = self._get(node_id, backend, key)
+        if record is _CACHE_MISS:
+            response = await rate_limited_search(**params)
+            record = [
+                {"file_id": result.file_id, "filename": result.filename, "score": result.score}
+                for result in response.data
+            ]
+            self._put(backend, key, record, ttl)
+        return RecordedSearchPage(record)
+
+    async def call_mcp_tool(self, node_id, transport, target, headers=None, *, name, arguments, timeout=None, fingerprint, backend="memory", ttl=None):
+        key = self._key(node_id, fingerprint, [transport, target, headers, name, arguments])
+        record = self._get(node_id, backend, key)
+        if record is _CACHE_MISS:
+            record = await mcp_sessions.call_tool(transport, target, headers, name=name, arguments=arguments, timeout=timeout)
+            self._put(backend, key, record, ttl)
+        return record
+
+    def _key(self, node_id, fingerprint, inputs):
+        payload = json.dumps([node_id, fingerprint, inputs], sort_keys=True, default=str)
+        return hashlib.sha256(payload.encode()).hexdigest()
+
+    def _get(self, node_id, backend, key):
+        record = self._get_sqlite(key) if backend == "sqlite" else self._get_memory(key)
+        if record is _CACHE_MISS:
+            self.misses[node_id] += 1
+        else:
+            self.hits[node_id] += 1
+        return record
+
+    def _put(self, backend, key, record, ttl):
+        expires_at = time.time() + ttl if ttl else None
+        if backend == "sqlite":
+            self._put_sqlite(key, record, expires_at)
+        else:
+            self._memory[key] = (expires_at, record)
+            self._memory.move_to_end(key)
+            while len(self._memory) > self.max_entries:
+                self._memory.popitem(last=False)
+
+    def _get_memory(self, key):
+        entry = self._memory.get(key)
+        if entry is None:
+            return _CACHE_MISS
+        expires_at, record = entry
+        if expires_at is not None and expires_at <= time.time():
+            del self._memory[key]
+            return _CACHE_MISS
+        self._memory.move_to_end(key)
+        return record
+
+    def _connect(self):
+        if self._db is None:
+            self._db = sqlite3.connect(self.path)
+            self._db.execute("CREATE TABLE IF NOT EXISTS node_cache (key TEXT PRIMARY KEY, expires_at REAL, value BLOB)")
+        return self._db
+
+    def _get_sqlite(self, key):
+        row = self._connect().execute("SELECT expires_at, value FROM node_cache WHERE key = ?", (key,)).fetchone()
+        if row is None:
+            return _CACHE_MISS
+        expires_at, value = row
+        if expires_at is not None and expires_at <= time.time():
+            with self._db:
+                self._db.execute("DELETE FROM node_cache WHERE key = ?", (key,))
+            return _CACHE_MISS
+        return pickle.loads(value)
+
+    def _put_sqlite(self, key, record, expires_at):
+        try:
+            value = pickle.dumps(record)
+        except (pickle.PicklingError, TypeError, AttributeError):
+            # Results that can't be pickled are simply not persisted
+            return
+        with self._connect() as db:
+            db.execute("INSERT OR REPLACE INTO node_cache VALUES (?, ?, ?)", (key, expires_at, value))
+
+
+node_cache = NodeResultCache()
+
+triage = Agent(
+  name="Triage",
+  instructions="",
+  model="gpt-5",
+  model_settings=ModelSettings(
+    store=True,
+    reasoning=Reasoning(
+      effort="low"
+    )
+  )
+)
+
+
+reply = Agent(
+  name="Reply",
+  instructions="",
+  model="gpt-5",
+  model_settings=ModelSettings(
+    store=True,
+    reasoning=Reasoning(
+      effort="low"
+    )
+  )
+)
+
+
+class WorkflowInput(BaseModel):
+  input_as_text: str
+
+
+# Main code entrypoint
+async def run_workflow(workflow_input: WorkflowInput, deadline: Optional[float] = None):
+  # Past deadline (a time.time() timestamp) node calls raise WorkflowTimeout
+  _workflow_deadline.set(deadline)
+  state = {
+
+  }
+  workflow = workflow_input.model_dump()
+  conversation_history: list[TResponseInputItem] = [
+    {
+      "role": "user",
+      "content": [
+        {
+          "type": "input_text",
+          "text": workflow["input_as_text"]
+        }
+      ]
+    }
+  ]
+  # Unused: nothing reads the result of "File Search" (node_search); the search is skipped
+  # Unused: nothing reads the result of "MCP" (node_lookup); it still runs since it may have side effects
+  triage_result_temp, mcp_result = await asyncio.gather(
+    node_cache.run_agent(
+      "node_triage",
+      triage,
+      input=[
+        *conversation_history
+      ],
+      fingerprint="126ebc71c4f3e5", backend="memory", ttl=None
+    ),
+    run_node("node_lookup", node_cache.call_mcp_tool(
+      "node_lookup",
+      "sse",
+      "https://api.example.com/mcp",
+      headers={},
+      name="order_lookup",
+      arguments={
+        "status": "open"
+      },
+      timeout=30,
+      fingerprint="15c630fa2181c", backend="memory", ttl=300
+    ))
+  )
+
+  conversation_history.extend([item.to_input_item() for item in triage_result_temp.new_items])
+
+  reply_result_temp = await run_agent_node(
+    "node_reply",
+    reply,
+    input=[
+      *conversation_history
+    ]
+  )
+
+  conversation_history.extend([item.to_input_item() for item in reply_result_temp.new_items])
+
+  reply_result = {
+    "output_text": reply_result_temp.final_output_as(str)
+  }
+  return reply_result
+
+
+# Streaming entrypoint
+async def run_workflow_streamed(workflow_input: WorkflowInput, deadline: Optional[float] = None):
+  """Run the workflow, yielding WorkflowEvents as soon as agents produce them."""
+  events = asyncio.Queue()
+
+  async def run():
+    _workflow_events.set(events)
+    try:
+      output = await run_workflow(workflow_input, deadline=deadline)
+      events.put_nowait(WorkflowEvent("final_output", output=output))
+    finally:
+      events.put_nowait(None)
+
+  task = asyncio.create_task(run())
+  try:
+    while (event := await events.get()) is not None:
+      yield event
+    # Surface errors raised by the workflow itself
+    await task
+  finally:
+    task.cancel()